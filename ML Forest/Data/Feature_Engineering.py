@@ -1,20 +1,533 @@
 import pandas as pd
 import numpy as np
 import warnings
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, PolynomialFeatures
-from sklearn.decomposition import PCA
-from scipy import stats
+from sklearn.preprocessing import PolynomialFeatures
 from scipy.spatial.distance import pdist, squareform
 import math
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from classification import (
+    ELEVATION_ZONES, SLOPE_CLASSES, HEALTH_CLASSES, RISK_CLASSES,
+    classify_table, classify_exposure, classify_topo_position, classify_management_priority
+)
+from memory_optimization import optimize_dtypes, print_memory_report
+from columnar_storage import write_dataset, read_dataset, dataset_path
 
 warnings.filterwarnings('ignore')
 
+def masked_linregress(values, min_valid_fraction=0.5):
+    """Pente et R² de la régression linéaire de chaque ligne sur l'indice des colonnes
+
+    Moindres carrés en forme fermée sur toute la matrice (lignes = points, colonnes =
+    années) : les NaN sont masqués ligne par ligne. Même résultat que stats.linregress
+    appliqué ligne à ligne, y compris la règle de validité (moins de 50% de NaN et au
+    moins 2 valeurs, sinon NaN) et un R² NaN pour une série constante.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    x = np.arange(n_cols, dtype=np.float64)
+
+    valid = ~np.isnan(values)
+    n_valid = valid.sum(axis=1)
+    usable = ((n_cols - n_valid) < n_cols * min_valid_fraction) & (n_valid >= 2)
+
+    weights = valid.astype(np.float64)
+    y = np.where(valid, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = (weights @ x) / n_valid
+        y_mean = y.sum(axis=1) / n_valid
+        dx = (x[None, :] - x_mean[:, None]) * weights
+        dy = (y - y_mean[:, None]) * weights
+        sxx = (dx * dx).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+
+        slope = sxy / sxx
+        # Série constante : 0 / 0 -> NaN, comme stats.linregress
+        r = sxy / np.sqrt(sxx * syy)
+
+    r2 = np.clip(r, -1.0, 1.0) ** 2
+    return np.where(usable, slope, np.nan), np.where(usable, r2, np.nan)
+
+def compact_valid(values):
+    """Valeurs non-NaN de chaque ligne ramenées en tête (ordre conservé), NaN en fin de ligne
+
+    Équivalent matriciel de values[~np.isnan(values)] ligne par ligne : la colonne j d'une
+    ligne est sa j-ième valeur valide tant que j < n_valid.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    order = np.argsort(missing, axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1), (~missing).sum(axis=1)
+
+def count_direction_changes(values, min_valid_fraction=0.5):
+    """Nombre de changements de signe des variations successives (valeurs valides, >= 3)"""
+    values = np.asarray(values, dtype=np.float64)
+    n_cols = values.shape[1]
+    compact, n_valid = compact_valid(values)
+
+    signs = np.sign(np.diff(compact, axis=1))
+    # Paire de variations (j, j+1) valide si j + 2 < n_valid
+    pairs = np.arange(n_cols - 2)[None, :] < (n_valid - 2)[:, None]
+    changes = ((signs[:, 1:] != signs[:, :-1]) & pairs).sum(axis=1).astype(np.float64)
+
+    usable = ((n_cols - n_valid) < n_cols * min_valid_fraction) & (n_valid >= 3)
+    return np.where(usable, changes, np.nan)
+
+def lag1_autocorrelation(values):
+    """Corrélation de Pearson entre valeurs valides successives (np.corrcoef(v[:-1], v[1:]))"""
+    compact, n_valid = compact_valid(values)
+    x = compact[:, :-1]
+    y = compact[:, 1:]
+    pairs = np.arange(x.shape[1])[None, :] < (n_valid - 1)[:, None]
+    weights = pairs.astype(np.float64)
+    x = np.where(pairs, x, 0.0)
+    y = np.where(pairs, y, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n_pairs = weights.sum(axis=1)
+        dx = (x - (x.sum(axis=1) / n_pairs)[:, None]) * weights
+        dy = (y - (y.sum(axis=1) / n_pairs)[:, None]) * weights
+        r = (dx * dy).sum(axis=1) / np.sqrt((dx * dx).sum(axis=1) * (dy * dy).sum(axis=1))
+
+    return np.where(n_valid >= 3, np.clip(r, -1.0, 1.0), np.nan)
+
+def recovery_time(values, drop_threshold=-0.05, recovery_ratio=0.95, min_valid_fraction=0.5):
+    """Années nécessaires pour revenir à 95% du niveau d'avant la plus forte chute
+
+    NaN sans chute significative (plus forte baisse >= drop_threshold). Sans retour au
+    niveau d'avant la chute, nombre d'années observées après la chute.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    compact, n_valid = compact_valid(values)
+    rows = np.arange(n_rows)
+    positions = np.arange(n_cols)[None, :]
+
+    # Plus forte chute parmi les variations valides (première en cas d'égalité)
+    diffs = np.diff(compact, axis=1)
+    diffs = np.where(positions[:, :-1] < (n_valid - 1)[:, None], diffs, np.inf)
+    drop_idx = diffs.argmin(axis=1)
+    dropped = diffs[rows, drop_idx] < drop_threshold
+
+    # Premier point après la chute qui retrouve le niveau d'avant
+    pre_drop_value = compact[rows, drop_idx]
+    recovered = ((positions >= (drop_idx + 2)[:, None]) & (positions < n_valid[:, None]) &
+                 (compact >= (pre_drop_value * recovery_ratio)[:, None]))
+    first_recovery = recovered.argmax(axis=1)
+    years = np.where(recovered.any(axis=1), first_recovery - drop_idx - 1, n_valid - drop_idx - 2)
+
+    usable = ((n_cols - n_valid) < n_cols * min_valid_fraction) & (n_valid >= 3) & dropped
+    return np.where(usable, years, np.nan)
+
+# Colonne de région utilisée pour les percentiles régionaux (master, puis export simple)
+REGION_COLUMNS = ('region_main', 'region')
+
+def percentile_of_scores(sorted_values, scores):
+    """stats.percentileofscore(kind='rank') de chaque score, par recherche dichotomique
+
+    sorted_values : distribution de référence triée, sans NaN. Score NaN -> NaN.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    left = np.searchsorted(sorted_values, scores, side='left')
+    right = np.searchsorted(sorted_values, scores, side='right')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentile = (left + right + (left < right)) * (50.0 / len(sorted_values))
+    return np.where(np.isnan(scores), np.nan, percentile)
+
+def percentiles_by_group(values, groups, sorted_values_for):
+    """percentile_of_scores au sein de chaque groupe (NaN hors groupe)
+
+    sorted_values_for(groupe, valeurs du groupe) renvoie la distribution de référence
+    triée du groupe, ou None si elle est inconnue. Un tri par groupe : O(n log n).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes, uniques = pd.factorize(np.asarray(groups))
+    result = np.full(len(values), np.nan)
+
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    for code, group in enumerate(uniques):
+        positions = order[bounds[code]:bounds[code + 1]]
+        reference = sorted_values_for(group, positions)
+        if reference is not None and len(reference):
+            result[positions] = percentile_of_scores(reference, values[positions])
+    return result
+
+def equal_width_bins(min_value, max_value, n_bins):
+    """Bornes calculées par pd.cut(bins=n_bins) : intervalles égaux, borne basse élargie de 0.1%"""
+    if min_value == max_value:
+        min_value -= 0.001 * abs(min_value) if min_value != 0 else 0.001
+        max_value += 0.001 * abs(max_value) if max_value != 0 else 0.001
+        return np.linspace(min_value, max_value, n_bins + 1)
+
+    bins = np.linspace(min_value, max_value, n_bins + 1)
+    bins[0] -= (max_value - min_value) * 0.001
+    return bins
+
+class GlobalStatistics:
+    """Statistiques globales des étapes de feature engineering (moyennes, quantiles, PCA, catégories)
+
+    Sans valeurs figées, chaque statistique est calculée sur le DataFrame reçu (mode en
+    mémoire). En mode par blocs, une passe de collecte accumule chaque statistique bloc
+    après bloc (sommes, moments, min/max, valeurs pour les quantiles) et utilise les
+    valeurs de la passe précédente ; les passes s'enchaînent jusqu'à ce que plus aucune
+    statistique ne change, les statistiques calculées sur des colonnes déjà normalisées
+    convergent donc aussi. Les quantiles et percentiles restent exacts : leurs valeurs
+    sont toutes gardées (retained_bytes, 8 octets par valeur non manquante).
+    """
+
+    def __init__(self, values=None, frozen=False):
+        self.values = dict(values or {})
+        # Figées (état d'un transformer entraîné) : une statistique absente est une erreur
+        self.frozen = frozen
+        self.collecting = False
+        self.retained_bytes = 0
+        self._accumulators = {}
+
+    def get(self, kind, name, data, **params):
+        key = f'{kind}:{name}'
+        if self.collecting:
+            self._accumulate(key, kind, data, params)
+        if key in self.values:
+            return self.values[key]
+        if self.frozen:
+            raise KeyError(f"Statistic not fitted: {key}")
+        return self._finalize(kind, self._partial(kind, data, params), params)
+
+    def fitted(self, kind, name):
+        """False si la statistique manque à un état figé (ex. région absente à l'entraînement)"""
+        return not self.frozen or f'{kind}:{name}' in self.values
+
+    # ============= SÉRIALISATION =============
+    def to_dict(self):
+        return {key: _encode_statistic(value) for key, value in self.values.items()}
+
+    @classmethod
+    def from_dict(cls, state, frozen=True):
+        return cls({key: _decode_statistic(value) for key, value in state.items()}, frozen=frozen)
+
+    # ============= PASSES DE COLLECTE =============
+    def begin_pass(self):
+        self.collecting = True
+        self._accumulators = {}
+
+    def end_pass(self):
+        """Figer les statistiques de la passe ; True si une valeur a changé"""
+        self.collecting = False
+        self.retained_bytes = sum(
+            array.nbytes for kind, partial, _ in self._accumulators.values()
+            if kind in ('quantile', 'sorted') for array in partial
+        )
+        values = {key: self._finalize(kind, partial, params)
+                  for key, (kind, partial, params) in self._accumulators.items()}
+        changed = values.keys() != self.values.keys() or any(
+            not _same_statistic(value, self.values[key]) for key, value in values.items()
+        )
+        self.values = values
+        self._accumulators = {}
+        return changed
+
+    def _accumulate(self, key, kind, data, params):
+        partial = self._partial(kind, data, params)
+        if key in self._accumulators:
+            partial = self._merge(kind, self._accumulators[key][1], partial)
+        self._accumulators[key] = (kind, partial, params)
+
+    # ============= STATISTIQUES PARTIELLES FUSIONNABLES =============
+    @staticmethod
+    def _partial(kind, data, params):
+        if kind in ('mean', 'std'):
+            frame = data.to_frame() if isinstance(data, pd.Series) else data
+            values = frame.to_numpy(dtype=np.float64)
+            count = (~np.isnan(values)).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.nansum(values, axis=0) / count
+                m2 = np.nansum((values - mean) ** 2, axis=0)
+            return {'columns': list(frame.columns), 'series': isinstance(data, pd.Series),
+                    'count': count, 'mean': np.where(count > 0, mean, 0.0), 'm2': m2}
+        if kind in ('min', 'max'):
+            return data.min() if kind == 'min' else data.max()
+        if kind in ('quantile', 'sorted'):
+            return [data.dropna().to_numpy(dtype=np.float64)]
+        if kind == 'categories':
+            return set(data.dropna().unique())
+        if kind == 'pca':
+            values = data.to_numpy(dtype=np.float64)
+            mean = values.mean(axis=0)
+            centered = values - mean
+            return {'columns': list(data.columns), 'count': len(values), 'mean': mean,
+                    'scatter': centered.T @ centered}
+        raise ValueError(f"Unknown statistic: {kind}")
+
+    @staticmethod
+    def _merge(kind, left, right):
+        if kind in ('mean', 'std', 'pca'):
+            # Fusion de moments centrés (Chan et al.) : stable numériquement
+            count = left['count'] + right['count']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                delta = right['mean'] - left['mean']
+                weight = np.where(count > 0, right['count'] / np.maximum(count, 1), 0.0)
+                mean = left['mean'] + delta * weight
+                if kind == 'pca':
+                    factor = left['count'] * right['count'] / max(count, 1)
+                    scatter = left['scatter'] + right['scatter'] + np.outer(delta, delta) * factor
+                    return {**left, 'count': count, 'mean': mean, 'scatter': scatter}
+                m2 = left['m2'] + right['m2'] + delta ** 2 * left['count'] * weight
+            return {**left, 'count': count, 'mean': mean, 'm2': m2}
+        if kind == 'min':
+            return np.fmin(left, right) if not isinstance(left, pd.Series) else left.combine(right, np.fmin)
+        if kind == 'max':
+            return np.fmax(left, right) if not isinstance(left, pd.Series) else left.combine(right, np.fmax)
+        if kind in ('quantile', 'sorted'):
+            return left + right
+        if kind == 'categories':
+            return left | right
+        raise ValueError(f"Unknown statistic: {kind}")
+
+    @staticmethod
+    def _finalize(kind, partial, params):
+        if kind in ('mean', 'std'):
+            count = partial['count']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if kind == 'mean':
+                    value = np.where(count > 0, partial['mean'], np.nan)
+                else:
+                    ddof = params.get('ddof', 1)
+                    value = np.sqrt(partial['m2'] / np.where(count - ddof > 0, count - ddof, np.nan))
+            if partial['series']:
+                return float(value[0])
+            return pd.Series(value, index=partial['columns'])
+        if kind in ('min', 'max'):
+            return partial
+        if kind == 'quantile':
+            values = np.concatenate(partial)
+            return float(np.quantile(values, params['q'])) if len(values) else np.nan
+        if kind == 'sorted':
+            return np.sort(np.concatenate(partial))
+        if kind == 'categories':
+            return sorted(partial)
+        if kind == 'pca':
+            n_components = params['n_components']
+            # Mêmes composantes que sklearn.decomposition.PCA (solveur covariance_eigh)
+            eigenvalues, eigenvectors = np.linalg.eigh(partial['scatter'] / max(partial['count'] - 1, 1))
+            order = np.argsort(eigenvalues)[::-1]
+            eigenvalues = np.clip(eigenvalues[order], 0, None)
+            components = eigenvectors[:, order].T
+            # Signe de sklearn (svd_flip, u_based_decision=False) : plus forte composante positive
+            signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+            components *= signs[:, None]
+            return {
+                'mean': partial['mean'],
+                'components': components[:n_components],
+                'explained_variance_ratio': eigenvalues[:n_components] / eigenvalues.sum()
+            }
+        raise ValueError(f"Unknown statistic: {kind}")
+
+
+def _encode_statistic(value):
+    """Statistique -> valeur JSON (Series et tableaux numpy balisés)"""
+    if isinstance(value, dict):
+        return {key: _encode_statistic(item) for key, item in value.items()}
+    if isinstance(value, pd.Series):
+        return {'__series__': {'index': list(value.index), 'values': value.tolist()}}
+    if isinstance(value, np.ndarray):
+        return {'__array__': value.tolist()}
+    if isinstance(value, list):
+        return [_encode_statistic(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode_statistic(value):
+    if isinstance(value, dict):
+        if '__series__' in value:
+            return pd.Series(value['__series__']['values'], index=value['__series__']['index'], dtype=np.float64)
+        if '__array__' in value:
+            return np.asarray(value['__array__'], dtype=np.float64)
+        return {key: _decode_statistic(item) for key, item in value.items()}
+    return value
+
+
+def _same_statistic(left, right):
+    if isinstance(left, dict):
+        return isinstance(right, dict) and left.keys() == right.keys() and all(
+            _same_statistic(left[key], right[key]) for key in left
+        )
+    if isinstance(left, (pd.Series, np.ndarray, list)):
+        left, right = np.asarray(left), np.asarray(right)
+        if left.shape != right.shape:
+            return False
+        if left.dtype.kind in 'fc':
+            return bool(np.array_equal(left, right, equal_nan=True))
+        return bool(np.array_equal(left, right))
+    if isinstance(left, float) and isinstance(right, float):
+        return left == right or (np.isnan(left) and np.isnan(right))
+    return left == right
+
+
+class FeatureBuffer:
+    """self.df pendant une étape : nouvelles colonnes dans un dict, un seul concat à la fin
+
+    Chaque `self.df['x'] = ...` d'une étape insérait un bloc dans le DataFrame (un bloc par
+    feature, consolidations ultérieures). Les lectures voient les colonnes déjà créées par
+    l'étape, comme avant.
+
+    Le buffer note aussi ce que l'étape a lu du DataFrame d'entrée (colonnes lues, noms
+    testés, parcours de la liste des colonnes) : ce sont les dépendances utilisées par le
+    mode incrémental. written garde toutes les colonnes écrites, y compris celles qui
+    remplacent une colonne d'entrée (northness, eastness... déjà calculées par le processeur).
+    """
+    # Largeur max d'un bloc consolidé : borne la copie transitoire de to_frame()
+    BLOCK_COLUMNS = 16
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.new_columns = {}
+        self.written = {}
+        self.reads = set()
+        self.probes = {}
+        self.scanned = False
+
+    def dependencies(self):
+        return {
+            'reads': sorted(self.reads),
+            'probes': self.probes,
+            'columns': [str(name) for name in self.frame.columns] if self.scanned else None
+        }
+
+    def _read(self, name):
+        if name in self.new_columns:
+            return self.new_columns[name]
+        self.reads.add(name)
+        return self.frame[name]
+
+    def __setitem__(self, name, value):
+        if isinstance(value, pd.Series):
+            if not value.index.equals(self.frame.index):
+                value = value.reindex(self.frame.index)
+        else:
+            value = pd.Series(value, index=self.frame.index)
+        self.new_columns[name] = value.rename(name)
+        self.written[name] = None
+
+    def __getitem__(self, key):
+        if isinstance(key, list):
+            if not any(name in self.new_columns for name in key):
+                self.reads.update(key)
+                return self.frame[key]
+            return pd.DataFrame({name: self._read(name) for name in key}, index=self.frame.index)
+        return self._read(key)
+
+    def __contains__(self, name):
+        if name in self.new_columns:
+            return True
+        present = name in self.frame.columns
+        self.probes[name] = present
+        return present
+
+    @property
+    def columns(self):
+        added = [name for name in self.new_columns if name not in self.frame.columns]
+        return _BufferColumns(self, list(self.frame.columns) + added)
+
+    @property
+    def index(self):
+        return self.frame.index
+
+    @property
+    def shape(self):
+        return (len(self.frame), len(self.columns))
+
+    def to_frame(self):
+        """Colonnes existantes remplacées en place, nouvelles colonnes ajoutées en un seul concat
+
+        Les colonnes numériques consécutives de même dtype forment un bloc 2D ; chaque colonne
+        du dict est libérée dès sa copie dans le bloc.
+        """
+        frame = self.frame
+        replaced = [name for name in self.new_columns if name in frame.columns]
+        if replaced:
+            frame = frame.copy()
+            for name in replaced:
+                frame[name] = self.new_columns.pop(name)
+
+        names = list(self.new_columns)
+        pieces = [frame]
+        start = 0
+        while start < len(names):
+            first = self.new_columns[names[start]]
+            end = start + 1
+            if isinstance(first.dtype, np.dtype) and first.dtype != object:
+                while (end < len(names) and end - start < self.BLOCK_COLUMNS
+                       and self.new_columns[names[end]].dtype == first.dtype):
+                    end += 1
+                # Ordre Fortran : pandas stocke le bloc transposé, sans nouvelle copie
+                block = np.empty((len(frame), end - start), dtype=first.dtype, order='F')
+                for i, name in enumerate(names[start:end]):
+                    block[:, i] = self.new_columns.pop(name).to_numpy()
+                pieces.append(pd.DataFrame(block, index=frame.index, columns=names[start:end], copy=False))
+            else:
+                pieces.append(self.new_columns.pop(names[start]).to_frame())
+            start = end
+
+        return pd.concat(pieces, axis=1) if len(pieces) > 1 else frame
+
+
+class _BufferColumns:
+    """self.df.columns pendant une étape : note les tests d'appartenance et les parcours"""
+
+    def __init__(self, buffer, names):
+        self.buffer = buffer
+        self.names = names
+
+    def __iter__(self):
+        self.buffer.scanned = True
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.buffer
+
+
+def buffered_stage(method):
+    """Étape du pipeline : ses colonnes passent par un FeatureBuffer"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if isinstance(self.df, FeatureBuffer):
+            return method(self, *args, **kwargs)
+        self.df = FeatureBuffer(self.df)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.stage_dependencies = self.df.dependencies()
+            self.stage_outputs = list(self.df.written)
+            self.df = self.df.to_frame()
+    return wrapper
+
+
 class ForestFeatureEngineer:
     """Création de nouvelles features pour Forest Digital Twin Dataset"""
     
-    def __init__(self, df):
+    def __init__(self, df, global_stats=None):
         self.df = df.copy()
         self.original_shape = df.shape
+        # Statistiques calculées sur tout le dataset (figées en mode par blocs)
+        self.global_stats = global_stats or GlobalStatistics()
+        # Dépendances lues par la dernière étape exécutée (mode incrémental)
+        self.stage_dependencies = None
+        # Colonnes écrites par la dernière étape (nouvelles ou remplacées)
+        self.stage_outputs = None
+        self.memory_report = None
         self.new_features = []
         self.feature_categories = {
             'spectral': [],
@@ -30,7 +543,32 @@ class ForestFeatureEngineer:
         print("Feature Engineer initialisé")
         print(f"Dataset initial: {self.df.shape[0]:,} points × {self.df.shape[1]} features")
 
+    def _stat(self, kind, name, data, **params):
+        """Statistique globale : calculée sur self.df, ou sur tout le dataset en mode par blocs"""
+        return self.global_stats.get(kind, name, data, **params)
+
+    def _percentile(self, column, by=None):
+        """Percentile (0-100, kind='rank') de chaque valeur de column dans le dataset
+
+        Une distribution triée par colonne (statistique 'sorted', partagée entre features
+        et entre blocs) puis une recherche dichotomique par ligne : O(n log n) au lieu
+        d'un percentileofscore par ligne. by : percentile au sein de chaque groupe
+        (ex. région) ; NaN pour un groupe absent des statistiques figées.
+        """
+        values = self.df[column]
+        if by is None:
+            return percentile_of_scores(self._stat('sorted', column, values), values)
+
+        def sorted_values_for(group, positions):
+            name = f'{column}|{by}={group}'
+            if not self.global_stats.fitted('sorted', name):
+                return None
+            return self._stat('sorted', name, values.iloc[positions])
+
+        return percentiles_by_group(values, self.df[by], sorted_values_for)
+
     # ============= ÉTAPE 1: FEATURES SPECTRALES =============
+    @buffered_stage
     def create_spectral_features(self):
         """ÉTAPE 1: Création de features spectrales avancées"""
         print("\n" + "="*70)
@@ -193,18 +731,18 @@ class ForestFeatureEngineer:
         
         if len(spectral_bands) >= 3:
             # PCA des bandes spectrales
-            spectral_data = self.df[spectral_bands].fillna(self.df[spectral_bands].mean())
+            spectral_data = self.df[spectral_bands].fillna(self._stat('mean', 'spectral_bands', self.df[spectral_bands]))
             
             if spectral_data.shape[1] >= 3:
-                pca = PCA(n_components=3)
-                pca_result = pca.fit_transform(spectral_data)
+                pca = self._stat('pca', 'spectral_bands', spectral_data, n_components=3)
+                pca_result = (spectral_data.to_numpy(dtype=np.float64) - pca['mean']) @ pca['components'].T
                 
                 self.df['spectral_PC1'] = pca_result[:, 0]
                 self.df['spectral_PC2'] = pca_result[:, 1] 
                 self.df['spectral_PC3'] = pca_result[:, 2]
                 
                 # Variance expliquée
-                explained_var = pca.explained_variance_ratio_
+                explained_var = pca['explained_variance_ratio']
                 
                 created += 3
                 for i, feature in enumerate(['spectral_PC1', 'spectral_PC2', 'spectral_PC3']):
@@ -272,6 +810,7 @@ class ForestFeatureEngineer:
         print(f"   Créés: {created} indices forestiers")
 
     # ============= ÉTAPE 2: FEATURES TEMPORELLES =============
+    @buffered_stage
     def create_temporal_features(self):
         """ÉTAPE 2: Création de features temporelles"""
         print("\n" + "="*70)
@@ -354,32 +893,12 @@ class ForestFeatureEngineer:
             self.feature_categories['temporal'].append(feature)
             self.new_features.append(feature)
         
-        # Régression linéaire robuste
+        # Régression linéaire robuste (pente et R², toutes les lignes d'un coup,
+        # moins de 50% de NaN requis)
         if len(temporal_cols) >= 3:
-            years = np.arange(len(temporal_cols))
-            
-            def calculate_slope(row):
-                values = row[temporal_cols].values
-                if np.isnan(values).sum() < len(values) * 0.5:  # Moins de 50% de NaN
-                    valid_idx = ~np.isnan(values)
-                    if valid_idx.sum() >= 2:
-                        slope, _, _, _, _ = stats.linregress(years[valid_idx], values[valid_idx])
-                        return slope
-                return np.nan
-            
-            self.df['ndvi_robust_slope'] = self.df.apply(calculate_slope, axis=1)
-            
-            # R² de la tendance
-            def calculate_r2(row):
-                values = row[temporal_cols].values
-                if np.isnan(values).sum() < len(values) * 0.5:
-                    valid_idx = ~np.isnan(values)
-                    if valid_idx.sum() >= 2:
-                        _, _, r_value, _, _ = stats.linregress(years[valid_idx], values[valid_idx])
-                        return r_value ** 2
-                return np.nan
-            
-            self.df['ndvi_trend_r2'] = self.df.apply(calculate_r2, axis=1)
+            slope, r2 = masked_linregress(self.df[temporal_cols].to_numpy(dtype=np.float64))
+            self.df['ndvi_robust_slope'] = slope
+            self.df['ndvi_trend_r2'] = r2
             
             created += 2
             for feature in ['ndvi_robust_slope', 'ndvi_trend_r2']:
@@ -416,29 +935,13 @@ class ForestFeatureEngineer:
         
         # Variabilité avancée
         if len(temporal_cols) >= 3:
+            temporal_values = temporal_data.to_numpy(dtype=np.float64)
+            
             # Nombre de changements de direction
-            def count_direction_changes(row):
-                values = row[temporal_cols].values
-                if np.isnan(values).sum() < len(values) * 0.5:
-                    valid_values = values[~np.isnan(values)]
-                    if len(valid_values) >= 3:
-                        diffs = np.diff(valid_values)
-                        signs = np.sign(diffs)
-                        changes = np.sum(np.diff(signs) != 0)
-                        return changes
-                return np.nan
-            
-            self.df['ndvi_direction_changes'] = self.df.apply(count_direction_changes, axis=1)
+            self.df['ndvi_direction_changes'] = count_direction_changes(temporal_values)
             
             # Persistance (autocorrélation lag-1)
-            def calculate_persistence(row):
-                values = row[temporal_cols].values
-                valid_values = values[~np.isnan(values)]
-                if len(valid_values) >= 3:
-                    return np.corrcoef(valid_values[:-1], valid_values[1:])[0, 1]
-                return np.nan
-            
-            self.df['ndvi_persistence'] = self.df.apply(calculate_persistence, axis=1)
+            self.df['ndvi_persistence'] = lag1_autocorrelation(temporal_values)
             
             created += 2
             for feature in ['ndvi_direction_changes', 'ndvi_persistence']:
@@ -562,30 +1065,8 @@ class ForestFeatureEngineer:
         if len(temporal_cols) >= 3:
             temporal_data = self.df[temporal_cols]
             
-            # Temps de récupération après chute
-            def calculate_recovery_time(row):
-                values = row[temporal_cols].values
-                if np.isnan(values).sum() < len(values) * 0.5:
-                    valid_values = values[~np.isnan(values)]
-                    if len(valid_values) >= 3:
-                        # Trouver la plus grande chute
-                        diffs = np.diff(valid_values)
-                        if len(diffs) > 0:
-                            min_diff_idx = np.argmin(diffs)
-                            if diffs[min_diff_idx] < -0.05:  # Chute significative
-                                # Chercher temps de récupération
-                                drop_value = valid_values[min_diff_idx + 1]
-                                pre_drop_value = valid_values[min_diff_idx]
-                                
-                                recovery_time = 0
-                                for i in range(min_diff_idx + 2, len(valid_values)):
-                                    recovery_time += 1
-                                    if valid_values[i] >= pre_drop_value * 0.95:  # 95% de récupération
-                                        return recovery_time
-                                return len(valid_values) - min_diff_idx - 2  # Pas encore récupéré
-                return np.nan
-            
-            self.df['recovery_time'] = self.df.apply(calculate_recovery_time, axis=1)
+            # Temps de récupération après la plus forte chute (< -0.05), retour à 95%
+            self.df['recovery_time'] = recovery_time(temporal_data.to_numpy(dtype=np.float64))
             
             # Résilience index (capacité à maintenir des valeurs élevées)
             baseline = temporal_data.quantile(0.8, axis=1)  # 80e percentile comme baseline
@@ -606,6 +1087,7 @@ class ForestFeatureEngineer:
         print(f"   Créées: {created} features de résilience")
 
     # ============= ÉTAPE 3: FEATURES TOPOGRAPHIQUES =============
+    @buffered_stage
     def create_topographic_features(self):
         """ÉTAPE 3: Création de features topographiques avancées"""
         print("\n" + "="*70)
@@ -658,24 +1140,7 @@ class ForestFeatureEngineer:
                 self.new_features.append(feature)
             
             # Classifications d'exposition
-            def classify_exposure(row):
-                if pd.isna(row['aspect']):
-                    return 'Unknown'
-                aspect = row['aspect']
-                slope = row['slope']
-                
-                if slope < 5:
-                    return 'Flat'
-                elif 135 <= aspect <= 225:  # Sud
-                    return 'South_facing'
-                elif 315 <= aspect or aspect <= 45:  # Nord
-                    return 'North_facing'
-                elif 45 < aspect < 135:  # Est
-                    return 'East_facing'
-                else:  # Ouest
-                    return 'West_facing'
-            
-            self.df['exposure_class'] = self.df.apply(classify_exposure, axis=1)
+            self.df['exposure_class'] = classify_exposure(self.df['aspect'], self.df['slope'])
             created += 1
             self.feature_categories['topographic'].append('exposure_class')
             self.new_features.append('exposure_class')
@@ -692,26 +1157,12 @@ class ForestFeatureEngineer:
         
         if 'elevation' in self.df.columns:
             # Classification altitudinale écologique
-            def classify_elevation_zone(elevation):
-                if pd.isna(elevation):
-                    return 'Unknown'
-                elif elevation < 500:
-                    return 'Lowland'
-                elif elevation < 1000:
-                    return 'Colline'
-                elif elevation < 1500:
-                    return 'Montane_Low'
-                elif elevation < 2500:
-                    return 'Montane_High'
-                else:
-                    return 'Alpine'
-            
-            self.df['elevation_zone'] = self.df['elevation'].apply(classify_elevation_zone)
+            self.df['elevation_zone'] = classify_table(self.df['elevation'], ELEVATION_ZONES)
             
             # Élévation relative (si coordonnées disponibles pour calculs de voisinage)
             if 'latitude' in self.df.columns and 'longitude' in self.df.columns:
                 # Élévation relative dans un rayon (approximation simple)
-                elevation_mean = self.df['elevation'].mean()
+                elevation_mean = self._stat('mean', 'elevation', self.df['elevation'])
                 self.df['elevation_relative'] = self.df['elevation'] - elevation_mean
             
             created += 1
@@ -725,21 +1176,7 @@ class ForestFeatureEngineer:
         
         if 'slope' in self.df.columns:
             # Classification de pente
-            def classify_slope(slope):
-                if pd.isna(slope):
-                    return 'Unknown'
-                elif slope < 2:
-                    return 'Very_Gentle'
-                elif slope < 5:
-                    return 'Gentle'
-                elif slope < 15:
-                    return 'Moderate'
-                elif slope < 30:
-                    return 'Steep'
-                else:
-                    return 'Very_Steep'
-            
-            self.df['slope_class'] = self.df['slope'].apply(classify_slope)
+            self.df['slope_class'] = classify_table(self.df['slope'], SLOPE_CLASSES)
             
             # Rugosité du terrain (slope comme proxy)
             self.df['terrain_roughness'] = np.log1p(self.df['slope'])
@@ -774,36 +1211,29 @@ class ForestFeatureEngineer:
         # Position topographique
         if 'elevation' in self.df.columns and 'slope' in self.df.columns:
             # Position relative: crête, mi-pente, vallée
-            def classify_topo_position(row):
-                elevation = row['elevation']
-                slope = row['slope']
-                
-                if pd.isna(elevation) or pd.isna(slope):
-                    return 'Unknown'
-                
-                # Approximation basée sur élévation relative et pente
-                elevation_percentile = stats.percentileofscore(self.df['elevation'].dropna(), elevation)
-                
-                if slope < 3:
-                    if elevation_percentile > 70:
-                        return 'Plateau'
-                    else:
-                        return 'Valley_Floor'
-                elif slope < 15:
-                    return 'Mid_Slope'
-                else:
-                    if elevation_percentile > 70:
-                        return 'Ridge'
-                    else:
-                        return 'Steep_Slope'
+            # Approximation basée sur élévation relative et pente
+            elevation_percentile = self._percentile('elevation')
             
-            self.df['topographic_position'] = self.df.apply(classify_topo_position, axis=1)
+            self.df['topographic_position'] = classify_topo_position(
+                elevation_percentile, self.df['slope'],
+                unknown_mask=self.df['elevation'].isna() | self.df['slope'].isna()
+            )
             
             created += 1
             self.feature_categories['topographic'].append('topographic_position')
             self.new_features.append('topographic_position')
             print("   Position topographique")
         
+        # Altitude relative au sein de la région
+        region_column = next((col for col in REGION_COLUMNS if col in self.df.columns), None)
+        if 'elevation' in self.df.columns and region_column is not None:
+            self.df['elevation_percentile_region'] = self._percentile('elevation', by=region_column)
+            
+            created += 1
+            self.feature_categories['topographic'].append('elevation_percentile_region')
+            self.new_features.append('elevation_percentile_region')
+            print("   Percentile d'altitude régional")
+        
         print(f"   Créées: {created} features hydrologiques")
 
     def _create_climate_derived_features(self):
@@ -816,7 +1246,7 @@ class ForestFeatureEngineer:
             # Gradient thermique altitudinal (approximation)
             # Généralement -0.6°C par 100m
             expected_temp_drop = (self.df['elevation'] / 100) * 0.6
-            reference_temp = self.df['temperature'].mean()
+            reference_temp = self._stat('mean', 'temperature', self.df['temperature'])
             expected_temp = reference_temp - expected_temp_drop
             
             # Anomalie thermique (différence entre observé et attendu)
@@ -856,6 +1286,7 @@ class ForestFeatureEngineer:
         print(f"   Créées: {created} features climatiques dérivées")
 
     # ============= ÉTAPE 4: FEATURES ÉCOLOGIQUES =============
+    @buffered_stage
     def create_ecological_features(self):
         """ÉTAPE 4: Création de features écologiques et de santé"""
         print("\n" + "="*70)
@@ -914,8 +1345,8 @@ class ForestFeatureEngineer:
             
             for component in health_components:
                 # Normalisation min-max
-                min_val = health_data[component].quantile(0.05)
-                max_val = health_data[component].quantile(0.95)
+                min_val = self._stat('quantile', f'{component}_q05', health_data[component], q=0.05)
+                max_val = self._stat('quantile', f'{component}_q95', health_data[component], q=0.95)
                 normalized = (health_data[component] - min_val) / (max_val - min_val)
                 normalized = normalized.clip(0, 1)
                 
@@ -970,8 +1401,8 @@ class ForestFeatureEngineer:
         # Temperature Stress
         if 'temperature' in self.df.columns:
             # Stress thermique basé sur les extrêmes
-            temp_mean = self.df['temperature'].mean()
-            temp_std = self.df['temperature'].std()
+            temp_mean = self._stat('mean', 'temperature', self.df['temperature'])
+            temp_std = self._stat('std', 'temperature', self.df['temperature'])
             
             # Z-score de température
             temp_z = np.abs((self.df['temperature'] - temp_mean) / temp_std)
@@ -987,7 +1418,7 @@ class ForestFeatureEngineer:
             # Combinaison de tendance négative et variabilité élevée
             trend_stress = np.where(self.df['ndvi_linear_trend'] < 0, 
                                   np.abs(self.df['ndvi_linear_trend']), 0)
-            variability_stress = self.df['ndvi_temporal_std'] / (self.df['ndvi_temporal_std'].max() + 0.0001)
+            variability_stress = self.df['ndvi_temporal_std'] / (self._stat('max', 'ndvi_temporal_std', self.df['ndvi_temporal_std']) + 0.0001)
             
             self.df['drought_stress_composite'] = (trend_stress * 0.6 + variability_stress * 0.4)
             
@@ -1000,14 +1431,15 @@ class ForestFeatureEngineer:
         if all(col in self.df.columns for col in ['NDMI', 'temperature']):
             # Combiner faible humidité et haute température
             water_stress = 1 - ((self.df['NDMI'] + 1) / 2)
-            temp_normalized = (self.df['temperature'] - self.df['temperature'].min()) / \
-                            (self.df['temperature'].max() - self.df['temperature'].min())
+            temp_min = self._stat('min', 'temperature', self.df['temperature'])
+            temp_max = self._stat('max', 'temperature', self.df['temperature'])
+            temp_normalized = (self.df['temperature'] - temp_min) / (temp_max - temp_min)
             
             self.df['fire_risk_index'] = (water_stress * 0.6 + temp_normalized * 0.4)
             
             if 'slope' in self.df.columns:
                 # Ajouter facteur de pente (pentes raides = propagation rapide)
-                slope_normalized = self.df['slope'] / (self.df['slope'].max() + 0.0001)
+                slope_normalized = self.df['slope'] / (self._stat('max', 'slope', self.df['slope']) + 0.0001)
                 self.df['fire_risk_index'] = (self.df['fire_risk_index'] * 0.8 + slope_normalized * 0.2)
             
             created += 1
@@ -1042,8 +1474,9 @@ class ForestFeatureEngineer:
         # Growth Potential
         if 'NDVI' in self.df.columns and 'carrying_capacity' in self.df.columns:
             # Potentiel de croissance = capacité - état actuel
-            ndvi_normalized = (self.df['NDVI'] - self.df['NDVI'].min()) / \
-                            (self.df['NDVI'].max() - self.df['NDVI'].min())
+            ndvi_min = self._stat('min', 'NDVI', self.df['NDVI'])
+            ndvi_max = self._stat('max', 'NDVI', self.df['NDVI'])
+            ndvi_normalized = (self.df['NDVI'] - ndvi_min) / (ndvi_max - ndvi_min)
             
             self.df['growth_potential'] = self.df['carrying_capacity'] - ndvi_normalized
             
@@ -1065,9 +1498,9 @@ class ForestFeatureEngineer:
         # Biodiversity Potential (proxy)
         if all(col in self.df.columns for col in ['elevation', 'precipitation']):
             # Diversité potentielle basée sur hétérogénéité environnementale
-            elev_diversity = 1 - np.abs(self.df['elevation'] - self.df['elevation'].mean()) / \
-                           (self.df['elevation'].std() + 0.0001)
-            precip_diversity = self.df['precipitation'] / (self.df['precipitation'].max() + 0.0001)
+            elev_diversity = 1 - np.abs(self.df['elevation'] - self._stat('mean', 'elevation', self.df['elevation'])) / \
+                           (self._stat('std', 'elevation', self.df['elevation']) + 0.0001)
+            precip_diversity = self.df['precipitation'] / (self._stat('max', 'precipitation', self.df['precipitation']) + 0.0001)
             
             self.df['biodiversity_potential'] = (elev_diversity * 0.5 + precip_diversity * 0.5)
             
@@ -1086,21 +1519,7 @@ class ForestFeatureEngineer:
         
         # Classification de santé multi-critères
         if 'forest_health_composite' in self.df.columns:
-            def classify_health_detailed(health_score):
-                if pd.isna(health_score):
-                    return 'Unknown'
-                elif health_score >= 0.8:
-                    return 'Excellent'
-                elif health_score >= 0.6:
-                    return 'Good'
-                elif health_score >= 0.4:
-                    return 'Fair'
-                elif health_score >= 0.2:
-                    return 'Poor'
-                else:
-                    return 'Critical'
-            
-            self.df['health_class_detailed'] = self.df['forest_health_composite'].apply(classify_health_detailed)
+            self.df['health_class_detailed'] = classify_table(self.df['forest_health_composite'], HEALTH_CLASSES)
             
             created += 1
             self.feature_categories['ecological'].append('health_class_detailed')
@@ -1116,19 +1535,7 @@ class ForestFeatureEngineer:
             risk_data = self.df[available_risk]
             self.df['risk_composite'] = risk_data.mean(axis=1)
             
-            def classify_risk(risk_score):
-                if pd.isna(risk_score):
-                    return 'Unknown'
-                elif risk_score <= 0.2:
-                    return 'Low_Risk'
-                elif risk_score <= 0.4:
-                    return 'Moderate_Risk'
-                elif risk_score <= 0.6:
-                    return 'High_Risk'
-                else:
-                    return 'Critical_Risk'
-            
-            self.df['risk_class'] = self.df['risk_composite'].apply(classify_risk)
+            self.df['risk_class'] = classify_table(self.df['risk_composite'], RISK_CLASSES)
             
             created += 2
             for feature in ['risk_composite', 'risk_class']:
@@ -1139,23 +1546,9 @@ class ForestFeatureEngineer:
         
         # Classification de priorité de gestion
         if all(col in self.df.columns for col in ['forest_health_composite', 'risk_composite']):
-            def classify_management_priority(row):
-                health = row['forest_health_composite']
-                risk = row['risk_composite']
-                
-                if pd.isna(health) or pd.isna(risk):
-                    return 'Unknown'
-                
-                if health < 0.3 and risk > 0.6:
-                    return 'Urgent_Intervention'
-                elif health < 0.5 and risk > 0.4:
-                    return 'High_Priority'
-                elif health < 0.7 or risk > 0.3:
-                    return 'Moderate_Priority'
-                else:
-                    return 'Low_Priority'
-            
-            self.df['management_priority'] = self.df.apply(classify_management_priority, axis=1)
+            self.df['management_priority'] = classify_management_priority(
+                self.df['forest_health_composite'], self.df['risk_composite']
+            )
             
             created += 1
             self.feature_categories['ecological'].append('management_priority')
@@ -1165,6 +1558,7 @@ class ForestFeatureEngineer:
         print(f"   Créées: {created} classifications")
 
     # ============= ÉTAPE 5: FEATURES D'INTERACTION =============
+    @buffered_stage
     def create_interaction_features(self):
         """ÉTAPE 5: Création de features d'interaction"""
         print("\n" + "="*70)
@@ -1202,7 +1596,7 @@ class ForestFeatureEngineer:
             self.df['temp_elevation_interaction'] = self.df['temperature'] * np.log1p(self.df['elevation'])
             
             # Gradient thermique local
-            expected_temp = self.df['temperature'].mean() - (self.df['elevation'] / 100) * 0.006
+            expected_temp = self._stat('mean', 'temperature', self.df['temperature']) - (self.df['elevation'] / 100) * 0.006
             self.df['temp_elevation_anomaly'] = self.df['temperature'] - expected_temp
             
             created += 2
@@ -1370,6 +1764,7 @@ class ForestFeatureEngineer:
         print(f"   Créées: {created} ratios significatifs")
 
     # ============= ÉTAPE 6: FEATURES MACHINE LEARNING =============
+    @buffered_stage
     def create_ml_features(self):
         """ÉTAPE 6: Préparation features pour Machine Learning"""
         print("\n" + "="*70)
@@ -1405,8 +1800,11 @@ class ForestFeatureEngineer:
         available_features = [f for f in key_features if f in self.df.columns]
         
         if available_features:
-            scaler = StandardScaler()
-            normalized_data = scaler.fit_transform(self.df[available_features].fillna(0))
+            # StandardScaler : moyenne et écart-type (ddof=0) globaux, échelle 1 si variance nulle
+            scaler_data = self.df[available_features].fillna(0)
+            means = self._stat('mean', 'standardized_inputs', scaler_data)
+            stds = self._stat('std', 'standardized_inputs', scaler_data, ddof=0)
+            normalized_data = ((scaler_data - means) / stds.replace(0, 1)).to_numpy()
             
             for i, feature in enumerate(available_features):
                 normalized_name = f'{feature}_standardized'
@@ -1423,8 +1821,11 @@ class ForestFeatureEngineer:
         available_minmax = [f for f in minmax_features if f in self.df.columns]
         
         if available_minmax:
-            minmax_scaler = MinMaxScaler()
-            minmax_data = minmax_scaler.fit_transform(self.df[available_minmax].fillna(0))
+            # MinMaxScaler : min et max globaux, étendue 1 si constante
+            minmax_inputs = self.df[available_minmax].fillna(0)
+            mins = self._stat('min', 'minmax_inputs', minmax_inputs)
+            maxs = self._stat('max', 'minmax_inputs', minmax_inputs)
+            minmax_data = ((minmax_inputs - mins) / (maxs - mins).replace(0, 1)).to_numpy()
             
             for i, feature in enumerate(available_minmax):
                 minmax_name = f'{feature}_minmax'
@@ -1452,7 +1853,7 @@ class ForestFeatureEngineer:
             # Limiter à 3 features max pour éviter explosion dimensionnelle
             selected_features = available_poly[:3]
             
-            poly_data = self.df[selected_features].fillna(self.df[selected_features].mean())
+            poly_data = self.df[selected_features].fillna(self._stat('mean', 'polynomial_inputs', self.df[selected_features]))
             
             # Créer features quadratiques uniquement
             for feature in selected_features:
@@ -1497,8 +1898,11 @@ class ForestFeatureEngineer:
         for feature, config in binning_config.items():
             if feature in self.df.columns:
                 binned_name = f'{feature}_binned'
+                bins = equal_width_bins(self._stat('min', feature, self.df[feature]),
+                                        self._stat('max', feature, self.df[feature]),
+                                        config['bins'])
                 self.df[binned_name] = pd.cut(self.df[feature], 
-                                            bins=config['bins'], 
+                                            bins=bins, 
                                             labels=config['labels'],
                                             include_lowest=True)
                 
@@ -1525,10 +1929,13 @@ class ForestFeatureEngineer:
         
         for feature in available_categorical:
             # One-hot encoding pour features avec peu de catégories
-            unique_count = self.df[feature].nunique()
+            categories = self._stat('categories', feature, self.df[feature])
+            unique_count = len(categories)
             
             if unique_count <= 6:  # One-hot si peu de catégories
-                dummies = pd.get_dummies(self.df[feature], prefix=f'{feature}_is', dummy_na=True)
+                # Catégories globales : mêmes colonnes quel que soit le bloc de lignes
+                values = pd.Series(pd.Categorical(self.df[feature], categories=categories), index=self.df.index)
+                dummies = pd.get_dummies(values, prefix=f'{feature}_is', dummy_na=True, dtype=np.uint8)
                 
                 for dummy_col in dummies.columns:
                     self.df[dummy_col] = dummies[dummy_col]
@@ -1539,10 +1946,11 @@ class ForestFeatureEngineer:
                 print(f"   One-hot: {feature} → {len(dummies.columns)} dummies")
             
             else:  # Label encoding si beaucoup de catégories
-                from sklearn.preprocessing import LabelEncoder
-                le = LabelEncoder()
+                # LabelEncoder : rang dans les classes triées (texte)
+                labels = self.df[feature].astype(str)
+                classes = self._stat('categories', f'{feature}_labels', labels)
                 encoded_name = f'{feature}_encoded'
-                self.df[encoded_name] = le.fit_transform(self.df[feature].astype(str))
+                self.df[encoded_name] = np.searchsorted(classes, labels.to_numpy())
                 
                 self.feature_categories['ml_ready'].append(encoded_name)
                 self.new_features.append(encoded_name)
@@ -1553,6 +1961,14 @@ class ForestFeatureEngineer:
         print(f"   Créées: {created} features encodées")
 
     # ============= MÉTHODES UTILITAIRES =============
+    def optimize_dtypes(self):
+        """Types compacts pour le dataset final (float32, petits entiers, category, uint8)
+
+        À appeler après les étapes : les features sont calculées en float64.
+        """
+        self.df, self.memory_report = optimize_dtypes(self.df)
+        return self.memory_report
+
     def generate_feature_summary(self):
         """Générer un résumé des features créées"""
         print("\n" + "="*70)
@@ -1588,6 +2004,13 @@ class ForestFeatureEngineer:
             print(f"   • Complétude: {100-missing_pct:.1f}%")
             print(f"   • Features sans valeurs manquantes: {len([f for f in self.new_features if self.df[f].isnull().sum() == 0])}")
         
+        print(f"\nMEMOIRE:")
+        memory_mb = self.df.memory_usage(deep=True).sum() / 1024**2
+        if self.memory_report:
+            print_memory_report(self.memory_report)
+        else:
+            print(f"   • Mémoire: {memory_mb:.1f} MB (types non optimisés)")
+        
         print(f"\nRECOMMANDATIONS:")
         if len(self.new_features) > 100:
             print("   Considérer une sélection de features (trop nombreuses)")
@@ -1603,16 +2026,29 @@ class ForestFeatureEngineer:
             'new_features': len(self.new_features),
             'total_features': self.df.shape[1],
             'categories': {cat: len(feats) for cat, feats in self.feature_categories.items() if feats},
-            'ml_ready_count': len(ml_features)
+            'ml_ready_count': len(ml_features),
+            'memory_mb': round(memory_mb, 2),
+            'memory_report': self.memory_report
         }
 
-    def save_engineered_dataset(self, output_file='forest_features_engineered.csv'):
-        """Sauvegarder le dataset avec nouvelles features"""
-        self.df.to_csv(output_file, index=False)
+    def save_engineered_dataset(self, output_file='forest_features_engineered.csv', output_format='csv'):
+        """Sauvegarder le dataset avec nouvelles features
+
+        output_format : 'csv', 'parquet' (partitionné par region_main) ou 'feather' ;
+        l'extension du fichier suit le format.
+        """
+        output_file = dataset_path(output_file, output_format)
+        partition_cols = ['region_main'] if output_format == 'parquet' and 'region_main' in self.df.columns else None
+        write_dataset(self.df, output_file, output_format, partition_cols=partition_cols)
         print(f"\nDataset avec features sauvegardé: {output_file}")
         
-        # Sauvegarder la liste des nouvelles features
-        feature_list_file = output_file.replace('.csv', '_feature_list.txt')
+        self.save_feature_list(output_file)
+        
+        return output_file
+
+    def save_feature_list(self, output_file):
+        """Sauvegarder la liste des nouvelles features à côté du dataset"""
+        feature_list_file = os.path.splitext(output_file)[0] + '_feature_list.txt'
         with open(feature_list_file, 'w') as f:
             f.write("NOUVELLES FEATURES CRÉEES\n")
             f.write("="*50 + "\n\n")
@@ -1626,43 +2062,436 @@ class ForestFeatureEngineer:
         
         print(f"Liste des features sauvegardée: {feature_list_file}")
         
-        return output_file
+        return feature_list_file
 
 # ============= FONCTIONS PRINCIPALES =============
+PIPELINE_STEPS = [
+    ('spectral', 'create_spectral_features'),
+    ('temporal', 'create_temporal_features'),
+    ('topographic', 'create_topographic_features'),
+    ('ecological', 'create_ecological_features'),
+    ('interaction', 'create_interaction_features'),
+    ('ml', 'create_ml_features')
+]
+
+# Étapes dont chaque étape lit les features créées (toutes lisent les colonnes d'origine)
+STAGE_DEPENDENCIES = {
+    'spectral': [],
+    'temporal': [],
+    'topographic': [],
+    'ecological': ['spectral', 'temporal'],
+    'interaction': ['temporal', 'ecological'],
+    'ml': ['topographic', 'ecological']
+}
+
+# Étapes sans statistique globale : découpables en blocs de lignes entre les process
+ROW_LOCAL_STAGES = {'temporal'}
+
+@contextlib.contextmanager
+def quiet_output():
+    """Masquer les journaux des étapes (exécutions par blocs ou par requête)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def run_pipeline_steps(engineer, steps=None):
+    """Exécuter les étapes du pipeline dans l'ordre"""
+    results = {}
+    for step, method in PIPELINE_STEPS:
+        if steps is None or step in steps:
+            results[step] = getattr(engineer, method)()
+    return results
+
+
+def merge_stage_outputs(frame, stage_outputs):
+    """Appliquer des sorties d'étapes dans l'ordre, comme le pipeline séquentiel
+
+    Une colonne déjà présente est remplacée à sa place, une nouvelle est ajoutée à la fin.
+    """
+    buffer = FeatureBuffer(frame)
+    for outputs in stage_outputs:
+        for name in outputs.columns:
+            buffer[name] = outputs[name]
+    return buffer.to_frame()
+
+def _run_stage(df, step, global_stats=None):
+    """Exécuter une étape dans un process du pool
+
+    df contient toutes les colonnes d'origine et les sorties des dépendances de l'étape
+    (le DataFrame complet est transmis au process). Renvoie toutes les colonnes écrites
+    par l'étape, y compris celles qui remplacent une colonne d'entrée.
+    """
+    method = dict(PIPELINE_STEPS)[step]
+    # Temps CPU du process : coût réel de l'étape, même si les workers se partagent les cœurs
+    start = time.process_time()
+    with quiet_output():
+        engineer = ForestFeatureEngineer(df, global_stats=global_stats)
+        result = getattr(engineer, method)()
+    return {
+        'step': step,
+        'result': result,
+        'columns': engineer.df[engineer.stage_outputs],
+        'new_features': engineer.new_features,
+        'feature_categories': engineer.feature_categories,
+        'seconds': time.process_time() - start
+    }
+
+def parallel_feature_engineering(df, max_workers=None, global_stats=None):
+    """Étapes indépendantes en parallèle (pool de process), selon STAGE_DEPENDENCIES
 
-def full_feature_engineering_pipeline(data_file):
-    """Pipeline complet de feature engineering"""
+    Chaque étape reçoit les colonnes d'origine et les features de ses dépendances ; les
+    étapes de ROW_LOCAL_STAGES sont en plus découpées en blocs de lignes. Les colonnes
+    écrites sont assemblées dans l'ordre du pipeline séquentiel : une colonne remplacée
+    par une étape garde sa place et prend la valeur calculée (mêmes colonnes, même ordre,
+    mêmes valeurs).
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    outputs = {}
+    partitions = {}
+    start = time.perf_counter()
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        pending = [step for step, _ in PIPELINE_STEPS]
+        while pending or running:
+            for step in [step for step in pending if all(dep in outputs for dep in STAGE_DEPENDENCIES[step])]:
+                dependencies = [outputs[dep]['columns'] for dep, _ in PIPELINE_STEPS
+                                if dep in STAGE_DEPENDENCIES[step]]
+                stage_df = merge_stage_outputs(df, dependencies) if dependencies else df
+                n_parts = min(max_workers, len(stage_df)) if step in ROW_LOCAL_STAGES else 1
+                bounds = np.linspace(0, len(stage_df), max(n_parts, 1) + 1).astype(int)
+                partitions[step] = [None] * (len(bounds) - 1)
+                for part, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+                    future = executor.submit(_run_stage, stage_df.iloc[lo:hi] if n_parts > 1 else stage_df,
+                                             step, global_stats)
+                    running[future] = (step, part, time.perf_counter() - start)
+                pending.remove(step)
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, part, started_at = running.pop(future)
+                partitions[step][part] = {**future.result(), 'started_at': started_at}
+                if all(output is not None for output in partitions[step]):
+                    parts = partitions.pop(step)
+                    outputs[step] = {
+                        **parts[0],
+                        'columns': pd.concat([output['columns'] for output in parts]) if len(parts) > 1
+                                   else parts[0]['columns'],
+                        'seconds': sum(output['seconds'] for output in parts),
+                        'partitions': len(parts),
+                        'started_at': min(output['started_at'] for output in parts),
+                        'finished_at': time.perf_counter() - start
+                    }
+    
+    engineer = ForestFeatureEngineer(df, global_stats=global_stats)
+    engineer.df = merge_stage_outputs(engineer.df, [outputs[step]['columns'] for step, _ in PIPELINE_STEPS])
+    for step, _ in PIPELINE_STEPS:
+        engineer.new_features.extend(outputs[step]['new_features'])
+        for category, features in outputs[step]['feature_categories'].items():
+            engineer.feature_categories[category].extend(features)
+    
+    wall = time.perf_counter() - start
+    sequential = sum(output['seconds'] for output in outputs.values())
+    print("\nEXECUTION PARALLELE DES ETAPES:")
+    for step, _ in PIPELINE_STEPS:
+        output = outputs[step]
+        concurrent = [other for other, _ in PIPELINE_STEPS if other != step
+                      and outputs[other]['started_at'] < output['finished_at']
+                      and output['started_at'] < outputs[other]['finished_at']]
+        elapsed = output['finished_at'] - output['started_at']
+        partitioned = f", {output['partitions']} blocs de lignes" if output['partitions'] > 1 else ''
+        print(f"   • {step}: {output['seconds']:.2f}s de calcul en {elapsed:.2f}s (x{output['seconds'] / elapsed:.2f}{partitioned})"
+              f"{', en parallèle avec ' + ', '.join(concurrent) if concurrent else ''}")
+    print(f"   • Total: {wall:.2f}s contre {sequential:.2f}s en séquentiel (accélération x{sequential / wall:.2f})")
+    
+    results = {step: outputs[step]['result'] for step, _ in PIPELINE_STEPS}
+    timings = {step: outputs[step]['seconds'] for step, _ in PIPELINE_STEPS}
+    return engineer, results, {'stages': timings, 'wall_seconds': wall, 'sequential_seconds': sequential}
+
+# ============= RECALCUL INCRÉMENTAL =============
+# 2 : les sorties incluent les colonnes d'entrée remplacées par l'étape
+CACHE_FORMAT_VERSION = 2
+
+def block_fingerprints(values, block_size):
+    """Empreinte de chaque bloc de lignes d'une colonne (hash pandas par ligne, puis blake2b)"""
+    row_hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return [hashlib.blake2b(row_hashes[start:start + block_size].tobytes(), digest_size=8).hexdigest()
+            for start in range(0, len(row_hashes), block_size)]
+
+def _encode_column(values, key, arrays):
+    """Colonne -> tableaux numpy (npz sans pickle) ; renvoie la description du manifest"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        arrays[f'{key}_codes'] = values.cat.codes.to_numpy()
+        arrays[f'{key}_categories'] = np.array(values.cat.categories.astype(str).tolist(), dtype=str)
+        return {'kind': 'category', 'ordered': bool(values.cat.ordered)}
+    if isinstance(values.dtype, np.dtype) and values.dtype != object:
+        arrays[key] = values.to_numpy()
+        return {'kind': 'array'}
+    mask = values.isna().to_numpy()
+    arrays[key] = values.astype(object).where(~mask, '').astype(str).to_numpy(dtype=str)
+    arrays[f'{key}_mask'] = mask
+    return {'kind': 'text', 'dtype': str(values.dtype)}
+
+def _decode_column(description, key, arrays, index, name):
+    if description['kind'] == 'category':
+        values = pd.Categorical.from_codes(arrays[f'{key}_codes'], categories=arrays[f'{key}_categories'],
+                                           ordered=description['ordered'])
+        return pd.Series(values, index=index, name=name)
+    if description['kind'] == 'array':
+        return pd.Series(arrays[key], index=index, name=name)
+    values = arrays[key].astype(object)
+    values[arrays[f'{key}_mask']] = np.nan
+    return pd.Series(values, index=index, name=name).astype(description['dtype'])
+
+def _concat_rows(pieces):
+    """Assembler des blocs de lignes ; catégories réunies et triées comme en calcul complet"""
+    result = pd.concat(pieces)
+    for name in pieces[0].columns:
+        if isinstance(pieces[0][name].dtype, pd.CategoricalDtype):
+            values = pd.api.types.union_categoricals([piece[name] for piece in pieces], sort_categories=True)
+            result[name] = pd.Categorical(values).remove_unused_categories()
+    return result
+
+class StageCache:
+    """Sorties d'une étape sur disque (npz colonne par colonne) et empreintes de ses entrées"""
+
+    def __init__(self, cache_dir, step):
+        self.folder = os.path.join(cache_dir, step)
+        self.manifest_path = os.path.join(self.folder, 'manifest.json')
+        self.outputs_path = os.path.join(self.folder, 'outputs.npz')
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('format_version') == CACHE_FORMAT_VERSION else None
+
+    def load_outputs(self, manifest, index):
+        with np.load(self.outputs_path, allow_pickle=False) as arrays:
+            columns = {output['name']: _decode_column(output, f'c{i}', arrays, index, output['name'])
+                       for i, output in enumerate(manifest['outputs'])}
+        return pd.DataFrame(columns, index=index)
+
+    def save(self, frame, outputs, dependencies, block_size, new_features, feature_categories):
+        os.makedirs(self.folder, exist_ok=True)
+        arrays = {}
+        descriptions = [{'name': name, **_encode_column(outputs[name], f'c{i}', arrays)}
+                        for i, name in enumerate(outputs.columns)]
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'rows': len(frame),
+            'block_size': block_size,
+            'dependencies': {
+                **dependencies,
+                'reads': {name: {'dtype': str(frame[name].dtype), 'blocks': block_fingerprints(frame[name], block_size)}
+                          for name in dependencies['reads']}
+            },
+            'outputs': descriptions,
+            'new_features': new_features,
+            'feature_categories': feature_categories
+        }
+        # Manifest écrit en dernier : un cache interrompu est simplement recalculé
+        tmp_outputs = os.path.join(self.folder, 'outputs.tmp.npz')
+        np.savez(tmp_outputs, **arrays)
+        os.replace(tmp_outputs, self.outputs_path)
+        tmp_manifest = f"{self.manifest_path}.tmp"
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+    @staticmethod
+    def changed_blocks(manifest, frame, block_size):
+        """None si tout est à recalculer, sinon l'ensemble des blocs de lignes modifiés"""
+        if manifest is None or manifest['rows'] != len(frame) or manifest['block_size'] != block_size:
+            return None
+
+        dependencies = manifest['dependencies']
+        if dependencies['columns'] is not None and dependencies['columns'] != [str(name) for name in frame.columns]:
+            return None
+        if any((name in frame.columns) != present for name, present in dependencies['probes'].items()):
+            return None
+
+        changed = set()
+        for name, cached in dependencies['reads'].items():
+            if name not in frame.columns or str(frame[name].dtype) != cached['dtype']:
+                return None
+            fingerprints = block_fingerprints(frame[name], block_size)
+            changed.update(i for i, (old, new) in enumerate(zip(cached['blocks'], fingerprints)) if old != new)
+        return changed
+
+def incremental_feature_engineering(df, cache_dir='feature_cache', block_size=10_000):
+    """Pipeline complet en ne recalculant que ce qui a changé depuis le dernier passage
+
+    Chaque étape est mise en cache (sorties + empreintes par bloc de lignes des colonnes
+    qu'elle a lues, noms testés, liste des colonnes si elle la parcourt). Au passage suivant :
+    entrées identiques -> sorties relues du cache ; blocs modifiés d'une étape ligne à ligne
+    (ROW_LOCAL_STAGES) -> seuls ces blocs sont recalculés ; sinon (statistiques globales,
+    nouvelles colonnes) -> étape recalculée en entier. Une étape dont les entrées changent
+    change souvent ses sorties : les étapes qui les lisent suivent automatiquement.
+    """
+    engineer = ForestFeatureEngineer(df)
+    report = {}
+    start = time.perf_counter()
+    
+    for step, method in PIPELINE_STEPS:
+        step_start = time.perf_counter()
+        cache = StageCache(cache_dir, step)
+        manifest = cache.load_manifest()
+        frame = engineer.df
+        changed = StageCache.changed_blocks(manifest, frame, block_size)
+        
+        if changed is not None and not changed:
+            outputs = cache.load_outputs(manifest, frame.index)
+            status = 'cache'
+        else:
+            if changed is not None and step in ROW_LOCAL_STAGES:
+                # Recalcul des seuls blocs modifiés, assemblés avec les blocs en cache
+                cached = cache.load_outputs(manifest, frame.index)
+                positions = np.concatenate([np.arange(i * block_size, min((i + 1) * block_size, len(frame)))
+                                            for i in sorted(changed)])
+                with quiet_output():
+                    partial = ForestFeatureEngineer(frame.iloc[positions])
+                    getattr(partial, method)()
+                recomputed = partial.df[[output['name'] for output in manifest['outputs']]]
+                pieces = []
+                for i in range(0, (len(frame) + block_size - 1) // block_size):
+                    rows = slice(i * block_size, (i + 1) * block_size)
+                    source = recomputed if i in changed else cached
+                    pieces.append(source.loc[frame.index[rows]])
+                outputs = _concat_rows(pieces)
+                dependencies, new_features, feature_categories = (
+                    partial.stage_dependencies, manifest['new_features'], manifest['feature_categories'])
+                status = f'{len(changed)}/{len(pieces)} blocs recalculés'
+            else:
+                with quiet_output():
+                    stage = ForestFeatureEngineer(frame)
+                    getattr(stage, method)()
+                outputs = stage.df[stage.stage_outputs]
+                dependencies, new_features, feature_categories = (
+                    stage.stage_dependencies, stage.new_features, stage.feature_categories)
+                status = 'recalcul complet'
+            cache.save(frame, outputs, dependencies, block_size, new_features, feature_categories)
+            manifest = cache.load_manifest()
+        
+        engineer.df = merge_stage_outputs(frame, [outputs])
+        engineer.new_features.extend(manifest['new_features'])
+        for category, features in manifest['feature_categories'].items():
+            engineer.feature_categories[category].extend(features)
+        report[step] = {'status': status, 'seconds': round(time.perf_counter() - step_start, 3)}
+    
+    print("\nFEATURE ENGINEERING INCREMENTAL:")
+    for step, result in report.items():
+        print(f"   • {step}: {result['status']} ({result['seconds']:.2f}s)")
+    print(f"   • Total: {time.perf_counter() - start:.2f}s")
+    
+    return engineer, report
+
+class ForestFeatureTransformer:
+    """Feature engineering entraîné une fois, appliqué ensuite à de nouvelles lignes
+
+    fit() calcule les statistiques globales (PCA, standardisation, quantiles, bornes de
+    pd.cut, catégories) sur le dataset d'entraînement ; transform() les réutilise sans
+    rien réapprendre, même sur une seule ligne, et renvoie les colonnes vues au fit.
+    L'état se sauvegarde en JSON pour être rechargé par le service de prédiction.
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, steps=None, global_stats=None, columns=None):
+        self.steps = list(steps) if steps is not None else [step for step, _ in PIPELINE_STEPS]
+        self.global_stats = global_stats
+        self.columns = columns
+
+    @property
+    def is_fitted(self):
+        return self.global_stats is not None and self.global_stats.frozen
+
+    def _run(self, df):
+        with quiet_output():
+            engineer = ForestFeatureEngineer(df, global_stats=self.global_stats)
+            run_pipeline_steps(engineer, self.steps)
+        return engineer
+
+    def fit_transform(self, df):
+        # Une seule passe suffit en mémoire : chaque statistique voit déjà tout le dataset
+        self.global_stats = GlobalStatistics()
+        self.global_stats.begin_pass()
+        engineer = self._run(df)
+        self.global_stats.end_pass()
+        self.global_stats.frozen = True
+        self.columns = list(engineer.df.columns)
+        return engineer.df
+
+    def fit(self, df):
+        self.fit_transform(df)
+        return self
+
+    def transform(self, df):
+        if not self.is_fitted:
+            raise ValueError("ForestFeatureTransformer is not fitted")
+        return self._run(df).df.reindex(columns=self.columns)
+
+    def to_dict(self):
+        return {
+            'format_version': self.FORMAT_VERSION,
+            'steps': self.steps,
+            'columns': self.columns,
+            'statistics': self.global_stats.to_dict() if self.global_stats is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('format_version') != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported transformer format: {state.get('format_version')}")
+        statistics = state['statistics']
+        global_stats = GlobalStatistics.from_dict(statistics) if statistics is not None else None
+        return cls(state['steps'], global_stats, state['columns'])
+
+    def save(self, path='forest_feature_transformer.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        return path
+
+    @classmethod
+    def load(cls, path='forest_feature_transformer.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+def full_feature_engineering_pipeline(data_file, n_jobs=1, cache_dir=None, output_format='csv'):
+    """Pipeline complet de feature engineering
+
+    n_jobs > 1 : étapes indépendantes en parallèle ; cache_dir : recalcul incrémental.
+    data_file peut être un CSV, un dataset Parquet ou un fichier Feather.
+    """
     print("PIPELINE FEATURE ENGINEERING FOREST DIGITAL TWIN")
     print("=" * 60)
     
     # Charger données
     try:
-        df = pd.read_csv(data_file)
+        df = read_dataset(data_file)
         print(f"Dataset chargé: {df.shape[0]:,} points × {df.shape[1]} features")
     except Exception as e:
         print(f"Erreur chargement: {e}")
         return None
     
-    # Initialiser Feature Engineer
-    engineer = ForestFeatureEngineer(df)
-    
-    # Exécuter toutes les étapes
-    results = {}
-    
     print("\nLancement feature engineering complet...")
     
-    results['spectral'] = engineer.create_spectral_features()
-    results['temporal'] = engineer.create_temporal_features()
-    results['topographic'] = engineer.create_topographic_features()
-    results['ecological'] = engineer.create_ecological_features()
-    results['interaction'] = engineer.create_interaction_features()
-    results['ml'] = engineer.create_ml_features()
+    if cache_dir is not None:
+        engineer, results = incremental_feature_engineering(df, cache_dir=cache_dir)
+    elif n_jobs > 1:
+        engineer, results, _ = parallel_feature_engineering(df, max_workers=n_jobs)
+    else:
+        # Initialiser Feature Engineer et exécuter toutes les étapes
+        engineer = ForestFeatureEngineer(df)
+        results = run_pipeline_steps(engineer)
+    
+    engineer.optimize_dtypes()
     
     # Résumé
     summary = engineer.generate_feature_summary()
     
     # Sauvegarde
-    output_file = engineer.save_engineered_dataset()
+    output_file = engineer.save_engineered_dataset(output_format=output_format)
     
     return {
         'engineer': engineer,
@@ -1672,6 +2501,85 @@ def full_feature_engineering_pipeline(data_file):
         'final_dataset': engineer.df
     }
 
+def chunked_feature_engineering_pipeline(data_file, output_file='forest_features_engineered.csv',
+                                         chunk_size=100_000, max_passes=10):
+    """Pipeline complet par blocs de lignes, pour un dataset plus grand que la mémoire
+
+    Les étapes ligne à ligne tournent bloc par bloc. Les statistiques globales (PCA,
+    standardisation, quantiles, bornes de pd.cut, catégories) sont accumulées sur tout le
+    fichier par des passes de collecte sans sortie, jusqu'à ce qu'une passe n'en change
+    plus aucune ; une dernière passe écrit alors la sortie avec ces statistiques figées
+    (même résultat qu'en mémoire). Mémoire : un bloc, plus les valeurs des statistiques
+    de quantile et de percentile, gardées en entier pour rester exactes (8 octets par
+    valeur non manquante : élévation globale et par région, q05/q95 des composantes de
+    santé), soit quelques dizaines d'octets par ligne du fichier.
+    """
+    print("PIPELINE FEATURE ENGINEERING PAR BLOCS")
+    print("=" * 60)
+    
+    def run_chunks():
+        for chunk in pd.read_csv(data_file, chunksize=chunk_size):
+            # Les journaux de chaque étape, bloc par bloc, n'apportent rien
+            with quiet_output():
+                engineer = ForestFeatureEngineer(chunk, global_stats=global_stats)
+                run_pipeline_steps(engineer)
+            yield engineer
+    
+    global_stats = GlobalStatistics()
+    n_rows = 0
+    
+    try:
+        for pass_number in range(1, max_passes + 1):
+            global_stats.begin_pass()
+            n_rows = sum(len(engineer.df) for engineer in run_chunks())
+            changed = global_stats.end_pass()
+            print(f"Passe {pass_number}: {n_rows:,} points, {len(global_stats.values)} statistiques globales"
+                  f"{' (modifiées)' if changed else ' (stables)'}, "
+                  f"{global_stats.retained_bytes / 1024**2:.1f} Mo de valeurs pour les quantiles")
+            if not changed:
+                break
+        else:
+            print(f"Statistiques non stabilisées après {max_passes} passes : sortie avec la dernière passe")
+    except Exception as e:
+        print(f"Erreur passe {pass_number}: {e}")
+        return None
+    
+    if n_rows == 0:
+        print("Dataset vide")
+        return None
+    
+    # Passe d'écriture unique, statistiques figées
+    tmp_file = f"{output_file}.tmp"
+    columns = None
+    engineer = None
+    try:
+        for engineer in run_chunks():
+            engineer.optimize_dtypes()
+            # Colonnes du premier bloc : en-tête CSV identique pour tous les blocs
+            if columns is None:
+                columns = list(engineer.df.columns)
+                engineer.df.to_csv(tmp_file, index=False)
+            else:
+                engineer.df.reindex(columns=columns).to_csv(tmp_file, mode='a', header=False, index=False)
+    except Exception as e:
+        print(f"Erreur écriture: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return None
+    
+    os.replace(tmp_file, output_file)
+    print(f"\nDataset avec features sauvegardé: {output_file} ({n_rows:,} points × {len(columns)} features)")
+    engineer.save_feature_list(output_file)
+    
+    return {
+        'output_file': output_file,
+        'rows': n_rows,
+        'columns': columns,
+        'new_features': engineer.new_features,
+        'passes': pass_number,
+        'global_stats': global_stats
+    }
+
 def custom_feature_engineering(data_file, steps=None):
     """Feature engineering personnalisé"""
     if steps is None:
@@ -1681,28 +2589,10 @@ def custom_feature_engineering(data_file, steps=None):
     print(f"Étapes sélectionnées: {steps}")
     print("=" * 40)
     
-    df = pd.read_csv(data_file)
+    df = read_dataset(data_file)
     engineer = ForestFeatureEngineer(df)
     
-    results = {}
-    
-    if 'spectral' in steps:
-        results['spectral'] = engineer.create_spectral_features()
-    
-    if 'temporal' in steps:
-        results['temporal'] = engineer.create_temporal_features()
-    
-    if 'topographic' in steps:
-        results['topographic'] = engineer.create_topographic_features()
-    
-    if 'ecological' in steps:
-        results['ecological'] = engineer.create_ecological_features()
-    
-    if 'interaction' in steps:
-        results['interaction'] = engineer.create_interaction_features()
-    
-    if 'ml' in steps:
-        results['ml'] = engineer.create_ml_features()
+    results = run_pipeline_steps(engineer, steps)
     
     summary = engineer.generate_feature_summary()
     
@@ -1,18 +1,39 @@
 import pandas as pd
 import numpy as np
+import json
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
+from classification import ASPECT_CLASSES, classify_table, classify_region_alerts
+from memory_optimization import optimize_dtypes, print_memory_report
+from columnar_storage import write_dataset, EXTENSIONS
+from coordinates import (
+    DEFAULT_JOIN_TOLERANCE_M, nearest_neighbour_join, standardize_coordinate_columns
+)
+from data_loader import get_data_cache
+from summary_cube import CUBE_FILE, SummaryCube
+
+REGION_CONFIG_FILE = Path(__file__).with_name('region_configs.json')
+
 class ForestDigitalTwinProcessor:
     """Processeur avancé pour les données Forest Digital Twin - Maroc"""
     
-    def __init__(self, data_folder="data"):
+    def __init__(self, data_folder="data", cache_dir=None, max_workers=None):
         self.data_folder = Path(data_folder)
         self.datasets = {}
         self.region_configs = self._load_region_configurations()
         self.column_mapping = {}
+        self.memory_report = None
+        self.join_report = None
+        # Agrégats (région, niveau d'alerte, santé) : résumés régionaux sans relire le maître
+        self.summary_cube = None
+        # Fichiers lus une fois (schéma explicite, coordonnées .geo décodées) et partagés
+        # par toutes les méthodes du module
+        self.file_cache = get_data_cache(cache_dir)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
         
         print("Forest Digital Twin Processor v2.0 initialisé")
         print(f"Dossier: {self.data_folder} | Régions: {len(self.region_configs)}")
@@ -28,7 +49,7 @@ class ForestDigitalTwinProcessor:
             if filepath.exists():
                 print(f"\nAnalyse de {filename}:")
                 try:
-                    df = pd.read_csv(filepath, nrows=3)
+                    df = self.file_cache.read(filepath, nrows=3)
                     print(f"   Colonnes ({len(df.columns)}): {list(df.columns)[:8]}...")
                     self._detect_coordinate_columns(df.columns)
                     return df.columns.tolist()
@@ -60,69 +81,12 @@ class ForestDigitalTwinProcessor:
                 self.column_mapping[standard_name] = None
         
     def _load_region_configurations(self):
-        """Configuration des seuils d'alerte par région"""
-        return {
-            'rif': {
-                'name': 'Chaîne du Rif',
-                'ecosystem': 'Forêts méditerranéennes humides',
-                'species': 'Chêne-liège, Pin maritime',
-                'climate': 'Méditerranéen humide (600-1200mm/an)',
-                'altitude_range': (200, 2000),
-                'thresholds': {
-                    'ndvi_critical': 0.5, 'ndmi_critical': 0.1, 'evi_critical': 0.3,
-                    'health_excellent': 0.65, 'health_good': 0.5, 'health_moderate': 0.35,
-                    'stress_severe': -0.1, 'stress_moderate': 0.05
-                }
-            },
-            'moyen_atlas': {
-                'name': 'Moyen Atlas',
-                'ecosystem': 'Forêts de montagne continentales',
-                'species': 'Cèdre de l\'Atlas, Chêne vert',
-                'climate': 'Continental montagnard (400-800mm/an)',
-                'altitude_range': (800, 3000),
-                'thresholds': {
-                    'ndvi_critical': 0.45, 'ndmi_critical': 0.05, 'evi_critical': 0.25,
-                    'health_excellent': 0.6, 'health_good': 0.45, 'health_moderate': 0.3,
-                    'stress_severe': -0.15, 'stress_moderate': 0.0
-                }
-            },
-            'haut_atlas': {
-                'name': 'Haut Atlas',
-                'ecosystem': 'Forêts de haute montagne arides',
-                'species': 'Thuya, Genévrier',
-                'climate': 'Montagnard aride (200-600mm/an)',
-                'altitude_range': (1000, 4000),
-                'thresholds': {
-                    'ndvi_critical': 0.4, 'ndmi_critical': 0.0, 'evi_critical': 0.2,
-                    'health_excellent': 0.55, 'health_good': 0.4, 'health_moderate': 0.25,
-                    'stress_severe': -0.2, 'stress_moderate': -0.05
-                }
-            },
-            'mamora': {
-                'name': 'Forêt de Mamora',
-                'ecosystem': 'Forêt de plaine subéreuse',
-                'species': 'Chêne-liège (monoculture)',
-                'climate': 'Méditerranéen atlantique (400-600mm/an)',
-                'altitude_range': (0, 200),
-                'thresholds': {
-                    'ndvi_critical': 0.4, 'ndmi_critical': 0.0, 'evi_critical': 0.2,
-                    'health_excellent': 0.6, 'health_good': 0.4, 'health_moderate': 0.25,
-                    'stress_severe': -0.1, 'stress_moderate': 0.0
-                }
-            },
-            'argan': {
-                'name': 'Écosystème Arganier',
-                'ecosystem': 'Forêt aride endémique (UNESCO)',
-                'species': 'Arganier (Argania spinosa)',
-                'climate': 'Aride à semi-aride (150-400mm/an)',
-                'altitude_range': (0, 1500),
-                'thresholds': {
-                    'ndvi_critical': 0.35, 'ndmi_critical': -0.1, 'evi_critical': 0.15,
-                    'health_excellent': 0.5, 'health_good': 0.35, 'health_moderate': 0.2,
-                    'stress_severe': -0.25, 'stress_moderate': -0.1
-                }
-            }
-        }
+        """Configuration des seuils d'alerte par région (region_configs.json, partagé avec le backend)"""
+        with open(REGION_CONFIG_FILE, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+        for config in configs.values():
+            config['altitude_range'] = tuple(config['altitude_range'])
+        return configs
     
     def load_all_data(self):
         """Charger tous les fichiers avec métadonnées"""
@@ -156,33 +120,29 @@ class ForestDigitalTwinProcessor:
         
         loaded_data = []
         
-        for region_detail, filename in sample_files.items():
-            filepath = self.data_folder / filename
+        def prepare(df, region_detail, filename):
+            region_main = self._get_main_region(region_detail)
             
-            if filepath.exists():
-                try:
-                    df = pd.read_csv(filepath)
-                    region_main = self._get_main_region(region_detail)
-                    
-                    df['region_detail'] = region_detail
-                    df['region_main'] = region_main
-                    df['data_type'] = 'sample'
-                    df['file_source'] = filename
-                    
-                    if region_main in self.region_configs:
-                        config = self.region_configs[region_main]
-                        df['ecosystem_type'] = config['ecosystem']
-                        df['dominant_species'] = config['species']
-                        df['climate_type'] = config['climate']
-                    
-                    df = self._standardize_coordinate_columns(df)
-                    loaded_data.append(df)
-                    print(f"   {filename}: {len(df)} points ({region_main})")
-                    
-                except Exception as e:
-                    print(f"   Erreur {filename}: {e}")
-            else:
+            df['region_detail'] = region_detail
+            df['region_main'] = region_main
+            df['data_type'] = 'sample'
+            df['file_source'] = filename
+            
+            if region_main in self.region_configs:
+                config = self.region_configs[region_main]
+                df['ecosystem_type'] = config['ecosystem']
+                df['dominant_species'] = config['species']
+                df['climate_type'] = config['climate']
+            return df
+        
+        for region_detail, filename, result in self._load_files(sample_files, prepare):
+            if result is None:
                 print(f"   {filename}: Non trouvé")
+            elif isinstance(result, Exception):
+                print(f"   Erreur {filename}: {result}")
+            else:
+                loaded_data.append(result)
+                print(f"   {filename}: {len(result)} points ({result['region_main'].iloc[0] if len(result) else region_detail})")
         
         if loaded_data:
             self.datasets['samples_all'] = pd.concat(loaded_data, ignore_index=True)
@@ -194,31 +154,31 @@ class ForestDigitalTwinProcessor:
         
         return loaded_data
     
-    def _standardize_coordinate_columns(self, df):
-        """Standardiser les noms des colonnes de coordonnées"""
-        for col in df.columns:
-            col_lower = col.lower()
-            
-            if any(x in col_lower for x in ['lon', 'x', 'lng']) and 'longitude' not in df.columns:
-                df = df.rename(columns={col: 'longitude'})
-            elif any(x in col_lower for x in ['lat', 'y']) and 'latitude' not in df.columns:
-                df = df.rename(columns={col: 'latitude'})
-        
-        if '.geo' in df.columns and ('longitude' not in df.columns or 'latitude' not in df.columns):
+    def _load_files(self, files, prepare):
+        """Lire les fichiers {clé: nom} en parallèle (threads), dans l'ordre du dictionnaire
+
+        Chaque fichier est lu, complété par prepare(df, clé, nom) puis ses coordonnées
+        standardisées. Renvoie (clé, nom, DataFrame | Exception | None si absent).
+        """
+        def load(item):
+            key, filename = item
+            filepath = self.data_folder / filename
+            if not filepath.exists():
+                return key, filename, None
             try:
-                import json
-                geo_sample = df['.geo'].iloc[0]
-                if isinstance(geo_sample, str):
-                    geo_data = json.loads(geo_sample)
-                    if 'coordinates' in geo_data:
-                        coords = geo_data['coordinates']
-                        if len(coords) >= 2:
-                            df['longitude'] = df['.geo'].apply(lambda x: json.loads(x)['coordinates'][0] if pd.notna(x) else None)
-                            df['latitude'] = df['.geo'].apply(lambda x: json.loads(x)['coordinates'][1] if pd.notna(x) else None)
-            except:
-                pass
+                df = prepare(self.file_cache.read(filepath), key, filename)
+                return key, filename, self._standardize_coordinate_columns(df, source=filepath)
+            except Exception as e:
+                return key, filename, e
         
-        return df
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(load, files.items()))
+    
+    def _standardize_coordinate_columns(self, df, source=None):
+        """Standardiser les noms des colonnes de coordonnées (.geo décodé par le cache de lecture)"""
+        if source is None:
+            return standardize_coordinate_columns(df)
+        return standardize_coordinate_columns(df, lambda geo: self.file_cache.coordinates(source))
     
     def load_timeseries_files(self):
         """Charger les fichiers timeseries"""
@@ -234,24 +194,20 @@ class ForestDigitalTwinProcessor:
         
         loaded_timeseries = []
         
-        for region_name, filename in timeseries_files.items():
-            filepath = self.data_folder / filename
-            
-            if filepath.exists():
-                try:
-                    df = pd.read_csv(filepath)
-                    df['region_main'] = region_name
-                    df['data_type'] = 'timeseries'
-                    df['file_source'] = filename
-                    df = self._standardize_coordinate_columns(df)
-                    
-                    loaded_timeseries.append(df)
-                    print(f"   {filename}: {len(df)} points")
-                    
-                except Exception as e:
-                    print(f"   Erreur {filename}: {e}")
-            else:
+        def prepare(df, region_name, filename):
+            df['region_main'] = region_name
+            df['data_type'] = 'timeseries'
+            df['file_source'] = filename
+            return df
+        
+        for region_name, filename, result in self._load_files(timeseries_files, prepare):
+            if result is None:
                 print(f"   {filename}: Non trouvé")
+            elif isinstance(result, Exception):
+                print(f"   Erreur {filename}: {result}")
+            else:
+                loaded_timeseries.append(result)
+                print(f"   {filename}: {len(result)} points")
         
         if loaded_timeseries:
             self.datasets['timeseries_all'] = pd.concat(loaded_timeseries, ignore_index=True)
@@ -268,15 +224,20 @@ class ForestDigitalTwinProcessor:
         else:
             return region_detail
     
-    def create_master_dataset(self):
-        """Créer le dataset maître avec fusion robuste"""
+    def create_master_dataset(self, tolerance_m=DEFAULT_JOIN_TOLERANCE_M):
+        """Créer le dataset maître avec fusion robuste
+
+        Échantillons et séries temporelles sont appariés au plus proche voisin (KD-tree
+        par région, à tolerance_m mètres au plus) ; statistiques dans self.join_report.
+        """
         print("\nCréation du dataset maître...")
         
         if 'samples_all' not in self.datasets:
             print("Charger d'abord les fichiers samples")
             return
         
-        master = self.datasets['samples_all'].copy()
+        # Copie superficielle (copy-on-write) : les colonnes ajoutées ne touchent pas samples_all
+        master = self.datasets['samples_all'].copy(deep=False)
         
         if 'timeseries_all' in self.datasets:
             timeseries = self.datasets['timeseries_all']
@@ -285,28 +246,26 @@ class ForestDigitalTwinProcessor:
             has_coords_timeseries = 'longitude' in timeseries.columns and 'latitude' in timeseries.columns
             
             if has_coords_master and has_coords_timeseries:
-                print("   Fusion avec données temporelles (coordonnées)...")
-                
-                master['lat_round'] = master['latitude'].round(4)
-                master['lon_round'] = master['longitude'].round(4)
-                timeseries['lat_round'] = timeseries['latitude'].round(4)
-                timeseries['lon_round'] = timeseries['longitude'].round(4)
+                print("   Fusion avec données temporelles (plus proche voisin par région)...")
                 
                 temporal_cols = ['NDVI_2020', 'NDVI_2021', 'NDVI_2022', 'NDVI_2023', 'NDVI_2024']
                 available_temporal_cols = [col for col in temporal_cols if col in timeseries.columns]
                 
                 if available_temporal_cols:
-                    timeseries_subset = timeseries[['region_main', 'lat_round', 'lon_round'] + available_temporal_cols]
-                    
-                    master = master.merge(
-                        timeseries_subset,
-                        on=['region_main', 'lat_round', 'lon_round'],
-                        how='left',
-                        suffixes=('', '_temporal')
+                    temporal, self.join_report = nearest_neighbour_join(
+                        master, timeseries, available_temporal_cols, by='region_main', tolerance_m=tolerance_m
                     )
+                    temporal.columns = [f'{col}_temporal' if col in master.columns else col
+                                        for col in available_temporal_cols]
+                    master = pd.concat([master, temporal], axis=1)
                     
-                    master = master.drop(['lat_round', 'lon_round'], axis=1)
+                    report = self.join_report
                     print(f"   Fusion réussie: {len(available_temporal_cols)} variables temporelles")
+                    print(f"   Points appariés: {report['matched']}/{report['rows']} ({report['match_rate']:.1%}, "
+                          f"≤ {tolerance_m} m, distance moyenne {report['mean_distance_m']} m)")
+                    for region, stats in report['by_region'].items():
+                        if stats['matched'] < stats['rows']:
+                            print(f"     • {region}: {stats['rows'] - stats['matched']} points sans série temporelle")
                 else:
                     print("   Aucune variable temporelle NDVI trouvée")
             else:
@@ -323,6 +282,7 @@ class ForestDigitalTwinProcessor:
                     print(f"   Fusion régionale réussie")
         
         self.datasets['master'] = master
+        self.summary_cube = None
         print(f"\nDataset maître créé: {len(master)} points, {len(master.columns)} variables")
         
         return master
@@ -345,9 +305,14 @@ class ForestDigitalTwinProcessor:
         df = self._add_available_health_stress_indices(df)
         df = self._add_available_region_alerts(df)
         
+        # Types compacts : float32, petits entiers, labels en category
+        df, self.memory_report = optimize_dtypes(df)
+        
         self.datasets['master'] = df
+        self.summary_cube = SummaryCube.from_frame(df)
         added_vars = len(df.columns) - initial_cols
         print(f"\n{added_vars} variables dérivées ajoutées. Total: {len(df.columns)}")
+        print_memory_report(self.memory_report, indent='     ')
         
         return df
     
@@ -464,19 +429,7 @@ class ForestDigitalTwinProcessor:
             df['eastness'] = df['slope'] * np.sin(np.radians(df['aspect']))
             added += 2
             
-            def classify_aspect(aspect):
-                if pd.isna(aspect):
-                    return 'Unknown'
-                elif 315 <= aspect or aspect < 45:
-                    return 'Nord'
-                elif 45 <= aspect < 135:
-                    return 'Est'
-                elif 135 <= aspect < 225:
-                    return 'Sud'
-                else:
-                    return 'Ouest'
-            
-            df['aspect_class'] = df['aspect'].apply(classify_aspect)
+            df['aspect_class'] = classify_table(df['aspect'], ASPECT_CLASSES)
             added += 1
         
         if 'precipitation' in df.columns and 'slope' in df.columns:
@@ -523,34 +476,7 @@ class ForestDigitalTwinProcessor:
             print("Alertes non calculées: region_main manquante")
             return df
         
-        df['alert_level'] = 'Normal'
-        df['alert_color'] = 'Green'
-        df['alert_priority'] = 0
-        
-        for region, config in self.region_configs.items():
-            region_mask = df['region_main'] == region
-            if not region_mask.any():
-                continue
-                
-            thresholds = config['thresholds']
-            critical_conditions = []
-            
-            if 'NDVI' in df.columns:
-                critical_conditions.append(df.loc[region_mask, 'NDVI'] < thresholds['ndvi_critical'])
-                
-            if 'NDMI' in df.columns:
-                critical_conditions.append(df.loc[region_mask, 'NDMI'] < thresholds['ndmi_critical'])
-                
-            if 'EVI' in df.columns:
-                critical_conditions.append(df.loc[region_mask, 'EVI'] < thresholds['evi_critical'])
-            
-            if critical_conditions:
-                critical_count = sum(cond.astype(int) for cond in critical_conditions)
-                
-                df.loc[region_mask & (critical_count == 0), ['alert_level', 'alert_color', 'alert_priority']] = ['Normal', 'Green', 0]
-                df.loc[region_mask & (critical_count == 1), ['alert_level', 'alert_color', 'alert_priority']] = ['Attention', 'Yellow', 1]
-                df.loc[region_mask & (critical_count == 2), ['alert_level', 'alert_color', 'alert_priority']] = ['Alerte', 'Orange', 2]
-                df.loc[region_mask & (critical_count >= 3), ['alert_level', 'alert_color', 'alert_priority']] = ['Critique', 'Red', 3]
+        df['alert_level'], df['alert_color'], df['alert_priority'] = classify_region_alerts(df, self.region_configs)
         
         print(f"Système d'alertes configuré pour {len(self.region_configs)} régions")
         return df
@@ -589,70 +515,99 @@ class ForestDigitalTwinProcessor:
                     print(f"   Dégradée (<0.4): {poor} ({poor/total*100:.1f}%)")
             return
         
-        for region in df['region_main'].unique():
-            if pd.isna(region):
-                continue
-            region_data = df[df['region_main'] == region]
+        # Une entrée du cube par région au lieu d'un filtrage du maître par région
+        cube = self.get_summary_cube()
+        for region in cube.regions():
+            summary = cube.region_summary(region)
             config = self.region_configs.get(region, {})
             print(f"\n{config.get('name', region).upper()}")
-            print(f"   Total: {len(region_data)} points")
-            alert_counts = region_data['alert_level'].value_counts()
-            total_points = len(region_data)
+            print(f"   Total: {summary['points']} points")
+            alert_counts = summary.get('alert_level', {})
+            total_points = summary['points']
             for level in ['Normal', 'Attention', 'Alerte', 'Critique']:
                 count = alert_counts.get(level, 0)
                 percentage = (count / total_points * 100) if total_points > 0 else 0
                 print(f"   {level}: {count} ({percentage:.1f}%)")
-            if 'NDVI' in region_data.columns:
-                ndvi_mean = region_data['NDVI'].mean()
-                print(f"   NDVI moyen: {ndvi_mean:.3f}")
+            if 'NDVI' in summary and summary['NDVI']['mean'] is not None:
+                print(f"   NDVI moyen: {summary['NDVI']['mean']:.3f}")
     
-    def save_processed_datasets(self, output_folder="processed_data"):
-        """Sauvegarder tous les datasets traités"""
-        print(f"\nSauvegarde dans {output_folder}/...")
+    def get_summary_cube(self):
+        """Cube de résumé du maître, construit à la demande s'il n'existe pas encore"""
+        if self.summary_cube is None and 'master' in self.datasets:
+            self.summary_cube = SummaryCube.from_frame(self.datasets['master'])
+        return self.summary_cube
+    
+    def save_processed_datasets(self, output_folder="processed_data", output_format="csv"):
+        """Sauvegarder tous les datasets traités
+
+        output_format : 'csv', 'parquet' ou 'feather' (dtypes et catégories conservés).
+        En Parquet, master et timeseries sont partitionnés par region_main (un dossier
+        region_main=<région> par région) à la place des fichiers par région.
+        """
+        print(f"\nSauvegarde dans {output_folder}/ ({output_format})...")
         
         output_path = Path(output_folder)
         output_path.mkdir(exist_ok=True)
+        extension = EXTENSIONS[output_format]
         saved_files = []
         
+        def partitions(df):
+            if output_format == 'parquet' and 'region_main' in df.columns:
+                return ['region_main']
+            return None
+        
         if 'master' in self.datasets:
-            master_file = output_path / "forest_digital_twin_master.csv"
+            master_file = output_path / f"forest_digital_twin_master{extension}"
             try:
-                self.datasets['master'].to_csv(master_file, index=False)
+                write_dataset(self.datasets['master'], master_file, output_format,
+                              partition_cols=partitions(self.datasets['master']))
                 saved_files.append(master_file.name)
                 print(f"   {master_file.name}: {len(self.datasets['master'])} lignes")
             except Exception as e:
                 print(f"   Erreur master: {e}")
         
-        if 'master' in self.datasets and 'region_main' in self.datasets['master'].columns:
+        if ('master' in self.datasets and 'region_main' in self.datasets['master'].columns
+                and partitions(self.datasets['master']) is None):
             try:
                 for region in self.datasets['master']['region_main'].unique():
                     if not pd.isna(region):
                         region_data = self.datasets['master'][self.datasets['master']['region_main'] == region]
-                        region_file = output_path / f"forest_dt_{region}_complete.csv"
-                        region_data.to_csv(region_file, index=False)
+                        region_file = output_path / f"forest_dt_{region}_complete{extension}"
+                        write_dataset(region_data, region_file, output_format)
                         saved_files.append(region_file.name)
                         print(f"   {region_file.name}: {len(region_data)} lignes")
             except Exception as e:
                 print(f"   ⚠️  Sauvegarde régions échouée: {e}")
         
         if 'samples_all' in self.datasets and 'master' not in self.datasets:
-            simple_file = output_path / "forest_samples_combined.csv"
+            simple_file = output_path / f"forest_samples_combined{extension}"
             try:
-                self.datasets['samples_all'].to_csv(simple_file, index=False)
+                write_dataset(self.datasets['samples_all'], simple_file, output_format,
+                              partition_cols=partitions(self.datasets['samples_all']))
                 saved_files.append(simple_file.name)
                 print(f"   {simple_file.name}: {len(self.datasets['samples_all'])} lignes")
             except Exception as e:
                 print(f"   Erreur simple: {e}")
         
         if 'timeseries_all' in self.datasets:
-            timeseries_file = output_path / "forest_timeseries_combined.csv"
+            timeseries_file = output_path / f"forest_timeseries_combined{extension}"
             try:
-                self.datasets['timeseries_all'].to_csv(timeseries_file, index=False)
+                write_dataset(self.datasets['timeseries_all'], timeseries_file, output_format,
+                              partition_cols=partitions(self.datasets['timeseries_all']))
                 saved_files.append(timeseries_file.name)
                 print(f"   {timeseries_file.name}: {len(self.datasets['timeseries_all'])} lignes")
             except Exception as e:
                 print(f"   Erreur timeseries: {e}")
         
+        if 'master' in self.datasets and 'region_main' in self.datasets['master'].columns:
+            cube_file = output_path / CUBE_FILE
+            try:
+                self.get_summary_cube().save(cube_file)
+                saved_files.append(cube_file.name)
+                print(f"   {cube_file.name}: {len(self.summary_cube.cube)} cellules")
+            except Exception as e:
+                print(f"   Erreur cube: {e}")
+        
         try:
             metadata_file = output_path / "dataset_metadata.txt"
             self._save_metadata(metadata_file)
@@ -705,8 +660,10 @@ class ForestDigitalTwinProcessor:
         
         if 'region_main' in df.columns:
             print(f"\nRepartition regionale:")
-            region_counts = df['region_main'].value_counts()
-            for region, count in region_counts.items():
+            cube = self.get_summary_cube()
+            region_counts = sorted(((region, cube.region_summary(region)['points']) for region in cube.regions()),
+                                   key=lambda item: item[1], reverse=True)
+            for region, count in region_counts:
                 print(f"   - {region}: {count:,} ({count/len(df)*100:.1f}%)")
         
         key_vars = ['NDVI', 'NDMI', 'EVI', 'NBR', 'elevation', 'temperature', 'precipitation']
@@ -734,7 +691,7 @@ class ForestDigitalTwinProcessor:
             filepath = self.data_folder / filename
             if filepath.exists():
                 try:
-                    df = pd.read_csv(filepath, nrows=5)
+                    df = self.file_cache.read(filepath, nrows=5)
                     print(f"\n{filename}")
                     print(f"   Taille: {df.shape}")
                     print(f"   Colonnes: {list(df.columns)[:10]}{'...' if len(df.columns) > 10 else ''}")
@@ -761,7 +718,7 @@ def main():
     print("FOREST DIGITAL TWIN - PIPELINE v2.0")
     print("=" * 60)
     
-    processor = ForestDigitalTwinProcessor(data_folder=".")
+    processor = ForestDigitalTwinProcessor(data_folder=".", cache_dir="processed_data/cache")
     
     try:
         processor.load_all_data()
@@ -823,15 +780,18 @@ def test_data_loading():
     loaded_count = 0
     total_points = 0
     
+    existing = [filename for filename in test_files if os.path.exists(filename)]
+    results = dict(zip(existing, get_data_cache().read_many(existing)))
+    
     for filename in test_files:
-        if os.path.exists(filename):
-            try:
-                df = pd.read_csv(filename)
+        if filename in results:
+            df = results[filename]
+            if isinstance(df, Exception):
+                print(f"{filename}: {df}")
+            else:
                 print(f"{filename}: {len(df)} points")
                 loaded_count += 1
                 total_points += len(df)
-            except Exception as e:
-                print(f"{filename}: {e}")
         else:
             print(f"{filename}: Non trouvé")
     
@@ -871,10 +831,15 @@ def simple_combine():
     
     all_data = []
     
+    # Lecture concurrente de tous les fichiers ; les boucles ci-dessous lisent le cache
+    cache = get_data_cache()
+    cache.read_many([filename for files in (sample_files, haut_atlas_files, argan_files)
+                     for filename in files.values() if os.path.exists(filename)])
+    
     for region, filename in sample_files.items():
         if os.path.exists(filename):
             try:
-                df = pd.read_csv(filename)
+                df = cache.read(filename)
                 df['region'] = region
                 df['region_type'] = 'simple'
                 all_data.append(df)
@@ -886,7 +851,7 @@ def simple_combine():
     for sub_region, filename in haut_atlas_files.items():
         if os.path.exists(filename):
             try:
-                df = pd.read_csv(filename)
+                df = cache.read(filename)
                 df['sub_region'] = sub_region
                 haut_atlas_data.append(df)
                 print(f"✅ {sub_region}: {len(df)} points")
@@ -904,7 +869,7 @@ def simple_combine():
     for sub_region, filename in argan_files.items():
         if os.path.exists(filename):
             try:
-                df = pd.read_csv(filename)
+                df = cache.read(filename)
                 df['sub_region'] = sub_region
                 argan_data.append(df)
                 print(f"✅ {sub_region}: {len(df)} points")
@@ -0,0 +1,82 @@
+"""Benchmark du percentile d'altitude : percentileofscore ligne à ligne vs tri + searchsorted
+
+    python benchmark_percentiles.py
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from Feature_Engineering import percentile_of_scores, percentiles_by_group
+
+REGIONS = ['rif', 'moyen_atlas', 'haut_atlas', 'mamora', 'argan']
+ROWWISE_MAX_ROWS = 32_000  # au-delà, l'ancienne méthode prend plusieurs minutes
+
+
+def make_points(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    elevation = rng.gamma(4.0, 300.0, n_rows).round()  # ex aequo comme dans un MNT arrondi
+    elevation[rng.random(n_rows) < 0.01] = np.nan
+    return pd.DataFrame({'elevation': elevation, 'region_main': rng.choice(REGIONS, n_rows)})
+
+
+def rowwise_percentile(df):
+    """Ancienne implémentation : un balayage complet de la colonne par ligne (O(n²))"""
+    reference = df['elevation'].dropna()
+    return df['elevation'].apply(lambda value: stats.percentileofscore(reference, value) if pd.notna(value) else np.nan)
+
+
+def sorted_percentile(df):
+    values = df['elevation']
+    return percentile_of_scores(np.sort(values.dropna().to_numpy()), values)
+
+
+def regional_percentile(df):
+    values = df['elevation']
+    return percentiles_by_group(values, df['region_main'],
+                                lambda group, positions: np.sort(values.iloc[positions].dropna().to_numpy()))
+
+
+def timed(function, df):
+    start = time.perf_counter()
+    result = function(df)
+    return time.perf_counter() - start, np.asarray(result, dtype=np.float64)
+
+
+def run_benchmark(sizes=(2_000, 8_000, 32_000, 100_000, 1_000_000)):
+    print(f"{'lignes':>10} {'ligne à ligne':>14} {'tri':>10} {'par région':>11} {'écart max':>10}")
+    rows = []
+    for n_rows in sizes:
+        df = make_points(n_rows)
+        rowwise_seconds, max_error = np.nan, np.nan
+        sorted_seconds, fast = timed(sorted_percentile, df)
+        regional_seconds, _ = timed(regional_percentile, df)
+
+        if n_rows <= ROWWISE_MAX_ROWS:
+            rowwise_seconds, slow = timed(rowwise_percentile, df)
+            max_error = np.nanmax(np.abs(slow - fast))
+
+        rows.append({'rows': n_rows, 'rowwise_s': rowwise_seconds, 'sorted_s': sorted_seconds,
+                     'regional_s': regional_seconds, 'max_error': max_error})
+        rowwise = f"{rowwise_seconds:.3f}s" if n_rows <= ROWWISE_MAX_ROWS else '-'
+        error = f"{max_error:.2g}" if n_rows <= ROWWISE_MAX_ROWS else '-'
+        print(f"{n_rows:>10,} {rowwise:>14} {sorted_seconds:>9.4f}s {regional_seconds:>10.4f}s {error:>10}")
+
+    results = pd.DataFrame(rows)
+    measured = results.dropna(subset=['rowwise_s'])
+    if len(measured) >= 2:
+        # Pente log-log : ~2 pour la méthode ligne à ligne, ~1 pour le tri
+        exponent = np.polyfit(np.log(measured['rows']), np.log(measured['rowwise_s']), 1)[0]
+        last = measured.iloc[-1]
+        estimate = last['rowwise_s'] * (300_000 / last['rows']) ** exponent
+        print(f"\nLigne à ligne : temps ∝ n^{exponent:.2f}, ~{estimate / 60:.0f} min estimées pour 300 000 points")
+    large = results[results['rows'] >= 100_000]
+    if len(large) >= 2:
+        exponent = np.polyfit(np.log(large['rows']), np.log(large['sorted_s']), 1)[0]
+        print(f"Tri + searchsorted : temps ∝ n^{exponent:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+UNKNOWN = 'Unknown'
+
+# ============= TABLES DE SEUILS =============
+# edges : bornes croissantes, labels : une classe par intervalle (len(edges) + 1)
+# right=False : [a, b[ (comparaisons "<"), right=True : ]a, b] (comparaisons "<=")
+ELEVATION_ZONES = {
+    'edges': [500, 1000, 1500, 2500],
+    'labels': ['Lowland', 'Colline', 'Montane_Low', 'Montane_High', 'Alpine'],
+    'right': False
+}
+
+SLOPE_CLASSES = {
+    'edges': [2, 5, 15, 30],
+    'labels': ['Very_Gentle', 'Gentle', 'Moderate', 'Steep', 'Very_Steep'],
+    'right': False
+}
+
+HEALTH_CLASSES = {
+    'edges': [0.2, 0.4, 0.6, 0.8],
+    'labels': ['Critical', 'Poor', 'Fair', 'Good', 'Excellent'],
+    'right': False
+}
+
+RISK_CLASSES = {
+    'edges': [0.2, 0.4, 0.6],
+    'labels': ['Low_Risk', 'Moderate_Risk', 'High_Risk', 'Critical_Risk'],
+    'right': True
+}
+
+# Secteurs d'exposition : le nord est à cheval sur 0°
+ASPECT_CLASSES = {
+    'edges': [45, 135, 225, 315],
+    'labels': ['Nord', 'Est', 'Sud', 'Ouest', 'Nord'],
+    'right': False
+}
+
+# Niveaux d'alerte régionaux : indice = nombre d'indicateurs sous leur seuil critique (plafonné)
+ALERT_LEVELS = {
+    'labels': ['Normal', 'Attention', 'Alerte', 'Critique'],
+    'colors': ['Green', 'Yellow', 'Orange', 'Red'],
+    'priorities': [0, 1, 2, 3]
+}
+
+# Indicateur -> clé du seuil critique dans la configuration d'une région
+ALERT_INDICATORS = [('NDVI', 'ndvi_critical'), ('NDMI', 'ndmi_critical'), ('EVI', 'evi_critical')]
+
+
+# ============= MOTEUR =============
+def _to_categorical(codes, categories):
+    """Codes -> Categorical aux catégories triées et limitées aux valeurs présentes
+
+    Même jeu de colonnes (et même ordre) que les chaînes d'origine pour pd.get_dummies
+    et LabelEncoder, pour un octet par ligne au lieu d'une chaîne Python.
+    """
+    result = pd.Categorical.from_codes(codes, categories=categories).remove_unused_categories()
+    return result.reorder_categories(sorted(result.categories))
+
+
+def classify_by_thresholds(values, edges, labels, right=False, unknown=UNKNOWN):
+    """Classer des valeurs numériques par intervalles (np.digitize), NaN -> unknown"""
+    values = np.asarray(values, dtype=np.float64)
+    categories = list(dict.fromkeys(labels)) + [unknown]
+    label_codes = np.array([categories.index(label) for label in labels])
+
+    codes = label_codes[np.digitize(values, edges, right=right)]
+    codes[np.isnan(values)] = categories.index(unknown)
+    return _to_categorical(codes, categories)
+
+
+def classify_table(values, table, unknown=UNKNOWN):
+    return classify_by_thresholds(values, table['edges'], table['labels'], right=table['right'], unknown=unknown)
+
+
+def classify_by_rules(rules, default, unknown_mask=None, unknown=UNKNOWN):
+    """Classer par règles ordonnées (np.select) : la première condition vraie l'emporte
+
+    rules : liste de (condition booléenne, label). Une comparaison avec NaN est fausse,
+    comme dans les fonctions ligne à ligne remplacées.
+    """
+    labels = [label for _, label in rules]
+    categories = list(dict.fromkeys(labels + [default, unknown]))
+
+    codes = np.select(
+        [np.asarray(condition, dtype=bool) for condition, _ in rules],
+        [categories.index(label) for label in labels],
+        default=categories.index(default)
+    )
+    if unknown_mask is not None:
+        codes = np.where(np.asarray(unknown_mask, dtype=bool), categories.index(unknown), codes)
+    return _to_categorical(codes, categories)
+
+
+# ============= CLASSIFICATIONS MÉTIER =============
+def classify_exposure(aspect, slope):
+    aspect = np.asarray(aspect, dtype=np.float64)
+    slope = np.asarray(slope, dtype=np.float64)
+    return classify_by_rules([
+        (slope < 5, 'Flat'),
+        ((aspect >= 135) & (aspect <= 225), 'South_facing'),
+        ((aspect >= 315) | (aspect <= 45), 'North_facing'),
+        ((aspect > 45) & (aspect < 135), 'East_facing')
+    ], default='West_facing', unknown_mask=np.isnan(aspect))
+
+
+def classify_topo_position(elevation_percentile, slope, unknown_mask):
+    elevation_percentile = np.asarray(elevation_percentile, dtype=np.float64)
+    slope = np.asarray(slope, dtype=np.float64)
+    high = elevation_percentile > 70
+    return classify_by_rules([
+        ((slope < 3) & high, 'Plateau'),
+        (slope < 3, 'Valley_Floor'),
+        (slope < 15, 'Mid_Slope'),
+        (high, 'Ridge')
+    ], default='Steep_Slope', unknown_mask=unknown_mask)
+
+
+def classify_management_priority(health, risk):
+    health = np.asarray(health, dtype=np.float64)
+    risk = np.asarray(risk, dtype=np.float64)
+    return classify_by_rules([
+        ((health < 0.3) & (risk > 0.6), 'Urgent_Intervention'),
+        ((health < 0.5) & (risk > 0.4), 'High_Priority'),
+        ((health < 0.7) | (risk > 0.3), 'Moderate_Priority')
+    ], default='Low_Priority', unknown_mask=np.isnan(health) | np.isnan(risk))
+
+
+def classify_region_alerts(df, region_configs, region_column='region_main'):
+    """Niveau, couleur et priorité d'alerte de chaque ligne selon les seuils de sa région
+
+    Les seuils deviennent des tableaux indexés par le code de région : une comparaison
+    vectorisée par indicateur, puis des tables de correspondance. Région inconnue,
+    indicateur absent ou NaN : condition non remplie (niveau Normal).
+    Renvoie (alert_level, alert_color, alert_priority).
+    """
+    regions = list(region_configs)
+    # Code -1 (région inconnue ou NaN) -> dernière case des tableaux de seuils : NaN
+    codes = pd.Categorical(df[region_column], categories=regions).codes
+    critical_count = np.zeros(len(df), dtype=np.int8)
+
+    for column, key in ALERT_INDICATORS:
+        if column not in df.columns:
+            continue
+        thresholds = np.array([region_configs[region]['thresholds'][key] for region in regions] + [np.nan])
+        with np.errstate(invalid='ignore'):
+            critical_count += df[column].to_numpy(dtype=np.float64) < thresholds[codes]
+
+    level = np.minimum(critical_count, len(ALERT_LEVELS['labels']) - 1)
+    alert_level = pd.Categorical.from_codes(level, categories=ALERT_LEVELS['labels'])
+    alert_color = pd.Categorical.from_codes(level, categories=ALERT_LEVELS['colors'])
+    alert_priority = np.array(ALERT_LEVELS['priorities'], dtype=np.uint8)[level]
+    return alert_level, alert_color, alert_priority
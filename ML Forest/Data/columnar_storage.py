@@ -0,0 +1,125 @@
+import json
+import os
+
+import pandas as pd
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'feather')
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+# Opérateurs des filtres (même forme que pyarrow : [('region_main', '==', 'rif'), ('NDVI', '<', 0.3)])
+_OPERATORS = {
+    '==': lambda values, target: values == target,
+    '=': lambda values, target: values == target,
+    '!=': lambda values, target: values != target,
+    '<': lambda values, target: values < target,
+    '<=': lambda values, target: values <= target,
+    '>': lambda values, target: values > target,
+    '>=': lambda values, target: values >= target,
+    'in': lambda values, target: values.isin(target),
+    'not in': lambda values, target: ~values.isin(target)
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet/Feather output requires pyarrow (pip install pyarrow)")
+
+
+def dataset_format(path):
+    """Format déduit de l'extension (un dataset Parquet partitionné est un dossier *.parquet)"""
+    extension = os.path.splitext(str(path).rstrip('/\\'))[1].lower()
+    for output_format, known_extension in EXTENSIONS.items():
+        if extension == known_extension:
+            return output_format
+    raise ValueError(f"Unknown dataset format: {path}")
+
+
+def dataset_path(path, output_format):
+    """Même nom de fichier, extension du format demandé"""
+    return os.path.splitext(str(path))[0] + EXTENSIONS[output_format]
+
+
+def write_dataset(df, path, output_format=None, partition_cols=None):
+    """Écrire un DataFrame en CSV, Parquet ou Feather (dtypes et catégories conservés hors CSV)
+
+    Parquet : partition_cols (ex. ['region_main']) donne un dossier par valeur ; les
+    partitions réécrites remplacent les anciennes.
+    """
+    output_format = output_format or dataset_format(path)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    if output_format == 'csv':
+        df.to_csv(path, index=False)
+        return path
+
+    _require_pyarrow()
+    if output_format == 'parquet':
+        if partition_cols:
+            df.to_parquet(path, index=False, partition_cols=list(partition_cols),
+                          existing_data_behavior='delete_matching')
+        else:
+            df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+    return path
+
+
+def _filter_frame(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for column, operator, target in filters:
+        mask &= _OPERATORS[operator](df[column], target)
+    return df[mask]
+
+
+def _restore_pandas_layout(df, schema, columns):
+    """Partitions Parquet : la colonne revient en texte et en dernière position
+
+    Les métadonnées pandas des fichiers gardent l'ordre et le dtype d'origine.
+    """
+    metadata = (schema.metadata or {}).get(b'pandas')
+    if metadata is None:
+        return df
+
+    fields = {field['name']: field for field in json.loads(metadata)['columns'] if field['name'] in df.columns}
+    for name, field in fields.items():
+        if field['pandas_type'] == 'categorical' and not isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype('category')
+    if columns is None:
+        df = df[list(fields) + [name for name in df.columns if name not in fields]]
+    return df
+
+
+def read_dataset(path, columns=None, filters=None):
+    """Lire un dataset (CSV, Parquet ou Feather) avec projection de colonnes et filtres
+
+    Parquet et Feather passent par pyarrow.dataset : seules les colonnes demandées sont
+    lues, les partitions (region_main=...) et groupes de lignes hors filtre sont sautés.
+    En CSV, la projection utilise usecols et les filtres sont appliqués après lecture.
+    """
+    input_format = dataset_format(path)
+    filters = list(filters or [])
+
+    if input_format == 'csv':
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + [column for column, _, _ in filters]))
+        df = pd.read_csv(path, usecols=read_columns)
+        if filters:
+            df = _filter_frame(df, filters).reset_index(drop=True)
+        return df[list(columns)] if columns is not None else df
+
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    if input_format == 'parquet':
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    else:
+        dataset = ds.dataset(path, format='ipc')
+
+    expression = pq.filters_to_expression(filters) if filters else None
+    table = dataset.to_table(columns=list(columns) if columns is not None else None, filter=expression)
+    return _restore_pandas_layout(table.to_pandas(), dataset.schema, columns)
@@ -0,0 +1,141 @@
+import json
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Forme fixe des points exportés par GEE : {"geodesic":false,"type":"Point","coordinates":[x,y]}
+POINT_PATTERN = r'"type"\s*:\s*"Point"\s*,\s*"coordinates"\s*:\s*\[\s*([-+0-9.eE]+)\s*,\s*([-+0-9.eE]+)\s*[\],]'
+# Géométrie vide (échantillon sans position, ex. {"type":"MultiPoint","coordinates":[]}) -> NaN
+EMPTY_PATTERN = r'"coordinates"\s*:\s*\[\s*\]'
+
+EARTH_RADIUS_M = 6371008.8
+# Distance maximale d'appariement échantillon / série temporelle (4 décimales ≈ 11 m)
+DEFAULT_JOIN_TOLERANCE_M = 15.0
+
+LONGITUDE_ALIASES = ('longitude', 'lon', 'lng', 'long', 'x')
+LATITUDE_ALIASES = ('latitude', 'lat', 'y')
+
+
+def _parse_geometry(geo):
+    """Chemin lent (json.loads) pour une géométrie hors forme fixe : (lon, lat) ou (NaN, NaN)"""
+    try:
+        geometry = json.loads(geo)
+        coords = geometry['coordinates']
+        if geometry.get('type') == 'Point' and len(coords) >= 2:
+            return float(coords[0]), float(coords[1])
+    except (TypeError, ValueError, KeyError):
+        pass
+    return np.nan, np.nan
+
+
+def extract_point_coordinates(geo):
+    """Longitude et latitude (float64) d'une colonne .geo GeoJSON, une seule lecture par ligne
+
+    Une expression régulière extrait les deux nombres de toute la colonne ; seules les
+    lignes hors forme fixe (ni point, ni géométrie vide) passent par json.loads.
+    Valeur manquante ou non ponctuelle -> NaN.
+    """
+    geo = pd.Series(geo).reset_index(drop=True)
+    text = geo[geo.map(type).eq(str)].astype(object)
+    longitude = np.full(len(geo), np.nan)
+    latitude = np.full(len(geo), np.nan)
+
+    matches = text.str.extract(POINT_PATTERN)
+    matched = matches[0].notna()
+    # Conversion par float() (arrondi exact, comme json.loads) plutôt que le parseur rapide de pandas
+    longitude[matches.index[matched]] = matches.loc[matched, 0].to_numpy(dtype=object).astype(np.float64)
+    latitude[matches.index[matched]] = matches.loc[matched, 1].to_numpy(dtype=object).astype(np.float64)
+
+    unmatched = text[~matched]
+    for position, value in unmatched[~unmatched.str.contains(EMPTY_PATTERN)].items():
+        longitude[position], latitude[position] = _parse_geometry(value)
+    return longitude, latitude
+
+
+def standardize_coordinate_columns(df, decode=extract_point_coordinates):
+    """Renommer les colonnes de coordonnées connues en longitude/latitude, sinon décoder .geo
+
+    Comparaison sur le nom exact (insensible à la casse) : 'system:index' ou 'data_type'
+    ne sont pas des coordonnées. decode(colonne .geo) -> (longitude, latitude).
+    """
+    renames = {}
+    for standard_name, aliases in (('longitude', LONGITUDE_ALIASES), ('latitude', LATITUDE_ALIASES)):
+        if standard_name in df.columns:
+            continue
+        for col in df.columns:
+            if col.lower() in aliases and col not in renames:
+                renames[col] = standard_name
+                break
+    if renames:
+        df = df.rename(columns=renames)
+
+    if '.geo' in df.columns and ('longitude' not in df.columns or 'latitude' not in df.columns):
+        longitude, latitude = decode(df['.geo'])
+        if not np.isnan(longitude).all():
+            df['longitude'] = longitude
+            df['latitude'] = latitude
+    return df
+
+
+def project_to_metres(longitude, latitude, reference_latitude):
+    """Projection équirectangulaire locale (m) : suffisante à l'échelle d'une région"""
+    scale = np.cos(np.radians(reference_latitude))
+    return np.column_stack([
+        EARTH_RADIUS_M * np.radians(np.asarray(longitude, dtype=np.float64)) * scale,
+        EARTH_RADIUS_M * np.radians(np.asarray(latitude, dtype=np.float64))
+    ])
+
+
+def nearest_neighbour_join(left, right, columns, by='region_main', tolerance_m=DEFAULT_JOIN_TOLERANCE_M):
+    """Valeurs de right[columns] du point le plus proche de chaque ligne de left, par groupe
+
+    Un cKDTree par groupe (région) sur les points de right, requête des points de left
+    avec distance_upper_bound : O(n log n), un point au-delà de la tolérance ou sans
+    coordonnées reste NaN. Renvoie (DataFrame aligné sur left.index, rapport).
+    """
+    values = np.full((len(left), len(columns)), np.nan)
+    distances = np.full(len(left), np.nan)
+    right_values = right[columns].to_numpy(dtype=np.float64)
+    right_groups = right.groupby(by, observed=True, sort=False).indices
+    by_region = {}
+
+    for group, left_positions in left.groupby(by, observed=True, sort=False).indices.items():
+        left_lon = left['longitude'].to_numpy(dtype=np.float64)[left_positions]
+        left_lat = left['latitude'].to_numpy(dtype=np.float64)[left_positions]
+        located = ~(np.isnan(left_lon) | np.isnan(left_lat))
+        matched = 0
+
+        right_positions = right_groups.get(group)
+        if right_positions is not None and located.any():
+            right_lon = right['longitude'].to_numpy(dtype=np.float64)[right_positions]
+            right_lat = right['latitude'].to_numpy(dtype=np.float64)[right_positions]
+            valid = ~(np.isnan(right_lon) | np.isnan(right_lat))
+            right_positions = right_positions[valid]
+
+            if len(right_positions):
+                reference_latitude = np.nanmean(right_lat[valid])
+                tree = cKDTree(project_to_metres(right_lon[valid], right_lat[valid], reference_latitude))
+                distance, nearest = tree.query(
+                    project_to_metres(left_lon[located], left_lat[located], reference_latitude),
+                    distance_upper_bound=tolerance_m
+                )
+                hit = np.isfinite(distance)
+                targets = left_positions[located][hit]
+                values[targets] = right_values[right_positions[nearest[hit]]]
+                distances[targets] = distance[hit]
+                matched = int(hit.sum())
+
+        by_region[str(group)] = {'rows': len(left_positions), 'matched': matched}
+
+    matched_distances = distances[~np.isnan(distances)]
+    report = {
+        'rows': len(left),
+        'matched': int(len(matched_distances)),
+        'match_rate': round(len(matched_distances) / len(left), 4) if len(left) else 0.0,
+        'tolerance_m': tolerance_m,
+        'mean_distance_m': round(float(matched_distances.mean()), 3) if len(matched_distances) else None,
+        'max_distance_m': round(float(matched_distances.max()), 3) if len(matched_distances) else None,
+        'by_region': by_region
+    }
+    return pd.DataFrame(values, index=left.index, columns=columns), report
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from coordinates import extract_point_coordinates
+
+# Lignes lues pour déduire le schéma d'un fichier
+SCHEMA_SAMPLE_ROWS = 1000
+SCHEMA_FILE = 'schemas.json'
+# 2 : réels lus en float64 (les schémas float32 de la version 1 sont ignorés)
+# 3 : coordonnées décodées de .geo stockées dans la table
+SCHEMA_VERSION = 3
+# Coordonnées décodées de .geo, gardées dans la table en cache (jamais renvoyées par read)
+DECODED_COLUMNS = ('.geo:longitude', '.geo:latitude')
+# Mémoire maximale des tables gardées en mémoire (les moins récemment lues sont libérées)
+DEFAULT_MAX_MEMORY_MB = 1024
+
+data_caches = {}
+_data_caches_lock = threading.Lock()
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def infer_schema(path, sample_rows=SCHEMA_SAMPLE_ROWS):
+    """dtypes explicites d'un CSV : réels en float64, texte en str
+
+    Les réels restent en float64 au chargement : le CSV contient du texte décimal (0.2 lu
+    en float32 devient 0.20000000298) et les classifications (pd.cut, seuils d'alerte)
+    tombent sur ces bornes. optimize_dtypes réduit les types après le calcul des variables
+    dérivées et des alertes. Les entiers ne sont pas fixés : une valeur manquante plus loin
+    dans le fichier les rendrait illisibles.
+    """
+    sample = pd.read_csv(path, nrows=sample_rows)
+    dtypes = {}
+    for column, dtype in sample.dtypes.items():
+        if pd.api.types.is_float_dtype(dtype):
+            dtypes[column] = 'float64'
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            dtypes[column] = 'str'
+    return dtypes
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class DataFileCache:
+    """Lecture des CSV régionaux partagée par tous les points d'entrée du module
+
+    Un fichier est lu une fois avec son schéma (dtypes explicites, déduits une seule fois)
+    et ses coordonnées .geo décodées, puis servi depuis la mémoire tant que sa date de
+    modification et sa taille ne changent pas. La mémoire est bornée (max_memory_mb) :
+    au-delà, les tables les moins récemment lues sont libérées. Avec cache_dir, schémas
+    (JSON) et tables avec leurs coordonnées décodées (Feather, si pyarrow est installé)
+    sont aussi gardés sur disque d'une exécution à l'autre. Chaque appel renvoie une
+    copie superficielle (copy-on-write) : modifier le résultat ne touche pas le cache.
+    """
+
+    def __init__(self, cache_dir=None, max_workers=None, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.max_memory = max_memory_mb * 1024**2
+        self.hits = 0
+        self.misses = 0
+        # clé -> (signature, table, octets), du moins au plus récemment lu
+        self._frames = OrderedDict()
+        self._memory = 0
+        self._schemas = {}
+        self._lock = threading.Lock()
+        self._store_tables = self.cache_dir is not None and _pyarrow_available()
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(self.cache_dir / SCHEMA_FILE, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                self._schemas = stored.get('schemas', {}) if stored.get('version') == SCHEMA_VERSION else {}
+            except (OSError, ValueError, AttributeError):
+                self._schemas = {}
+
+    @staticmethod
+    def _key(path):
+        return str(Path(path).resolve())
+
+    def _table_path(self, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+        return self.cache_dir / f"{Path(key).stem}-{digest}.feather"
+
+    # ============= SCHÉMAS =============
+    def schema(self, path):
+        key = self._key(path)
+        signature = file_signature(path)
+        with self._lock:
+            cached = self._schemas.get(key)
+        if cached is not None and cached['signature'] == signature:
+            return cached['dtypes']
+
+        dtypes = infer_schema(path)
+        with self._lock:
+            self._schemas[key] = {'signature': signature, 'dtypes': dtypes}
+            self._write_schemas()
+        return dtypes
+
+    def _write_schemas(self):
+        if self.cache_dir is None:
+            return
+        tmp_path = self.cache_dir / f"{SCHEMA_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SCHEMA_VERSION, 'schemas': self._schemas}, f)
+        os.replace(tmp_path, self.cache_dir / SCHEMA_FILE)
+
+    # ============= LECTURE =============
+    def read(self, path, nrows=None):
+        """DataFrame du fichier
+
+        nrows : premières lignes seulement, lues depuis la table en mémoire si elle y est,
+        sinon directement dans le CSV (sans charger ni mettre en cache le fichier complet).
+        """
+        if nrows is not None:
+            cached = self._cached(self._key(path), file_signature(path))
+            if cached is None:
+                return pd.read_csv(path, nrows=nrows, dtype=self.schema(path))
+            return cached.drop(columns=list(DECODED_COLUMNS), errors='ignore').head(nrows)
+        return self._table(path).drop(columns=list(DECODED_COLUMNS), errors='ignore')
+
+    def coordinates(self, path):
+        """(longitude, latitude) décodées de la colonne .geo du fichier (NaN si absentes)"""
+        table = self._table(path)
+        if DECODED_COLUMNS[0] not in table.columns:
+            return np.full(len(table), np.nan), np.full(len(table), np.nan)
+        return (table[DECODED_COLUMNS[0]].to_numpy(dtype=np.float64),
+                table[DECODED_COLUMNS[1]].to_numpy(dtype=np.float64))
+
+    def _cached(self, key, signature):
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is None or cached[0] != signature:
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def _table(self, path):
+        """Table complète du fichier (colonnes décodées comprises), depuis la mémoire si possible"""
+        key = self._key(path)
+        signature = file_signature(path)
+        df = self._cached(key, signature)
+        if df is None:
+            with self._lock:
+                self.misses += 1
+            df = self._load(path, key, signature)
+            self._remember(key, signature, df)
+        return df.copy(deep=False)
+
+    def _remember(self, key, signature, df):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self._memory -= previous[2]
+            if size > self.max_memory:
+                return
+            self._frames[key] = (signature, df, size)
+            self._memory += size
+            while self._memory > self.max_memory:
+                _, (_, _, evicted) = self._frames.popitem(last=False)
+                self._memory -= evicted
+
+    def _load(self, path, key, signature):
+        table_path = self._table_path(key) if self._store_tables else None
+        dtypes = self.schema(path)
+
+        if table_path is not None and table_path.exists():
+            with self._lock:
+                stored = self._schemas.get(key, {}).get('table_signature')
+            if stored == signature:
+                try:
+                    return pd.read_feather(table_path)
+                except (OSError, ValueError):
+                    pass
+
+        df = pd.read_csv(path, dtype=dtypes)
+        if '.geo' in df.columns:
+            longitude, latitude = extract_point_coordinates(df['.geo'])
+            if not np.isnan(longitude).all():
+                df[DECODED_COLUMNS[0]] = longitude
+                df[DECODED_COLUMNS[1]] = latitude
+        if table_path is not None:
+            tmp_path = table_path.with_name(table_path.name + '.tmp')
+            df.to_feather(tmp_path)
+            os.replace(tmp_path, table_path)
+            with self._lock:
+                self._schemas.setdefault(key, {'signature': signature, 'dtypes': dtypes})['table_signature'] = signature
+                self._write_schemas()
+        return df
+
+    def read_many(self, paths):
+        """Lire plusieurs fichiers en parallèle (threads) : DataFrame ou Exception, dans l'ordre"""
+        def load(path):
+            try:
+                return self.read(path)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(load, paths))
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._memory = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._frames),
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_mb': round(self._memory / 1024**2, 2),
+                'max_memory_mb': round(self.max_memory / 1024**2, 2)
+            }
+
+
+def get_data_cache(cache_dir=None):
+    """Cache partagé du module (un par dossier de cache)"""
+    key = str(Path(cache_dir).resolve()) if cache_dir is not None else None
+    with _data_caches_lock:
+        if key not in data_caches:
+            data_caches[key] = DataFileCache(cache_dir)
+        return data_caches[key]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# Colonnes gardées en float64 : en float32 une coordonnée perd ~0.5 m (7 chiffres significatifs)
+FLOAT64_COLUMNS = ('longitude', 'latitude', 'lon_round', 'lat_round')
+
+# Texte converti en category si le nombre de valeurs distinctes reste sous cette part des lignes
+CATEGORY_MAX_RATIO = 0.5
+
+FLOAT32_MAX = np.finfo(np.float32).max
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def optimize_dtypes(df, float64_columns=FLOAT64_COLUMNS, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Types compacts pour le stockage : float32, plus petit entier, category, uint8
+
+    Les règles ne dépendent que du dtype (et de la plage de valeurs) : deux blocs d'un même
+    fichier donnent le même CSV. Renvoie (DataFrame optimisé, rapport mémoire).
+    """
+    before = memory_mb(df)
+    converted = {}
+
+    for column in df.columns:
+        values = df[column]
+        dtype = values.dtype
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if dtype == bool:
+            converted[column] = values.astype(np.uint8)
+        elif pd.api.types.is_float_dtype(dtype) and dtype != np.float32 and column not in float64_columns:
+            if np.nanmax(np.abs(values.to_numpy()), initial=0) < FLOAT32_MAX:
+                converted[column] = values.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype):
+            # Entiers positifs (dummies, codes, priorités) en non signé : uint8 plutôt qu'int8
+            unsigned = len(values) == 0 or values.min() >= 0
+            downcast = pd.to_numeric(values, downcast='unsigned' if unsigned else 'integer')
+            if downcast.dtype != dtype:
+                converted[column] = downcast
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            if len(values) and values.nunique() <= len(values) * category_max_ratio:
+                converted[column] = values.astype('category')
+
+    if converted:
+        # Reconstruction en une fois : un bloc par dtype plutôt qu'un bloc par colonne remplacée
+        df = pd.DataFrame({column: converted.get(column, df[column]) for column in df.columns}, index=df.index)
+
+    after = memory_mb(df)
+    report = {
+        'before_mb': round(float(before), 2),
+        'after_mb': round(float(after), 2),
+        'reduction': round(float(before / after), 2) if after else None,
+        'converted_columns': len(converted),
+        'dtypes': df.dtypes.astype(str).value_counts().to_dict()
+    }
+    return df, report
+
+
+def print_memory_report(report, indent='   '):
+    print(f"{indent}• Mémoire: {report['before_mb']:.1f} MB -> {report['after_mb']:.1f} MB "
+          f"(÷{report['reduction']}, {report['converted_columns']} colonnes converties)")
+    print(f"{indent}• Types: " + ', '.join(f"{dtype} ({count})" for dtype, count in report['dtypes'].items()))
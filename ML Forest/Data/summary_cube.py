@@ -0,0 +1,110 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ('region_main', 'alert_level', 'health_category')
+CUBE_MEASURES = ('NDVI', 'NDMI', 'EVI')
+CUBE_FILE = 'forest_summary_cube.json'
+# Clé des cellules sans catégorie (NDVI manquant, région inconnue)
+MISSING_KEY = 'Inconnu'
+
+
+def build_summary_cube(df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+    """Cube agrégé en un seul groupby : nombre de points, somme/effectif/min/max par mesure
+
+    Sommes et effectifs sont additifs : toute agrégation plus grossière (par région, par
+    niveau d'alerte) se recalcule exactement depuis le cube, sans relire la table. Les
+    cellules suivent l'ordre d'apparition dans la table : les régions sont résumées dans
+    l'ordre des données, comme les rapports par région filtrant le maître.
+    """
+    dimensions = [dim for dim in dimensions if dim in df.columns]
+    measures = [measure for measure in measures if measure in df.columns]
+
+    grouped = df.groupby(dimensions, observed=True, dropna=False, sort=False)
+    cube = grouped.size().rename('points').to_frame()
+    if measures:
+        values = df[measures].astype(np.float64)
+        stats = values.groupby([df[dim] for dim in dimensions], observed=True, dropna=False,
+                               sort=False).agg(['sum', 'count', 'min', 'max'])
+        stats.columns = [f'{measure}_{stat}' for measure, stat in stats.columns]
+        cube = cube.join(stats)
+    return cube.reset_index()
+
+
+class SummaryCube:
+    """Résumés régionaux servis depuis le cube (quelques dizaines de lignes) plutôt que la table"""
+
+    def __init__(self, cube, dimensions=None, measures=None, generated_at=None):
+        self.cube = cube
+        self.dimensions = list(dimensions or [dim for dim in CUBE_DIMENSIONS if dim in cube.columns])
+        self.measures = list(measures or [m for m in CUBE_MEASURES if f'{m}_sum' in cube.columns])
+        self.generated_at = generated_at or datetime.now().isoformat()
+        self._regions = self._summarize_regions()
+
+    @classmethod
+    def from_frame(cls, df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+        cube = build_summary_cube(df, dimensions, measures)
+        return cls(cube, measures=[m for m in measures if m in df.columns])
+
+    def _summarize(self, rows):
+        summary = {'points': int(rows['points'].sum())}
+        for dim in self.dimensions[1:]:
+            counts = rows.groupby(dim, observed=True, dropna=False)['points'].sum()
+            summary[dim] = {(MISSING_KEY if pd.isna(key) else str(key)): int(count) for key, count in counts.items()}
+        for measure in self.measures:
+            count = rows[f'{measure}_count'].sum()
+            summary[measure] = {
+                'mean': float(rows[f'{measure}_sum'].sum() / count) if count else None,
+                'min': float(rows[f'{measure}_min'].min()) if count else None,
+                'max': float(rows[f'{measure}_max'].max()) if count else None,
+                'count': int(count)
+            }
+        return summary
+
+    def _summarize_regions(self):
+        region_column = self.dimensions[0]
+        return {str(region): self._summarize(rows)
+                for region, rows in self.cube.groupby(region_column, observed=True, sort=False)}
+
+    # ============= CONSULTATION =============
+    def regions(self):
+        return list(self._regions)
+
+    def region_summary(self, region):
+        return self._regions.get(str(region))
+
+    def overall_summary(self):
+        return self._summarize(self.cube)
+
+    # ============= SÉRIALISATION =============
+    def to_dict(self):
+        cells = self.cube.astype(object).where(self.cube.notna(), None)
+        return {
+            'generated_at': self.generated_at,
+            'dimensions': self.dimensions,
+            'measures': self.measures,
+            'overall': self.overall_summary(),
+            'regions': self._regions,
+            'cells': [{key: (value.item() if isinstance(value, np.generic) else value) for key, value in row.items()}
+                      for row in cells.to_dict(orient='records')]
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        cube = pd.DataFrame(state['cells'])
+        return cls(cube, state['dimensions'], state['measures'], state['generated_at'])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
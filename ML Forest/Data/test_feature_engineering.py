@@ -0,0 +1,63 @@
+"""Parité des modes d'exécution du feature engineering avec le pipeline séquentiel
+
+    python -m pytest test_feature_engineering.py
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Feature_Engineering import (
+    ForestFeatureEngineer, incremental_feature_engineering, parallel_feature_engineering, quiet_output,
+    run_pipeline_steps
+)
+
+DATA_FILE = Path(__file__).with_name('morocco_forest_complete_simple.csv')
+# Colonnes déjà calculées par le processeur et recalculées par les étapes
+PRECOMPUTED_COLUMNS = ('northness', 'eastness', 'topographic_wetness_index', 'RedEdge_Red_ratio')
+
+
+@pytest.fixture(scope='module')
+def master():
+    df = pd.read_csv(DATA_FILE, nrows=600)
+    rng = np.random.default_rng(0)
+    df['region_main'] = df['region']
+    for year in range(2020, 2025):
+        df[f'NDVI_{year}'] = df['NDVI'] + rng.normal(0, 0.03, len(df))
+    for name in PRECOMPUTED_COLUMNS:
+        df[name] = rng.normal(0, 10, len(df))
+    return df
+
+
+def sequential(df):
+    with quiet_output():
+        engineer = ForestFeatureEngineer(df)
+        run_pipeline_steps(engineer)
+    return engineer.df
+
+
+def test_parallel_matches_sequential_with_overwritten_columns(master):
+    expected = sequential(master)
+    with quiet_output():
+        engineer, _, _ = parallel_feature_engineering(master, max_workers=2)
+
+    pd.testing.assert_frame_equal(engineer.df, expected)
+    for name in PRECOMPUTED_COLUMNS:
+        assert not np.allclose(engineer.df[name], master[name], equal_nan=True)
+
+
+def test_incremental_matches_sequential_after_partial_recompute(master, tmp_path):
+    def incremental(df):
+        with quiet_output():
+            engineer, report = incremental_feature_engineering(df, cache_dir=tmp_path, block_size=100)
+        return engineer.df, report
+
+    first, _ = incremental(master)
+    pd.testing.assert_frame_equal(first, sequential(master))
+
+    edited = master.copy()
+    edited.loc[250, 'NDVI_2022'] = 0.61
+    result, report = incremental(edited)
+    assert report['temporal']['status'].startswith('1/')
+    pd.testing.assert_frame_equal(result, sequential(edited))
@@ -5,16 +5,37 @@ from logging.handlers import RotatingFileHandler
 import logging
 
 from routes import register_routes
-from utils import load_model
+from registry import init_registry
+from jobs import init_job_manager
+from prediction_cache import init_prediction_cache
+from ndvi_forecast import init_forecast_reader
 
 app = Flask(__name__)
 CORS(app)
 
 UPLOAD_FOLDER = 'uploads'
-MODEL_PATH = 'forest_model_complete.pkl'
+JOBS_FOLDER = 'jobs'
+MODEL_DIR = '.'
+# Pickle joblib ou dossier compilé par model_artifact.py (chargement bien plus rapide)
+MODEL_PATH = os.getenv('MODEL_PATH', 'forest_model_complete.pkl')
+# 'r' pour partager les tableaux du modèle entre workers via le page cache
+MODEL_MMAP_MODE = os.getenv('MODEL_MMAP_MODE') or None
+# Chargement du modèle en arrière-plan : /health répond tout de suite, /ready quand le modèle est actif
+MODEL_BACKGROUND_LOAD = os.getenv('MODEL_BACKGROUND_LOAD', '1') == '1'
+# Prévisions NDVI par point écrites par ndvi_forecast.py
+NDVI_FORECAST_PATH = os.getenv('NDVI_FORECAST_PATH', 'ndvi_forecasts.parquet')
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['JOBS_FOLDER'] = JOBS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
+# Nombre de jobs de prédiction exécutés en parallèle pour tout le service, tous workers
+# gunicorn confondus (chaque job charge sa copie du modèle)
+app.config['JOB_MAX_WORKERS'] = int(os.getenv('JOB_MAX_WORKERS', 2))
+app.config['JOB_MAX_PENDING'] = int(os.getenv('JOB_MAX_PENDING', 20))
+app.config['JOB_CHUNK_SIZE'] = int(os.getenv('JOB_CHUNK_SIZE', 5000))
+# Cache des prédictions par ligne (0 pour le désactiver), durée de vie en secondes
+app.config['PREDICTION_CACHE_SIZE'] = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+app.config['PREDICTION_CACHE_TTL'] = float(os.getenv('PREDICTION_CACHE_TTL', 3600))
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -27,7 +48,17 @@ def setup_logging():
 
 def create_app():
     setup_logging()
-    load_model(MODEL_PATH, app.logger)
+    init_prediction_cache(app.config['PREDICTION_CACHE_SIZE'], app.config['PREDICTION_CACHE_TTL'])
+    init_forecast_reader(NDVI_FORECAST_PATH)
+    init_registry(MODEL_DIR, MODEL_PATH, app.logger, mmap_mode=MODEL_MMAP_MODE,
+                  background=MODEL_BACKGROUND_LOAD)
+    init_job_manager(
+        app.config['JOBS_FOLDER'], MODEL_PATH, app.logger,
+        max_workers=app.config['JOB_MAX_WORKERS'],
+        max_pending=app.config['JOB_MAX_PENDING'],
+        chunk_size=app.config['JOB_CHUNK_SIZE'],
+        mmap_mode=MODEL_MMAP_MODE
+    )
     register_routes(app)
     
     @app.errorhandler(413)
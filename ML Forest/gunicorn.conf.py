@@ -0,0 +1,34 @@
+import gc
+import multiprocessing
+import os
+
+# Mode pré-fork : le master charge le modèle une seule fois (preload_app) puis
+# forke les workers, qui partagent ses pages mémoire en copy-on-write.
+# Les tableaux NumPy du bundle sont en plus mappés depuis le fichier (mmap_mode='r').
+os.environ.setdefault('MODEL_MMAP_MODE', 'r')
+# Un worker = un cœur : pas de sur-souscription OpenMP/BLAS entre workers
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+# Modèle chargé dans le master avant le fork (un thread de chargement n'y survivrait pas)
+os.environ.setdefault('MODEL_BACKGROUND_LOAD', '0')
+
+# Jobs de prédiction (jobs.py) : chaque worker a son propre pool de process 'spawn',
+# hors des pages partagées, et chaque job y charge une copie privée du modèle. La limite
+# JOB_MAX_WORKERS est donc appliquée globalement via le store SQLite (créneaux 'running')
+# et non par worker : au plus JOB_MAX_WORKERS copies du modèle en plus de celle du master,
+# quel que soit le nombre de workers. Un process de job libère le modèle après son job.
+bind = os.getenv('ML_API_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('ML_API_WORKERS', multiprocessing.cpu_count()))
+preload_app = True
+timeout = 120
+
+
+def pre_fork(server, worker):
+    # Objets du master déplacés hors du GC : les collectes des workers ne
+    # réécrivent plus leurs en-têtes, donc leurs pages ne sont pas copiées
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from utils import set_model_threads
+    set_model_threads(1)
+    server.log.info(f"Worker {worker.pid} ready (shared model)")
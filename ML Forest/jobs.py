@@ -0,0 +1,492 @@
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils import (
+    load_model, unload_model, get_model_data, get_model_path, get_model_version, process_file, validate_features,
+    validate_data_types, prepare_data, make_predictions,
+    calculate_statistics, generate_recommendations
+)
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed')
+# Attente entre deux tentatives de prise d'un créneau d'exécution (secondes)
+SLOT_POLL_INTERVAL = 0.5
+# Exécutions d'un job interrompues par la casse du pool (worker tué) avant l'échec
+JOB_MAX_ATTEMPTS = 2
+
+job_manager = None
+
+# Version du modèle chargée dans le process worker (un par process du pool)
+_worker_model_key = None
+
+
+class JobStore:
+    """Stockage SQLite des jobs de prédiction (aucun broker externe)
+
+    pid : process du JobManager propriétaire du job (soumission, créneau). Un job en
+    attente ou en cours dont le propriétaire n'existe plus est orphelin : il passe en
+    échec, les autres ne sont jamais touchés.
+    """
+
+    def __init__(self, jobs_folder: str):
+        self.jobs_folder = jobs_folder
+        self.db_path = os.path.join(jobs_folder, 'jobs.db')
+        os.makedirs(jobs_folder, exist_ok=True)
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    input_path TEXT,
+                    file_extension TEXT,
+                    result_path TEXT,
+                    total_rows INTEGER DEFAULT 0,
+                    processed_rows INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    pid INTEGER
+                )
+            """)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'pid' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN pid INTEGER")
+
+    def job_folder(self, job_id: str) -> str:
+        return os.path.join(self.jobs_folder, job_id)
+
+    def create(self, filename: str, input_path: str, file_extension: str, job_id: str) -> Dict:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, input_path, file_extension, created_at, pid) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, input_path, file_extension, datetime.now().isoformat(), os.getpid())
+            )
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields):
+        if not fields:
+            return
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_pending(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    def claim_slot(self, job_id: str, max_running: int) -> Optional[bool]:
+        """Passer le job en 'running' si moins de max_running jobs tournent, tous process confondus
+
+        La limite est globale : les workers gunicorn ont chacun leur pool mais partagent
+        ce store. Les jobs orphelins (process propriétaire disparu) libèrent leur
+        créneau. Renvoie True si le créneau est pris, False s'il faut attendre, None si
+        le job n'est plus en attente.
+        """
+        conn = self._connect()
+        try:
+            # Verrou d'écriture dès le début : comptage et prise du créneau sont atomiques
+            conn.execute("BEGIN IMMEDIATE")
+            self._fail_orphans(conn)
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+
+            status = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if status is None or status['status'] != 'queued':
+                claimed = None
+            elif running >= max_running:
+                claimed = False
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, pid = ? WHERE id = ?",
+                    (datetime.now().isoformat(), os.getpid(), job_id)
+                )
+                claimed = True
+            conn.commit()
+            return claimed
+        finally:
+            conn.close()
+
+    def requeue(self, job_id: str) -> bool:
+        """Remettre en attente un job en cours (pool cassé avant sa fin)"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, processed_rows = 0 "
+                "WHERE id = ? AND status = 'running'",
+                (job_id,)
+            )
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def _fail_orphans(conn) -> int:
+        pending = conn.execute("SELECT id, pid FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        orphans = [row['id'] for row in pending if row['pid'] is None or not _process_alive(row['pid'])]
+        for orphan_id in orphans:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted: owner process exited', finished_at = ? "
+                "WHERE id = ?",
+                (datetime.now().isoformat(), orphan_id)
+            )
+        return len(orphans)
+
+    def fail_interrupted(self) -> int:
+        """Marquer en échec les jobs interrompus (process propriétaire disparu, ex. redémarrage)
+
+        Les jobs d'un process encore en vie (autre worker, rechargement gunicorn) continuent.
+        """
+        with self._connect() as conn:
+            return self._fail_orphans(conn)
+
+
+def job_to_dict(job: Dict) -> Dict:
+    total = job['total_rows'] or 0
+    progress = (job['processed_rows'] / total * 100) if total else 0.0
+    if job['status'] == 'completed':
+        progress = 100.0
+
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'total_rows': total,
+        'processed_rows': job['processed_rows'] or 0,
+        'progress': round(progress, 1),
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'result_available': job['status'] == 'completed'
+    }
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _init_worker():
+    logging.basicConfig(level=logging.INFO)
+
+
+def _ensure_worker_model(model_path: str, model_version: Optional[str], mmap_mode: Optional[str] = None):
+    global _worker_model_key
+    if _worker_model_key != (model_path, model_version) or get_model_data() is None:
+        load_model(model_path, logging.getLogger('jobs'), mmap_mode=mmap_mode, version=model_version)
+        _worker_model_key = (model_path, model_version)
+
+        # Artefact compilé : les jobs traitent de gros lots, le booster natif y est plus rapide
+        model_data = get_model_data()
+        if model_data is not None and hasattr(model_data['model'], 'attach_booster'):
+            model_data['model'].attach_booster()
+
+
+def _release_worker_model():
+    """Libérer la copie du modèle du process une fois le job terminé
+
+    Les process du pool restent en vie entre deux jobs : sans cela, chaque pool de
+    chaque worker gunicorn garderait sa copie privée du modèle.
+    """
+    global _worker_model_key
+    unload_model()
+    _worker_model_key = None
+    gc.collect()
+
+
+def _read_job_input(input_path: str, file_extension: str):
+    if file_extension == 'json':
+        with open(input_path, 'r', encoding='utf-8') as f:
+            return pd.DataFrame(json.load(f)['data'])
+    return process_file(input_path, file_extension)
+
+
+def run_prediction_job(jobs_folder: str, job_id: str, model_path: str, model_version: Optional[str],
+                       chunk_size: int, mmap_mode: Optional[str] = None):
+    """Exécuter un job dans un process du pool, par blocs de lignes
+
+    Le JobManager a déjà pris le créneau du job ('running'). Le modèle est chargé au début
+    et libéré en fin de job : seul un job en cours en garde une copie.
+    """
+    store = JobStore(jobs_folder)
+    job = store.get(job_id)
+
+    try:
+        _ensure_worker_model(model_path, model_version, mmap_mode)
+        model_data = get_model_data()
+        if model_data is None:
+            raise Exception("Model not loaded")
+
+        df = _read_job_input(job['input_path'], job['file_extension'])
+        store.update(job_id, total_rows=len(df))
+
+        is_valid, missing_features, _ = validate_features(df)
+        if not is_valid:
+            raise Exception(f"Missing required features: {missing_features}")
+
+        types_valid, invalid_columns = validate_data_types(df)
+        if not types_valid:
+            raise Exception(f"Invalid data types: {invalid_columns}")
+
+        predictions = []
+        for start in range(0, len(df), chunk_size):
+            chunk_predictions = make_predictions(prepare_data(df.iloc[start:start + chunk_size]))
+            for prediction in chunk_predictions:
+                prediction['row_id'] += start
+            predictions.extend(chunk_predictions)
+            store.update(job_id, processed_rows=len(predictions))
+
+        statistics = calculate_statistics(predictions)
+        result = {
+            'success': True,
+            'job_id': job_id,
+            'predictions': predictions,
+            'statistics': statistics,
+            'recommendations': generate_recommendations(statistics),
+            'file_info': {
+                'filename': job['filename'],
+                'rows': len(df),
+                'columns': len(df.columns)
+            },
+            'model_used': model_data['best_model_name'],
+            'timestamp': datetime.now().isoformat()
+        }
+
+        result_path = os.path.join(store.job_folder(job_id), 'result.json')
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+
+        store.update(job_id, status='completed', result_path=result_path,
+                     finished_at=datetime.now().isoformat())
+
+    except Exception as e:
+        store.update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+
+    finally:
+        _release_worker_model()
+        if os.path.exists(job['input_path']):
+            os.remove(job['input_path'])
+
+
+class JobManager:
+    """Soumission des jobs au pool de process, avec concurrence bornée
+
+    max_workers borne les jobs en cours pour tout le service, y compris avec plusieurs
+    workers gunicorn (créneaux pris dans le store SQLite partagé). Les jobs attendent
+    leur créneau dans un thread de répartition du process qui les a reçus : le pool ne
+    reçoit que des jobs prêts à tourner. Un process du pool ne garde sa copie du modèle
+    que le temps d'un job. Un pool cassé (worker tué) est recréé et les jobs qu'il
+    exécutait sont remis en attente (JOB_MAX_ATTEMPTS exécutions au plus).
+    """
+
+    def __init__(self, jobs_folder: str, model_path: str, max_workers: int = 2,
+                 max_pending: int = 20, chunk_size: int = 5000, mmap_mode: Optional[str] = None,
+                 logger=None):
+        self.store = JobStore(jobs_folder)
+        self.model_path = model_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.mmap_mode = mmap_mode
+        self.logger = logger or logging.getLogger(__name__)
+        self._executor = None
+        self._pid = None
+        self._waiting = deque()
+        self._condition = threading.Condition()
+        self._dispatcher = None
+        self._stopping = False
+
+        interrupted = self.store.fail_interrupted()
+        if interrupted:
+            self.logger.warning(f"{interrupted} interrupted jobs marked as failed")
+
+    def _ensure_process_state(self):
+        # Pool, file d'attente et thread propres au process : un worker pré-forké ne doit
+        # pas partager les files du pool de son parent (ni ses verrous)
+        if self._pid != os.getpid():
+            self._executor = None
+            self._waiting = deque()
+            self._condition = threading.Condition()
+            self._dispatcher = None
+            self._pid = os.getpid()
+
+    @property
+    def executor(self):
+        # Pool créé au premier job, recréé après un fork ou une casse
+        self._ensure_process_state()
+        if self._executor is None:
+            # 'spawn' : les workers ne doivent pas hériter des threads du serveur Flask
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return self._executor
+
+    def _drop_executor(self, broken):
+        with self._condition:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def can_accept(self) -> bool:
+        return self.store.count_pending() < self.max_pending
+
+    def new_job_folder(self):
+        job_id = uuid.uuid4().hex
+        folder = self.store.job_folder(job_id)
+        os.makedirs(folder, exist_ok=True)
+        return job_id, folder
+
+    def submit(self, job_id: str, filename: str, input_path: str, file_extension: str) -> Dict:
+        job = self.store.create(filename, input_path, file_extension, job_id)
+        # Le job utilise la version du modèle active au moment de la soumission
+        self._enqueue({
+            'job_id': job_id,
+            'model_path': get_model_path() or self.model_path,
+            'model_version': get_model_version(),
+            'attempts': 0
+        })
+        self.logger.info(f"Job {job_id} queued ({filename})")
+        return job
+
+    def _enqueue(self, task, first=False):
+        self._ensure_process_state()
+        with self._condition:
+            if first:
+                self._waiting.appendleft(task)
+            else:
+                self._waiting.append(task)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+                self._dispatcher.start()
+            self._condition.notify()
+
+    def _dispatch(self):
+        """Confier les jobs au pool dans l'ordre, chacun une fois son créneau pris"""
+        while True:
+            with self._condition:
+                while not self._waiting and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                task = self._waiting[0]
+
+            try:
+                claimed = self.store.claim_slot(task['job_id'], self.max_workers)
+            except sqlite3.Error as e:
+                self.logger.error(f"Job {task['job_id']}: slot claim failed: {e}")
+                claimed = False
+
+            if claimed is False:
+                # Créneaux pris (éventuellement par un autre worker) : nouvel essai plus tard
+                with self._condition:
+                    self._condition.wait(SLOT_POLL_INTERVAL)
+                continue
+
+            with self._condition:
+                self._waiting.remove(task)
+            if claimed:
+                self._start(task)
+
+    def _start(self, task):
+        job_id = task['job_id']
+        for _ in range(2):
+            executor = self.executor
+            try:
+                future = executor.submit(
+                    run_prediction_job, self.store.jobs_folder, job_id, task['model_path'],
+                    task['model_version'], self.chunk_size, self.mmap_mode
+                )
+            except BrokenProcessPool:
+                self.logger.warning("Job pool broken, recreating it")
+                self._drop_executor(executor)
+                continue
+            future.add_done_callback(lambda f: self._on_done(task, executor, f))
+            return
+        self.store.update(job_id, status='failed', error='Job pool unavailable',
+                          finished_at=datetime.now().isoformat())
+
+    def _on_done(self, task, executor, future):
+        # Créneau libéré : le thread de répartition peut reprendre sans attendre
+        with self._condition:
+            self._condition.notify()
+        if future.cancelled():
+            return
+        # Un worker tué (OOM, signal) ne met pas à jour le store lui-même
+        error = future.exception()
+        if error is None:
+            return
+        job_id = task['job_id']
+        if isinstance(error, BrokenProcessPool):
+            # Tous les jobs du pool échouent avec lui, pas seulement celui qui l'a cassé
+            self._drop_executor(executor)
+            attempts = task['attempts'] + 1
+            if attempts < JOB_MAX_ATTEMPTS and self.store.requeue(job_id):
+                self.logger.warning(f"Job {job_id} interrupted by a broken pool, queued again")
+                self._enqueue({**task, 'attempts': attempts}, first=True)
+                return
+        self.logger.error(f"Job {job_id} crashed: {error}")
+        self.store.update(job_id, status='failed', error=str(error) or type(error).__name__,
+                          finished_at=datetime.now().isoformat())
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        return self.store.list(limit)
+
+    def shutdown(self):
+        if self._pid != os.getpid():
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def init_job_manager(jobs_folder: str, model_path: str, logger, **options):
+    global job_manager
+    job_manager = JobManager(jobs_folder, model_path, logger=logger, **options)
+    return job_manager
+
+
+def get_job_manager():
+    return job_manager
@@ -0,0 +1,308 @@
+"""Artefact compilé du modèle : chargement rapide sans unpickling sklearn ni import de xgboost
+
+    python model_artifact.py forest_model_complete.pkl forest_model_compiled
+
+Le dossier produit contient les arbres XGBoost aplatis en tableaux .npy (évalués avec numpy
+seul), le booster au format natif UBJ, les paramètres du scaler, le masque du sélecteur, les
+classes et un manifest.json. Il s'utilise comme MODEL_PATH à la place du pickle : le service
+est prêt dès que les tableaux sont chargés, le booster XGBoost (plus rapide sur les gros lots)
+peut être rattaché ensuite en arrière-plan.
+"""
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+TREE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing', 'value', 'class', 'base_margin')
+
+
+class ArrayScaler:
+    """StandardScaler réduit à ses paramètres"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        import numpy as np
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class MaskSelector:
+    """Sélecteur de features réduit à son masque de support"""
+
+    def __init__(self, support):
+        self.support_ = support
+
+    def transform(self, X):
+        import numpy as np
+        return np.asarray(X, dtype=np.float64)[:, self.support_]
+
+
+class ClassLabels:
+    """LabelEncoder réduit à ses classes"""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def inverse_transform(self, y):
+        import numpy as np
+        return self.classes_[np.asarray(y, dtype=np.int64)]
+
+
+class CompiledClassifier:
+    """Forêt XGBoost multi:softprob évaluée sur des tableaux de noeuds plats
+
+    Les noeuds de tous les arbres sont numérotés à la suite (arbre i, noeud j -> i * n_nodes + j)
+    et une feuille pointe sur elle-même : chaque itération fait descendre tous les arbres d'un
+    niveau pour un bloc de lignes, sans branchement Python.
+    """
+
+    def __init__(self, arrays: Dict, n_classes: int, depth: int, model_dir: Optional[str] = None,
+                 block_size: int = 512):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.missing = arrays['missing']
+        self.value = arrays['value']
+        self.tree_class = arrays['class']
+        self.base_margin = arrays['base_margin']
+        self.n_classes = n_classes
+        self.depth = depth
+        self.model_dir = model_dir
+        self.block_size = block_size
+        self.booster = None
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.tree_class)
+
+    def attach_booster(self):
+        """Charger le booster natif : mêmes prédictions, meilleur débit sur les gros lots"""
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(os.path.join(self.model_dir, 'model.ubj'))
+        self.booster = booster
+
+    def attach_booster_async(self) -> threading.Thread:
+        thread = threading.Thread(target=self.attach_booster, daemon=True)
+        thread.start()
+        return thread
+
+    def _margins(self, X):
+        import numpy as np
+
+        n_trees = self.n_trees
+        n_features = X.shape[1]
+        roots = (np.arange(n_trees, dtype=np.int32) * (len(self.feature) // n_trees))
+        # Matrice arbre -> classe pour sommer les feuilles de chaque classe
+        class_matrix = np.zeros((n_trees, self.n_classes))
+        class_matrix[np.arange(n_trees), self.tree_class] = 1.0
+
+        margins = np.empty((len(X), self.n_classes))
+        for start in range(0, len(X), self.block_size):
+            block = X[start:start + self.block_size]
+            flat_block = block.ravel()
+            row_offsets = (np.arange(len(block), dtype=np.int32) * n_features)[:, None]
+            node = np.broadcast_to(roots, (len(block), n_trees))
+            for _ in range(self.depth):
+                value = flat_block.take(self.feature.take(node) + row_offsets)
+                next_node = np.where(value < self.threshold.take(node),
+                                     self.left.take(node), self.right.take(node))
+                node = np.where(np.isnan(value), self.missing.take(node), next_node)
+            margins[start:start + len(block)] = self.value.take(node) @ class_matrix
+        return margins + self.base_margin
+
+    def predict_proba(self, X):
+        import numpy as np
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        booster = self.booster
+        if booster is not None:
+            return booster.inplace_predict(X)
+
+        margins = self._margins(X)
+        margins -= margins.max(axis=1, keepdims=True)
+        proba = np.exp(margins)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+    def get_params(self):
+        return {'n_jobs': None}
+
+    def set_params(self, n_jobs: Optional[int] = None):
+        if n_jobs and self.booster is not None:
+            self.booster.set_param({'nthread': n_jobs})
+        return self
+
+
+def flatten_booster(booster):
+    """Aplatir les arbres d'un booster multi:softprob en tableaux de noeuds numérotés à la suite"""
+    import numpy as np
+
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    if learner['objective']['name'] != 'multi:softprob':
+        raise ValueError(f"Unsupported objective: {learner['objective']['name']}")
+
+    trees = learner['gradient_booster']['model']['trees']
+    if any(any(tree['split_type']) for tree in trees):
+        raise ValueError("Categorical splits are not supported")
+
+    n_nodes = max(len(tree['left_children']) for tree in trees)
+    size = len(trees) * n_nodes
+    arrays = {
+        'feature': np.zeros(size, dtype=np.int32),
+        'threshold': np.zeros(size, dtype=np.float32),
+        'left': np.arange(size, dtype=np.int32),
+        'right': np.arange(size, dtype=np.int32),
+        'missing': np.arange(size, dtype=np.int32),
+        'value': np.zeros(size, dtype=np.float32)
+    }
+
+    depth = 0
+    for i, tree in enumerate(trees):
+        offset = i * n_nodes
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        internal = left >= 0
+        nodes = slice(offset, offset + len(left))
+
+        # split_conditions porte le seuil d'un noeud interne et la valeur d'une feuille
+        arrays['feature'][nodes] = np.where(internal, tree['split_indices'], 0)
+        arrays['threshold'][nodes] = np.where(internal, conditions, 0)
+        arrays['value'][nodes] = np.where(internal, 0, conditions)
+        arrays['left'][nodes] = np.where(internal, left + offset, arrays['left'][nodes])
+        arrays['right'][nodes] = np.where(internal, right + offset, arrays['right'][nodes])
+        default_left = np.asarray(tree['default_left'], dtype=bool)
+        arrays['missing'][nodes] = np.where(default_left, arrays['left'][nodes], arrays['right'][nodes])
+
+        node_depth = np.zeros(len(left), dtype=np.int32)
+        for node in np.flatnonzero(internal):
+            node_depth[left[node]] = node_depth[right[node]] = node_depth[node] + 1
+        depth = max(depth, int(node_depth.max()))
+
+    param = learner['learner_model_param']
+    n_classes = int(param['num_class'])
+    base_score = json.loads(param['base_score']) if param['base_score'].startswith('[') \
+        else [float(param['base_score'])] * n_classes
+
+    arrays['class'] = np.asarray(learner['gradient_booster']['model']['tree_info'], dtype=np.int32)
+    # softprob : base_score s'ajoute tel quel aux marges de chaque classe
+    arrays['base_margin'] = np.asarray(base_score, dtype=np.float64)
+    return arrays, n_classes, depth
+
+
+def is_compiled_model(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def compile_model_bundle(model_path: str, output_dir: str, n_check: int = 2000) -> Dict:
+    """Convertir un bundle joblib (model, scaler, feature_selector, label_encoder) en artefact compilé
+
+    Les probabilités de l'évaluateur numpy sont comparées à celles du modèle d'origine
+    avant l'écriture du manifest : un artefact incomplet ne se charge pas.
+    """
+    import joblib
+    import numpy as np
+
+    bundle = joblib.load(model_path)
+    model = bundle['model']
+    if not hasattr(model, 'get_booster'):
+        raise ValueError(f"Only XGBoost models can be compiled, got {type(model).__name__}")
+
+    booster = model.get_booster()
+    arrays, n_classes, depth = flatten_booster(booster)
+    if n_classes != len(bundle['label_encoder'].classes_):
+        raise ValueError(f"Model has {n_classes} classes, label encoder has {len(bundle['label_encoder'].classes_)}")
+
+    # Entrées de contrôle dans l'espace du modèle (après scaler et sélection), avec valeurs manquantes
+    rng = np.random.default_rng(0)
+    X_check = rng.normal(size=(n_check, len(bundle['selected_features']))).astype(np.float32)
+    X_check[rng.random(X_check.shape) < 0.05] = np.nan
+    compiled = CompiledClassifier(arrays, n_classes, depth)
+    max_diff = float(np.abs(compiled.predict_proba(X_check) - model.predict_proba(X_check)).max())
+    if max_diff > 1e-4:
+        raise ValueError(f"Compiled model diverges from {os.path.basename(model_path)} (max diff {max_diff:.2e})")
+
+    os.makedirs(output_dir, exist_ok=True)
+    booster.save_model(os.path.join(output_dir, 'model.ubj'))
+    for name in TREE_ARRAYS:
+        np.save(os.path.join(output_dir, f'tree_{name}.npy'), arrays[name])
+
+    np.save(os.path.join(output_dir, 'classes.npy'), np.asarray(bundle['label_encoder'].classes_).astype(str))
+
+    scaler = bundle.get('scaler')
+    if scaler is not None:
+        np.save(os.path.join(output_dir, 'scaler_mean.npy'), np.asarray(scaler.mean_, dtype=np.float64))
+        np.save(os.path.join(output_dir, 'scaler_scale.npy'), np.asarray(scaler.scale_, dtype=np.float64))
+
+    selector = bundle.get('feature_selector')
+    if selector is not None:
+        np.save(os.path.join(output_dir, 'selector_support.npy'), selector.get_support())
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'source': os.path.basename(model_path),
+        'created_at': datetime.now().isoformat(),
+        'best_model_name': bundle['best_model_name'],
+        'all_features': list(bundle['all_features']),
+        'selected_features': list(bundle['selected_features']),
+        'n_classes': n_classes,
+        'n_trees': int(len(arrays['class'])),
+        'depth': depth,
+        'max_check_diff': max_diff,
+        'has_scaler': scaler is not None,
+        'has_feature_selector': selector is not None
+    }
+    # Manifest écrit en dernier : sa présence marque un artefact complet
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_compiled_bundle(model_dir: str, mmap_mode: Optional[str] = None) -> Dict:
+    """Charger un artefact compilé sous la forme d'un bundle compatible avec utils (numpy seul)"""
+    import numpy as np
+
+    with open(os.path.join(model_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format: {manifest.get('format_version')}")
+
+    def load_array(name):
+        return np.load(os.path.join(model_dir, name), mmap_mode=mmap_mode)
+
+    arrays = {name: load_array(f'tree_{name}.npy') for name in TREE_ARRAYS}
+
+    return {
+        'model': CompiledClassifier(arrays, manifest['n_classes'], manifest['depth'], model_dir=model_dir),
+        'scaler': ArrayScaler(load_array('scaler_mean.npy'), load_array('scaler_scale.npy'))
+                  if manifest['has_scaler'] else None,
+        'feature_selector': MaskSelector(load_array('selector_support.npy'))
+                            if manifest['has_feature_selector'] else None,
+        'label_encoder': ClassLabels(np.load(os.path.join(model_dir, 'classes.npy'))),
+        'all_features': manifest['all_features'],
+        'selected_features': manifest['selected_features'],
+        'best_model_name': manifest['best_model_name']
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python model_artifact.py <bundle.pkl> <output_dir>")
+        sys.exit(1)
+
+    compiled = compile_model_bundle(sys.argv[1], sys.argv[2])
+    print(f"Compiled {compiled['source']} -> {sys.argv[2]} "
+          f"({compiled['n_trees']} trees, max diff {compiled['max_check_diff']:.2e})")
@@ -0,0 +1,283 @@
+"""Prévision NDVI par point : un ARIMA(1,1,1) par série, ajusté dans un pool de process
+
+    python ndvi_forecast.py ndvi_store ndvi_forecasts.parquet [workers] [chunk_size] [--warm-start]
+
+Les séries sont lues dans le store créé par timeseries_store.py et découpées en blocs de
+lignes envoyés aux process du pool. Chaque ajustement est borné par un délai ; une série
+trop courte, en échec ou hors délai garde une prévision NaN et son statut. Avec
+--warm-start, chaque point repart des paramètres de la précédente exécution (fichier de
+sortie existant) : utile pour réajuster des séries inchangées, sans gain mesuré après
+l'ajout d'une année (optimum parfois différent sur des séries aussi courtes).
+Le résultat (une ligne par point) est écrit en Parquet avec un rapport JSON à côté
+(débit en séries par seconde, statuts) ; ForecastReader le sert à l'API.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from timeseries_store import TimeSeriesStore
+
+ARIMA_ORDER = (1, 1, 1)
+PARAM_NAMES = ('ar_L1', 'ma_L1', 'sigma2')
+# Même seuil que le notebook : au moins 4 valeurs pour un ARIMA(1,1,1)
+MIN_OBSERVATIONS = 4
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_TIMEOUT = 2.0
+STATUSES = ('ok', 'insufficient', 'failed', 'timeout')
+
+forecast_reader = None
+
+
+# Hors de Exception : un « except Exception » de statsmodels ou scipy ne l'intercepte pas
+class SeriesTimeout(BaseException):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise SeriesTimeout()
+
+
+def fit_series(values: np.ndarray, steps: int = 1, start_params: Optional[np.ndarray] = None,
+               timeout: Optional[float] = None):
+    """Ajuster une série : (prévisions, paramètres, statut)
+
+    Le délai repose sur SIGALRM (thread principal d'un process Unix, comme les workers du
+    pool) ; ailleurs la série n'est pas bornée. Les NaN de tête (point suivi plus tard)
+    sont ignorés ; une année manquante ensuite rendrait voisines des années qui ne le sont
+    pas, la série est alors 'insufficient'.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    forecast = np.full(steps, np.nan)
+    params = np.full(len(PARAM_NAMES), np.nan)
+    observed = ~np.isnan(values)
+    values = values[np.argmax(observed):] if observed.any() else values[:0]
+    if len(values) < MIN_OBSERVATIONS or np.isnan(values).any():
+        return forecast, params, 'insufficient'
+
+    use_alarm = bool(timeout) and hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            # Pas de matrice de covariance des paramètres : inutile pour la prévision
+            fitted = ARIMA(values, order=ARIMA_ORDER).fit(start_params=start_params, cov_type='none')
+            forecast[:] = fitted.forecast(steps=steps)
+            params[:] = fitted.params
+        return forecast, params, 'ok'
+    except SeriesTimeout:
+        return forecast, params, 'timeout'
+    except Exception:
+        return forecast, params, 'failed'
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+
+def fit_chunk(values: np.ndarray, start_params: np.ndarray, steps: int = 1,
+              timeout: Optional[float] = DEFAULT_TIMEOUT) -> Dict[str, np.ndarray]:
+    """Ajuster un bloc de séries (une ligne par série) dans un process du pool
+
+    start_params : paramètres de départ par ligne (NaN -> départ par défaut de statsmodels)
+    """
+    n_series = len(values)
+    forecasts = np.full((n_series, steps), np.nan)
+    params = np.full((n_series, len(PARAM_NAMES)), np.nan)
+    status = np.empty(n_series, dtype=object)
+    seconds = np.zeros(n_series)
+
+    for i in range(n_series):
+        start = time.perf_counter()
+        warm = start_params[i] if not np.isnan(start_params[i]).any() else None
+        forecasts[i], params[i], status[i] = fit_series(values[i], steps, warm, timeout)
+        if status[i] == 'failed' and warm is not None:
+            # Paramètres précédents inadaptés : nouvel essai avec le départ par défaut
+            forecasts[i], params[i], status[i] = fit_series(values[i], steps, None, timeout)
+        seconds[i] = time.perf_counter() - start
+
+    return {'forecasts': forecasts, 'params': params, 'status': status, 'seconds': seconds}
+
+
+def _init_worker():
+    logging.basicConfig(level=logging.INFO)
+    warnings.filterwarnings('ignore')
+    # Import de statsmodels (~1 s) hors du délai de la première série
+    from statsmodels.tsa.arima.model import ARIMA  # noqa: F401
+
+
+def previous_start_params(forecast_path: str, point_ids: np.ndarray) -> np.ndarray:
+    """Paramètres d'une précédente exécution, alignés sur les points (absent -> NaN)"""
+    previous = pd.read_parquet(forecast_path, columns=['point_id', *PARAM_NAMES]).set_index('point_id')
+    return previous.reindex(point_ids)[list(PARAM_NAMES)].to_numpy(dtype=np.float64)
+
+
+def forecast_store(store: TimeSeriesStore, steps: int = 1, max_workers: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                   start_params: Optional[np.ndarray] = None, logger=None):
+    """Prévisions de tous les points du store : (DataFrame une ligne par point, rapport)
+
+    start_params : paramètres de départ (points × PARAM_NAMES, NaN -> départ par défaut)
+    """
+    logger = logger or logging.getLogger(__name__)
+    max_workers = max_workers or os.cpu_count() or 1
+    values = np.asarray(store.values, dtype=np.float64)
+    n_series = len(values)
+    start = time.perf_counter()
+
+    warm_start = start_params is not None
+    if not warm_start:
+        start_params = np.full((n_series, len(PARAM_NAMES)), np.nan)
+
+    forecasts = np.full((n_series, steps), np.nan)
+    params = np.full((n_series, len(PARAM_NAMES)), np.nan)
+    status = np.empty(n_series, dtype=object)
+    seconds = np.zeros(n_series)
+    bounds = [(first, min(first + chunk_size, n_series)) for first in range(0, n_series, chunk_size)]
+
+    # 'spawn' comme le pool des jobs : pas d'héritage des threads du serveur
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker) as pool:
+        futures = [
+            (first, last, pool.submit(fit_chunk, values[first:last], start_params[first:last], steps, timeout))
+            for first, last in bounds
+        ]
+        for done, (first, last, future) in enumerate(futures, 1):
+            result = future.result()
+            forecasts[first:last] = result['forecasts']
+            params[first:last] = result['params']
+            status[first:last] = result['status']
+            seconds[first:last] = result['seconds']
+            logger.info(f"ARIMA: {last}/{n_series} séries ({done}/{len(bounds)} blocs)")
+
+    elapsed = time.perf_counter() - start
+    last_year = store.years[-1]
+    df = pd.DataFrame({
+        'point_id': store.point_ids,
+        'region': store.point_regions(),
+        'longitude': store.coordinates[:, 0],
+        'latitude': store.coordinates[:, 1],
+        f'NDVI_{last_year}': values[:, -1]
+    })
+    for step in range(steps):
+        df[f'NDVI_{last_year + step + 1}_pred'] = forecasts[:, step]
+    for j, name in enumerate(PARAM_NAMES):
+        df[name] = params[:, j]
+    df['status'] = pd.Categorical(status, categories=STATUSES)
+    df['fit_seconds'] = seconds
+    df['model'] = 'ARIMA' + str(ARIMA_ORDER).replace(' ', '')
+
+    status_counts = df['status'].value_counts()
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'model': df['model'].iloc[0] if len(df) else None,
+        'series': n_series,
+        'steps': steps,
+        'last_year': last_year,
+        'forecast_years': [last_year + step + 1 for step in range(steps)],
+        'workers': max_workers,
+        'chunk_size': chunk_size,
+        'timeout': timeout,
+        'warm_start': warm_start,
+        'seconds': round(elapsed, 3),
+        'series_per_second': round(n_series / elapsed, 1) if elapsed > 0 else None,
+        'status': {name: int(status_counts.get(name, 0)) for name in STATUSES}
+    }
+    return df, report
+
+
+def report_path(forecast_path: str) -> str:
+    return os.path.splitext(forecast_path)[0] + '_report.json'
+
+
+def write_forecasts(df: pd.DataFrame, report: Dict, forecast_path: str):
+    tmp_path = forecast_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, forecast_path)
+    with open(report_path(forecast_path), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+class ForecastReader:
+    """Prévisions servies à l'API : fichier relu seulement quand il change"""
+
+    def __init__(self, forecast_path: str):
+        self.forecast_path = forecast_path
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        stat = os.stat(self.forecast_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != signature:
+                df = pd.read_parquet(self.forecast_path)
+                report = None
+                if os.path.exists(report_path(self.forecast_path)):
+                    with open(report_path(self.forecast_path), 'r', encoding='utf-8') as f:
+                        report = json.load(f)
+                self._loaded = (signature, df.set_index('point_id', drop=False), report)
+            return self._loaded[1], self._loaded[2]
+
+    def available(self) -> bool:
+        return os.path.exists(self.forecast_path)
+
+    def report(self) -> Optional[Dict]:
+        return self._load()[1]
+
+    def query(self, region: Optional[str] = None, point_ids: Optional[Sequence[str]] = None,
+              status: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        df, _ = self._load()
+        if point_ids:
+            df = df.loc[df.index.intersection(point_ids)]
+        if region is not None:
+            df = df[df['region'] == region]
+        if status is not None:
+            df = df[df['status'] == status]
+        if limit is not None:
+            df = df.head(limit)
+        return df.reset_index(drop=True)
+
+
+def init_forecast_reader(forecast_path: str):
+    global forecast_reader
+    forecast_reader = ForecastReader(forecast_path)
+    return forecast_reader
+
+
+def get_forecast_reader():
+    return forecast_reader
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) < 2:
+        print("Usage: python ndvi_forecast.py <store_dir> <forecasts.parquet> [workers] [chunk_size] [--warm-start]")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    series_store = TimeSeriesStore(args[0])
+    workers = int(args[2]) if len(args) > 2 else None
+    chunk = int(args[3]) if len(args) > 3 else DEFAULT_CHUNK_SIZE
+    warm = None
+    if '--warm-start' in sys.argv and os.path.exists(args[1]):
+        warm = previous_start_params(args[1], series_store.point_ids)
+    forecasts, forecast_report = forecast_store(series_store, max_workers=workers, chunk_size=chunk,
+                                                start_params=warm)
+    write_forecasts(forecasts, forecast_report, args[1])
+    print(f"{forecast_report['series']} séries en {forecast_report['seconds']}s "
+          f"({forecast_report['series_per_second']} séries/s) -> {args[1]} | {forecast_report['status']}")
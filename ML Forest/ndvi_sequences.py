@@ -0,0 +1,98 @@
+"""Mise en forme des séries NDVI pour la prévision, sans boucle par point
+
+Les tables larges (une ligne par point, colonnes NDVI_<année>) deviennent une matrice
+(points × années) ; le format long (id, année, ndvi) s'obtient par melt et les séquences
+glissantes par sliding_window_view sur cette matrice.
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Date conventionnelle d'une valeur annuelle (composite de la saison de végétation)
+OBSERVATION_DAY = '-06-15'
+
+
+def year_columns(df: pd.DataFrame, years: Optional[Sequence[int]] = None) -> Sequence[str]:
+    if years is None:
+        return sorted(col for col in df.columns if col.startswith('NDVI_') and col[5:].isdigit())
+    return [f'NDVI_{year}' for year in years]
+
+
+def ndvi_matrix(df: pd.DataFrame, years: Optional[Sequence[int]] = None) -> np.ndarray:
+    """Matrice (points × années) float64 d'une table large"""
+    return df[year_columns(df, years)].to_numpy(dtype=np.float64)
+
+
+def to_long_format(df: pd.DataFrame, years: Optional[Sequence[int]] = None,
+                   id_vars: Sequence[str] = ('region', '.geo')) -> pd.DataFrame:
+    """Table longue triée par (id, date) : id, colonnes id_vars, year, ndvi, date
+
+    id est la position de la ligne dans df (comme l'index du combined_df du notebook) ;
+    '.geo' est renommée coordinates.
+    """
+    columns = year_columns(df, years)
+    id_vars = [col for col in id_vars if col in df.columns]
+    wide = df[id_vars + list(columns)].reset_index(drop=True)
+    wide.insert(0, 'id', np.arange(len(wide)))
+
+    long_df = wide.melt(id_vars=['id'] + id_vars, value_vars=columns, var_name='year', value_name='ndvi')
+    year_values = np.array([int(col[5:]) for col in columns])
+    codes = np.repeat(np.arange(len(columns)), len(wide))
+    long_df['year'] = year_values[codes]
+    long_df['date'] = pd.to_datetime([f'{year}{OBSERVATION_DAY}' for year in year_values])[codes]
+    # melt empile année par année : tri stable par id -> (id, date)
+    long_df = long_df.sort_values('id', kind='stable', ignore_index=True)
+    return long_df.rename(columns={'.geo': 'coordinates'})
+
+
+def long_to_matrix(long_df: pd.DataFrame, id_column: str = 'id', time_column: str = 'date',
+                   value_column: str = 'ndvi') -> Tuple[np.ndarray, np.ndarray]:
+    """Matrice (ids × dates) et ids triés d'une table longue (date absente -> NaN)"""
+    ids, id_codes = np.unique(long_df[id_column].to_numpy(), return_inverse=True)
+    times, time_codes = np.unique(long_df[time_column].to_numpy(), return_inverse=True)
+    matrix = np.full((len(ids), len(times)), np.nan)
+    matrix[id_codes, time_codes] = long_df[value_column].to_numpy(dtype=np.float64)
+    return matrix, ids
+
+
+def sliding_sequences(matrix: np.ndarray, n_steps: int = 3,
+                      drop_missing: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Fenêtres (n_steps valeurs -> valeur suivante) de chaque ligne de la matrice
+
+    Renvoie X (fenêtres, n_steps), y (fenêtres,) et la ligne d'origine de chaque fenêtre,
+    dans l'ordre ligne puis temps. drop_missing écarte les fenêtres contenant un NaN.
+    """
+    matrix = np.asarray(matrix)
+    n_points, n_times = matrix.shape
+    if n_times < n_steps + 1:
+        return np.empty((0, n_steps), dtype=matrix.dtype), np.empty(0, dtype=matrix.dtype), np.empty(0, dtype=np.int64)
+
+    windows = sliding_window_view(matrix, n_steps + 1, axis=1).reshape(-1, n_steps + 1)
+    rows = np.repeat(np.arange(n_points), n_times - n_steps)
+    if drop_missing:
+        complete = ~np.isnan(windows).any(axis=1)
+        windows, rows = windows[complete], rows[complete]
+    return windows[:, :n_steps], windows[:, n_steps], rows
+
+
+def prepare_sequences(data: pd.DataFrame, n_steps: int = 3, id_column: str = 'id', time_column: str = 'date',
+                      value_column: str = 'ndvi') -> Tuple[np.ndarray, np.ndarray]:
+    """Équivalent vectorisé de prepare_sequences du notebook (table longue id/date/ndvi)
+
+    Comme la boucle d'origine, les fenêtres portent sur les lignes présentes de chaque id,
+    ids dans leur ordre d'apparition puis dates croissantes : une année absente de la
+    table n'introduit pas de NaN, les années qui l'entourent se suivent dans la fenêtre.
+    """
+    codes, _ = pd.factorize(data[id_column])
+    order = np.lexsort((data[time_column].to_numpy(), codes))
+    codes = codes[order]
+    values = data[value_column].to_numpy(dtype=np.float64)[order]
+    if len(values) < n_steps + 1:
+        return np.empty((0, n_steps)), np.empty(0)
+
+    windows = sliding_window_view(values, n_steps + 1)
+    # Lignes triées par id : même id au début et à la fin -> fenêtre dans une seule série
+    windows = windows[codes[n_steps:] == codes[:len(codes) - n_steps]]
+    return windows[:, :n_steps], windows[:, n_steps]
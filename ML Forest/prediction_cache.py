@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import order_features, transform_features, make_predictions
+
+prediction_cache = None
+
+
+def canonical_values(data_ordered: pd.DataFrame) -> np.ndarray:
+    """Valeurs exactes en float64 contigu, sans arrondi : deux vecteurs distincts ne
+    partagent jamais une clé
+
+    + 0.0 : -0.0 et 0.0 donnent les mêmes octets ; tous les NaN sont remplacés par le
+    même NaN (les bits de charge utile ne changent pas la clé).
+    """
+    values = np.ascontiguousarray(data_ordered.to_numpy(dtype=np.float64)) + 0.0
+    values[np.isnan(values)] = np.nan
+    return values
+
+
+def feature_keys(data_ordered: pd.DataFrame, model_version: Optional[str]) -> List[str]:
+    """Clé stable par ligne : version du modèle + vecteur de features ordonné et canonisé
+
+    "0.5", 0.5 et 5e-1 donnent la même clé.
+    """
+    values = canonical_values(data_ordered)
+    prefix = (model_version or '').encode()
+    return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).hexdigest() for row in values]
+
+
+class PredictionCache:
+    """Cache LRU + TTL des prédictions par ligne, propre à chaque process
+
+    Les entrées de la version précédente sont vidées à chaque bascule de modèle ; la
+    version fait aussi partie de la clé, une requête en vol ne peut donc pas mélanger
+    deux modèles.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get_many(self, keys: List[str]) -> List[Optional[Dict]]:
+        """Lecture groupée (un seul verrou pour tout le lot)"""
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    del self._entries[key]
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[1])
+        return results
+
+    def put_many(self, keys: List[str], values: List[Dict]):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def cached_predictions(data: pd.DataFrame, bundle: Dict) -> List[Dict]:
+    """Prédictions ligne à ligne via le cache : seules les lignes absentes passent par le modèle"""
+    data_ordered = order_features(data, bundle)
+    cache = prediction_cache
+    if cache is None or not cache.enabled:
+        return make_predictions(transform_features(data_ordered, bundle), bundle)
+
+    keys = feature_keys(data_ordered, bundle.get('model_version'))
+    results = cache.get_many(keys)
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        computed = make_predictions(transform_features(data_ordered.iloc[misses], bundle), bundle)
+        for prediction in computed:
+            del prediction['row_id']
+        cache.put_many([keys[i] for i in misses], computed)
+        for i, prediction in zip(misses, computed):
+            results[i] = prediction
+
+    return [{'row_id': i, **result} for i, result in enumerate(results)]
+
+
+def init_prediction_cache(max_size: int = 10000, ttl: float = 3600.0):
+    global prediction_cache
+    prediction_cache = PredictionCache(max_size, ttl)
+    return prediction_cache
+
+
+def get_prediction_cache():
+    return prediction_cache
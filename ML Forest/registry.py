@@ -0,0 +1,335 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from model_artifact import is_compiled_model
+from prediction_cache import get_prediction_cache
+from utils import read_model_bundle, set_model_data, prepare_data, make_predictions
+
+ARTIFACT_EXTENSIONS = ('.pkl', '.joblib')
+STATE_FILE = 'model_registry.json'
+
+registry = None
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def artifact_checksum(path: str) -> str:
+    """Checksum d'un fichier, ou d'un artefact compilé (dossier) sur ses fichiers triés"""
+    if not os.path.isdir(path):
+        return file_checksum(path)
+
+    sha256 = hashlib.sha256()
+    for filename in sorted(os.listdir(path)):
+        sha256.update(filename.encode())
+        sha256.update(bytes.fromhex(file_checksum(os.path.join(path, filename))))
+    return sha256.hexdigest()
+
+
+def artifact_stat(path: str):
+    """(mtime, taille) d'un fichier ou du contenu d'un dossier compilé"""
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+
+    stats = [os.stat(os.path.join(path, filename)) for filename in os.listdir(path)]
+    return max(stat.st_mtime for stat in stats), sum(stat.st_size for stat in stats)
+
+
+class ModelRegistry:
+    """Index versionné des artefacts du modèle et bascule à chaud du modèle servi
+
+    Une version est identifiée par le début du SHA-256 du fichier. Le modèle actif et
+    le précédent restent chargés en mémoire : le rollback est instantané. Le choix de la
+    version active est écrit dans model_registry.json, relu par chaque process (workers
+    pré-forkés, redémarrage) pour converger vers la même version.
+
+    Déployer un nouveau modèle sous un nouveau nom (ou par renommage atomique) plutôt que
+    de réécrire un fichier en place : un bundle chargé avec mmap_mode lit encore ses pages.
+    """
+
+    def __init__(self, model_dir: str, default_model: str, logger, mmap_mode: Optional[str] = None,
+                 sync_interval: float = 2.0):
+        self.model_dir = model_dir
+        self.default_model = default_model
+        self.logger = logger
+        self.mmap_mode = mmap_mode
+        self.sync_interval = sync_interval
+        self.index = {}
+        self.active = None
+        self.previous = None
+        self.loading = None
+        self.last_error = None
+        self._checksums = {}
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._state_mtime = None
+        self._created = time.monotonic()
+        self.ready_seconds = None
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.model_dir, STATE_FILE)
+
+    # ============= INDEX =============
+    def scan(self) -> Dict[str, Dict]:
+        """Indexer les artefacts par version (checksum recalculé seulement si le fichier a changé)"""
+        index = {}
+        for filename in sorted(os.listdir(self.model_dir)):
+            path = os.path.join(self.model_dir, filename)
+            if not filename.endswith(ARTIFACT_EXTENSIONS) and not is_compiled_model(path):
+                continue
+
+            mtime, size = artifact_stat(path)
+            cached = self._checksums.get(path)
+            if cached and cached[:2] == (mtime, size):
+                checksum = cached[2]
+            else:
+                checksum = artifact_checksum(path)
+                self._checksums[path] = (mtime, size, checksum)
+
+            version = checksum[:12]
+            index[version] = {
+                'version': version,
+                'filename': filename,
+                'path': path,
+                'checksum': checksum,
+                'compiled': os.path.isdir(path),
+                'size': size,
+                'modified_at': datetime.fromtimestamp(mtime).isoformat()
+            }
+
+        self.index = index
+        return index
+
+    def find(self, version: Optional[str] = None, filename: Optional[str] = None) -> Optional[Dict]:
+        self.scan()
+        if version:
+            return self.index.get(version)
+
+        filename = filename or self.default_model
+        for entry in self.index.values():
+            if entry['filename'] == filename:
+                return entry
+        return None
+
+    def list_versions(self) -> List[Dict]:
+        self.scan()
+        active_version = self.active['version'] if self.active else None
+        previous_version = self.previous['version'] if self.previous else None
+
+        return [
+            {
+                **{key: value for key, value in entry.items() if key != 'path'},
+                'active': entry['version'] == active_version,
+                'previous': entry['version'] == previous_version,
+                'loading': entry['version'] == self.loading
+            }
+            for entry in self.index.values()
+        ]
+
+    # ============= CHARGEMENT =============
+    @staticmethod
+    def _warm_up(bundle: Dict):
+        # Première prédiction hors trafic : aucune requête ne paie l'initialisation
+        sample = pd.DataFrame([{feature: 0.0 for feature in bundle['all_features']}])
+        make_predictions(prepare_data(sample, bundle), bundle)
+
+    def _load_entry(self, entry: Dict) -> Dict:
+        start = time.monotonic()
+        bundle = read_model_bundle(entry['path'], self.mmap_mode)
+        self._warm_up(bundle)
+        entry['load_seconds'] = round(time.monotonic() - start, 3)
+        return bundle
+
+    def _attach_native(self, entry: Dict, bundle: Dict):
+        """Artefact compilé : rattacher le booster XGBoost une fois la version servie"""
+        model = bundle['model']
+        if not hasattr(model, 'attach_booster'):
+            return
+        try:
+            model.attach_booster()
+            self._warm_up(bundle)
+        except Exception as e:
+            # L'évaluateur numpy reste en service
+            self.logger.warning(f"Model version {entry['version']}: native booster unavailable ({str(e)})")
+
+    def _activate(self, entry: Dict, bundle: Dict):
+        with self._lock:
+            if self.active is not None and self.active['version'] != entry['version']:
+                self.previous = self.active
+            self.active = {
+                'version': entry['version'],
+                'entry': entry,
+                'bundle': bundle,
+                'activated_at': datetime.now().isoformat()
+            }
+            set_model_data(bundle, entry['path'], entry['version'])
+            self._invalidate_cache()
+            if self.ready_seconds is None:
+                self.ready_seconds = round(time.monotonic() - self._created, 3)
+
+        self.logger.info(f"Model version {entry['version']} active ({entry['filename']}: {bundle['best_model_name']}, "
+                         f"loaded in {entry.get('load_seconds')}s)")
+
+    @staticmethod
+    def _invalidate_cache():
+        prediction_cache = get_prediction_cache()
+        if prediction_cache is not None:
+            prediction_cache.clear()
+
+    def load(self, entry: Dict):
+        """Chargement synchrone (démarrage sous gunicorn --preload)"""
+        bundle = self._load_entry(entry)
+        self._attach_native(entry, bundle)
+        self._activate(entry, bundle)
+
+    def load_async(self, entry: Dict, publish: bool = False) -> bool:
+        """Charger une version en arrière-plan ; le modèle actif sert jusqu'à la bascule"""
+        with self._lock:
+            if self.loading is not None:
+                return False
+            self.loading = entry['version']
+
+        thread = threading.Thread(target=self._load_in_background, args=(entry, publish), daemon=True)
+        thread.start()
+        return True
+
+    def _load_in_background(self, entry: Dict, publish: bool):
+        try:
+            bundle = self._load_entry(entry)
+            self._activate(entry, bundle)
+            self.last_error = None
+            # Les autres process ne suivent qu'une version chargée avec succès
+            if publish:
+                self.write_state(entry['version'])
+            # La version sert déjà (numpy) pendant le chargement du booster natif
+            self._attach_native(entry, bundle)
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Model version {entry['version']} loading error: {str(e)}")
+        finally:
+            self.loading = None
+
+    def rollback(self) -> Optional[Dict]:
+        """Revenir instantanément à la version précédente (déjà chargée)"""
+        with self._lock:
+            if self.previous is None:
+                return None
+            self.active, self.previous = self.previous, self.active
+            set_model_data(self.active['bundle'], self.active['entry']['path'], self.active['version'])
+            self._invalidate_cache()
+
+        self.logger.info(f"Rolled back to model version {self.active['version']}")
+        return self.active['entry']
+
+    # ============= ÉTAT PARTAGÉ =============
+    def _read_state(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_state(self, version: str):
+        state = {'active': version, 'updated_at': datetime.now().isoformat()}
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self._state_mtime = os.path.getmtime(self.state_path)
+
+    def sync(self, force: bool = False):
+        """Suivre la version demandée dans model_registry.json (appelé avant chaque requête)"""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        try:
+            state_mtime = os.path.getmtime(self.state_path)
+        except OSError:
+            return
+        if state_mtime == self._state_mtime:
+            return
+        self._state_mtime = state_mtime
+
+        target = self._read_state().get('active')
+        if not target or (self.active and self.active['version'] == target):
+            return
+
+        if self.previous and self.previous['version'] == target:
+            self.rollback()
+            return
+
+        entry = self.find(version=target)
+        if entry is None:
+            self.logger.warning(f"Requested model version {target} not found")
+        elif not self.load_async(entry):
+            # Un chargement est déjà en cours : réessayer à la prochaine synchronisation
+            self._state_mtime = None
+
+    def is_ready(self) -> bool:
+        return self.active is not None
+
+    def status(self) -> Dict:
+        return {
+            'active_version': self.active['version'] if self.active else None,
+            'active_file': self.active['entry']['filename'] if self.active else None,
+            'activated_at': self.active['activated_at'] if self.active else None,
+            'previous_version': self.previous['version'] if self.previous else None,
+            'loading_version': self.loading,
+            'ready_seconds': self.ready_seconds,
+            'load_seconds': self.active['entry'].get('load_seconds') if self.active else None,
+            'last_error': self.last_error
+        }
+
+
+def init_registry(model_dir: str, default_model: str, logger, mmap_mode: Optional[str] = None,
+                  background: bool = True):
+    """Créer le registre et charger la version demandée (ou le modèle par défaut)
+
+    En arrière-plan par défaut : le service répond tout de suite (/health) et /ready passe
+    à 200 quand le modèle est actif. Sous gunicorn --preload, charger de façon synchrone :
+    un thread du master ne survit pas au fork des workers.
+    """
+    global registry
+    registry = ModelRegistry(model_dir, default_model, logger, mmap_mode=mmap_mode)
+    registry.scan()
+
+    target = registry._read_state().get('active')
+    entry = registry.find(version=target) if target else None
+    entry = entry or registry.find(filename=default_model)
+
+    if entry is None:
+        logger.error(f"Model file not found: {default_model}")
+        return registry
+
+    if background:
+        registry.load_async(entry)
+    else:
+        try:
+            registry.load(entry)
+        except Exception as e:
+            registry.last_error = str(e)
+            logger.error(f"Model loading error: {str(e)}")
+
+    if os.path.exists(registry.state_path):
+        registry._state_mtime = os.path.getmtime(registry.state_path)
+    return registry
+
+
+def get_registry():
+    return registry
@@ -8,14 +8,24 @@ import io
 import json
 
 from utils import (
-    get_model_data, get_all_features, get_selected_features,
+    get_model_data, get_all_features, get_selected_features, get_model_version,
     allowed_file, validate_features, validate_data_types,
     process_file, prepare_data, make_predictions,
     calculate_statistics, generate_recommendations
 )
+from jobs import get_job_manager, job_to_dict
+from registry import get_registry
+from prediction_cache import get_prediction_cache, cached_predictions
+from ndvi_forecast import get_forecast_reader
 
 def register_routes(app):
     
+    @app.before_request
+    def sync_model_version():
+        registry = get_registry()
+        if registry is not None:
+            registry.sync()
+    
     @app.route('/')
     def index():
         # Fix: Specify UTF-8 encoding when reading the HTML file
@@ -26,15 +36,35 @@ def register_routes(app):
     def health_check():
         model_data = get_model_data()
         all_features = get_all_features()
+        prediction_cache = get_prediction_cache()
         
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
             'model_loaded': model_data is not None,
             'model_name': model_data['best_model_name'] if model_data else None,
-            'features_count': len(all_features) if all_features else 0
+            'model_version': get_model_version(),
+            'features_count': len(all_features) if all_features else 0,
+            'prediction_cache': prediction_cache.stats() if prediction_cache else None
         })
 
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        # /health = le process répond ; /ready = le modèle est chargé et peut prédire
+        registry = get_registry()
+        ready = registry is not None and registry.is_ready()
+        status = registry.status() if registry else {}
+
+        return jsonify({
+            'ready': ready,
+            'timestamp': datetime.now().isoformat(),
+            'model_version': status.get('active_version'),
+            'loading_version': status.get('loading_version'),
+            'ready_seconds': status.get('ready_seconds'),
+            'load_seconds': status.get('load_seconds'),
+            'last_error': status.get('last_error')
+        }), 200 if ready else 503
+
     @app.route('/model/info', methods=['GET'])
     def model_info():
         model_data = get_model_data()
@@ -93,7 +123,6 @@ def register_routes(app):
     def predict_single():
         try:
             model_data = get_model_data()
-            all_features = get_all_features()
             
             if model_data is None:
                 return jsonify({'success': False, 'message': 'Model not loaded'}), 500
@@ -103,17 +132,17 @@ def register_routes(app):
                 return jsonify({'success': False, 'message': 'No data provided'}), 400
             
             df = pd.DataFrame([data])
-            is_valid, missing_features, extra_features = validate_features(df)
+            is_valid, missing_features, extra_features = validate_features(df, model_data)
             
             if not is_valid:
                 return jsonify({
                     'success': False,
                     'message': 'Missing features',
                     'missing_features': missing_features,
-                    'required_features': all_features
+                    'required_features': model_data['all_features']
                 }), 400
             
-            types_valid, invalid_columns = validate_data_types(df)
+            types_valid, invalid_columns = validate_data_types(df, model_data)
             if not types_valid:
                 return jsonify({
                     'success': False,
@@ -121,8 +150,8 @@ def register_routes(app):
                     'invalid_columns': invalid_columns
                 }), 400
             
-            data_scaled = prepare_data(df)
-            predictions = make_predictions(data_scaled)
+            # Même parcelle resoumise : résultat servi par le cache
+            predictions = cached_predictions(df, model_data)
             
             return jsonify({
                 'success': True,
@@ -148,7 +177,7 @@ def register_routes(app):
                 return jsonify({'success': False, 'message': 'No data provided'}), 400
             
             df = pd.DataFrame(data['data'])
-            is_valid, missing_features, extra_features = validate_features(df)
+            is_valid, missing_features, extra_features = validate_features(df, model_data)
             
             if not is_valid:
                 return jsonify({
@@ -157,8 +186,8 @@ def register_routes(app):
                     'missing_features': missing_features
                 }), 400
             
-            data_scaled = prepare_data(df)
-            predictions = make_predictions(data_scaled)
+            # Lignes déjà vues lues en bloc dans le cache, seules les autres sont prédites
+            predictions = cached_predictions(df, model_data)
             statistics = calculate_statistics(predictions)
             recommendations = generate_recommendations(statistics)
             
@@ -200,7 +229,7 @@ def register_routes(app):
                 file_extension = filename.rsplit('.', 1)[1].lower()
                 df = process_file(file_path, file_extension)
                 
-                is_valid, missing_features, extra_features = validate_features(df)
+                is_valid, missing_features, extra_features = validate_features(df, model_data)
                 if not is_valid:
                     return jsonify({
                         'success': False,
@@ -209,7 +238,7 @@ def register_routes(app):
                         'found_features': df.columns.tolist()
                     }), 400
                 
-                types_valid, invalid_columns = validate_data_types(df)
+                types_valid, invalid_columns = validate_data_types(df, model_data)
                 if not types_valid:
                     return jsonify({
                         'success': False,
@@ -217,8 +246,8 @@ def register_routes(app):
                         'invalid_columns': invalid_columns
                     }), 400
                 
-                data_scaled = prepare_data(df)
-                predictions = make_predictions(data_scaled)
+                data_scaled = prepare_data(df, model_data)
+                predictions = make_predictions(data_scaled, model_data)
                 statistics = calculate_statistics(predictions)
                 recommendations = generate_recommendations(statistics)
                 
@@ -323,8 +352,8 @@ def register_routes(app):
                 }
                 
                 if model_data:
-                    is_valid, missing_features, extra_features = validate_features(df)
-                    types_valid, invalid_columns = validate_data_types(df)
+                    is_valid, missing_features, extra_features = validate_features(df, model_data)
+                    types_valid, invalid_columns = validate_data_types(df, model_data)
                     
                     validation_results.update({
                         'features_valid': is_valid,
@@ -385,4 +414,226 @@ def register_routes(app):
                 
         except Exception as e:
             app.logger.error(f"Export error: {str(e)}")
-            return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/jobs', methods=['POST'])
+    def submit_job():
+        try:
+            manager = get_job_manager()
+            if manager is None:
+                return jsonify({'success': False, 'message': 'Job queue not available'}), 500
+            
+            if get_model_data() is None:
+                return jsonify({'success': False, 'message': 'Model not loaded'}), 500
+            
+            if not manager.can_accept():
+                return jsonify({'success': False, 'message': 'Too many pending jobs, retry later'}), 429
+            
+            if 'file' in request.files:
+                file = request.files['file']
+                if file.filename == '' or not allowed_file(file.filename):
+                    return jsonify({'success': False, 'message': 'Invalid file'}), 400
+                
+                job_id, job_folder = manager.new_job_folder()
+                filename = secure_filename(file.filename)
+                file_extension = filename.rsplit('.', 1)[1].lower()
+                input_path = os.path.join(job_folder, f"input.{file_extension}")
+                file.save(input_path)
+                original_name = file.filename
+            else:
+                data = request.get_json(silent=True)
+                if not data or 'data' not in data:
+                    return jsonify({'success': False, 'message': 'No file or data provided'}), 400
+                
+                job_id, job_folder = manager.new_job_folder()
+                file_extension = 'json'
+                input_path = os.path.join(job_folder, 'input.json')
+                with open(input_path, 'w', encoding='utf-8') as f:
+                    json.dump({'data': data['data']}, f)
+                original_name = 'batch.json'
+            
+            job = manager.submit(job_id, original_name, input_path, file_extension)
+            
+            return jsonify({
+                'success': True,
+                'job': job_to_dict(job),
+                'status_url': f"/jobs/{job_id}",
+                'result_url': f"/jobs/{job_id}/result"
+            }), 202
+            
+        except Exception as e:
+            app.logger.error(f"Job submission error: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/jobs', methods=['GET'])
+    def list_jobs():
+        manager = get_job_manager()
+        if manager is None:
+            return jsonify({'success': False, 'message': 'Job queue not available'}), 500
+        
+        limit = request.args.get('limit', 50, type=int)
+        
+        return jsonify({
+            'success': True,
+            'jobs': [job_to_dict(job) for job in manager.list(limit)]
+        })
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        manager = get_job_manager()
+        if manager is None:
+            return jsonify({'success': False, 'message': 'Job queue not available'}), 500
+        
+        job = manager.get(job_id)
+        if job is None:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        
+        return jsonify({'success': True, 'job': job_to_dict(job)})
+
+    @app.route('/jobs/<job_id>/result', methods=['GET'])
+    def job_result(job_id):
+        try:
+            manager = get_job_manager()
+            if manager is None:
+                return jsonify({'success': False, 'message': 'Job queue not available'}), 500
+            
+            job = manager.get(job_id)
+            if job is None:
+                return jsonify({'success': False, 'message': 'Job not found'}), 404
+            
+            if job['status'] != 'completed':
+                return jsonify({
+                    'success': False,
+                    'message': f"Job is {job['status']}",
+                    'job': job_to_dict(job)
+                }), 409
+            
+            export_format = request.args.get('format', 'json').lower()
+            
+            if export_format == 'json':
+                return send_file(
+                    os.path.abspath(job['result_path']),
+                    mimetype='application/json',
+                    as_attachment=True,
+                    download_name=f'forest_health_predictions_{job_id}.json'
+                )
+            
+            elif export_format == 'csv':
+                with open(job['result_path'], 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                csv_content = pd.json_normalize(result['predictions']).to_csv(index=False)
+                
+                return send_file(
+                    io.BytesIO(csv_content.encode()),
+                    mimetype='text/csv',
+                    as_attachment=True,
+                    download_name=f'forest_health_predictions_{job_id}.csv'
+                )
+            
+            else:
+                return jsonify({'success': False, 'message': 'Unsupported export format'}), 400
+                
+        except Exception as e:
+            app.logger.error(f"Job result error: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/models', methods=['GET'])
+    def list_model_versions():
+        registry = get_registry()
+        if registry is None:
+            return jsonify({'success': False, 'message': 'Model registry not available'}), 500
+        
+        return jsonify({
+            'success': True,
+            'registry': registry.status(),
+            'versions': registry.list_versions()
+        })
+
+    @app.route('/models/reload', methods=['POST'])
+    def reload_model():
+        try:
+            registry = get_registry()
+            if registry is None:
+                return jsonify({'success': False, 'message': 'Model registry not available'}), 500
+            
+            data = request.get_json(silent=True) or {}
+            entry = registry.find(version=data.get('version'), filename=data.get('filename'))
+            if entry is None:
+                return jsonify({'success': False, 'message': 'Model version not found'}), 404
+            
+            if registry.active and registry.active['version'] == entry['version']:
+                return jsonify({
+                    'success': True,
+                    'message': 'Model version already active',
+                    'registry': registry.status()
+                })
+            
+            if not registry.load_async(entry, publish=True):
+                return jsonify({
+                    'success': False,
+                    'message': 'A model version is already loading',
+                    'registry': registry.status()
+                }), 409
+            
+            return jsonify({
+                'success': True,
+                'message': f"Loading model version {entry['version']}",
+                'registry': registry.status()
+            }), 202
+            
+        except Exception as e:
+            app.logger.error(f"Model reload error: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/models/rollback', methods=['POST'])
+    def rollback_model():
+        registry = get_registry()
+        if registry is None:
+            return jsonify({'success': False, 'message': 'Model registry not available'}), 500
+        
+        entry = registry.rollback()
+        if entry is None:
+            return jsonify({'success': False, 'message': 'No previous model version'}), 409
+        
+        registry.write_state(entry['version'])
+        
+        return jsonify({
+            'success': True,
+            'message': f"Rolled back to model version {entry['version']}",
+            'registry': registry.status()
+        })
+
+    @app.route('/forecast/ndvi', methods=['GET'])
+    def ndvi_forecasts():
+        try:
+            reader = get_forecast_reader()
+            if reader is None or not reader.available():
+                return jsonify({'success': False, 'message': 'NDVI forecasts not available'}), 404
+            
+            limit = request.args.get('limit', 1000, type=int)
+            df = reader.query(
+                region=request.args.get('region'),
+                point_ids=request.args.getlist('point_id') or None,
+                status=request.args.get('status'),
+                limit=limit
+            )
+            records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+            
+            return jsonify({
+                'success': True,
+                'count': len(records),
+                'forecasts': records,
+                'report': reader.report()
+            })
+            
+        except Exception as e:
+            app.logger.error(f"NDVI forecast error: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/forecast/ndvi/report', methods=['GET'])
+    def ndvi_forecast_report():
+        reader = get_forecast_reader()
+        if reader is None or not reader.available():
+            return jsonify({'success': False, 'message': 'NDVI forecasts not available'}), 404
+        
+        return jsonify({'success': True, 'report': reader.report()})
\ No newline at end of file
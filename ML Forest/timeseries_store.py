@@ -0,0 +1,217 @@
+"""Stockage des séries NDVI : matrice (points × années) float32 mappée en mémoire
+
+    python timeseries_store.py ndvi_store timeseries_samples_*_2024.csv
+
+Le dossier produit contient values.npy (float32, une ligne par point, une colonne par
+année, points regroupés par région), point_ids.npy, coordinates.npy (longitude, latitude)
+et un manifest.json (années, bornes de chaque région). Une région est une tranche de lignes
+contiguë : region / période se lisent comme des vues de la matrice, sans copie ni lecture
+du reste du fichier.
+
+La matrice est allouée avec des colonnes de réserve : ajouter une année écrit une colonne
+en place puis met à jour le manifest, les lecteurs ouverts ne voient la nouvelle année qu'à
+leur réouverture. Réserve épuisée -> réécriture avec une capacité doublée.
+"""
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Décodage .geo partagé avec le chargement des CSV régionaux (Data/coordinates.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data'))
+from coordinates import extract_point_coordinates  # noqa: E402
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+SPARE_YEARS = 5
+YEAR_COLUMN = re.compile(r'^NDVI_(\d{4})$')
+# timeseries_samples_<région>_<année>.csv (la région peut contenir des '_')
+TIMESERIES_FILE = re.compile(r'timeseries_samples_(.+)_\d{4}\.csv$')
+
+
+def region_from_filename(path: str) -> str:
+    match = TIMESERIES_FILE.search(os.path.basename(path))
+    return match.group(1) if match else os.path.splitext(os.path.basename(path))[0]
+
+
+def _write_array(path: str, array: np.ndarray):
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class TimeSeriesStore:
+    """Lecture (et ajout d'années) d'un dossier créé par build_store"""
+
+    def __init__(self, path: str, mmap_mode: str = 'r'):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._matrix = np.load(os.path.join(path, 'values.npy'), mmap_mode=mmap_mode)
+        self.point_ids = np.load(os.path.join(path, 'point_ids.npy'))
+        self.coordinates = np.load(os.path.join(path, 'coordinates.npy'), mmap_mode=mmap_mode)
+        self._positions = None
+
+    @property
+    def years(self) -> List[int]:
+        return self.manifest['years']
+
+    @property
+    def regions(self) -> Dict[str, List[int]]:
+        return self.manifest['regions']
+
+    @property
+    def n_points(self) -> int:
+        return self._matrix.shape[0]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Vue (points × années renseignées) de la matrice mappée"""
+        return self._matrix[:, :len(self.years)]
+
+    # ============= SÉLECTION =============
+    def region_slice(self, region: Optional[str] = None) -> slice:
+        if region is None:
+            return slice(0, self.n_points)
+        if region not in self.regions:
+            raise KeyError(f"Région inconnue: {region}")
+        start, stop = self.regions[region]
+        return slice(start, stop)
+
+    def year_slice(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> slice:
+        years = np.asarray(self.years)
+        start = 0 if start_year is None else int(np.searchsorted(years, start_year, side='left'))
+        stop = len(years) if end_year is None else int(np.searchsorted(years, end_year, side='right'))
+        return slice(start, stop)
+
+    def select(self, region: Optional[str] = None, start_year: Optional[int] = None,
+               end_year: Optional[int] = None) -> np.ndarray:
+        """Vue sans copie des valeurs d'une région et d'une période (bornes incluses)"""
+        return self._matrix[self.region_slice(region), self.year_slice(start_year, end_year)]
+
+    def select_years(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> List[int]:
+        return self.years[self.year_slice(start_year, end_year)]
+
+    def position(self, point_id: str) -> int:
+        if self._positions is None:
+            self._positions = {point_id: i for i, point_id in enumerate(self.point_ids.tolist())}
+        return self._positions[point_id]
+
+    def series(self, point_id: str) -> pd.Series:
+        return pd.Series(self.values[self.position(point_id)], index=self.years, name=point_id)
+
+    def to_frame(self, region: Optional[str] = None) -> pd.DataFrame:
+        """Format large (comme les CSV d'origine) d'une région ou de tous les points"""
+        rows = self.region_slice(region)
+        df = pd.DataFrame(self.values[rows], columns=[f'NDVI_{year}' for year in self.years])
+        df.insert(0, 'point_id', self.point_ids[rows])
+        df['region'] = self.point_regions()[rows]
+        df['longitude'] = self.coordinates[rows, 0]
+        df['latitude'] = self.coordinates[rows, 1]
+        return df
+
+    def point_regions(self) -> np.ndarray:
+        regions = np.empty(self.n_points, dtype=object)
+        for region, (start, stop) in self.regions.items():
+            regions[start:stop] = region
+        return regions
+
+    # ============= AJOUT D'UNE ANNÉE =============
+    def append_year(self, year: int, values) -> int:
+        """Écrire la colonne d'une nouvelle année
+
+        values : tableau aligné sur les points du store, ou Series indexée par point_id
+        (points absents -> NaN). Renvoie le nombre de valeurs renseignées.
+        """
+        if self.years and year <= self.years[-1]:
+            raise ValueError(f"Année {year} déjà présente ou antérieure à {self.years[-1]}")
+        if isinstance(values, pd.Series):
+            values = values.reindex(self.point_ids)
+        column = np.asarray(values, dtype=np.float32)
+        if column.shape != (self.n_points,):
+            raise ValueError(f"{column.shape[0]} valeurs pour {self.n_points} points")
+
+        values_path = os.path.join(self.path, 'values.npy')
+        n_years = len(self.years)
+        if n_years == self._matrix.shape[1]:
+            grown = np.full((self.n_points, max(2 * n_years, n_years + 1)), np.nan, dtype=np.float32)
+            grown[:, :n_years] = self._matrix[:, :n_years]
+            _write_array(values_path, grown)
+
+        matrix = np.load(values_path, mmap_mode='r+')
+        matrix[:, n_years] = column
+        matrix.flush()
+        del matrix
+
+        self.manifest['years'] = self.years + [int(year)]
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        _write_manifest(self.path, self.manifest)
+        self._matrix = np.load(values_path, mmap_mode=self.mmap_mode)
+        return int(np.isfinite(column).sum())
+
+
+def _write_manifest(path: str, manifest: Dict):
+    tmp_path = os.path.join(path, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+
+def build_store(path: str, frames: Dict[str, pd.DataFrame], spare_years: int = SPARE_YEARS,
+                sources: Optional[Sequence[str]] = None) -> TimeSeriesStore:
+    """Créer le store à partir de tables larges (NDVI_<année>, system:index, .geo) par région"""
+    years = sorted({int(match.group(1)) for df in frames.values()
+                    for match in map(YEAR_COLUMN.match, df.columns) if match})
+    n_points = sum(len(df) for df in frames.values())
+    os.makedirs(path, exist_ok=True)
+
+    matrix = np.full((n_points, len(years) + spare_years), np.nan, dtype=np.float32)
+    coordinates = np.full((n_points, 2), np.nan)
+    point_ids = []
+    regions = {}
+    start = 0
+    for region, df in frames.items():
+        stop = start + len(df)
+        for j, year in enumerate(years):
+            if f'NDVI_{year}' in df.columns:
+                matrix[start:stop, j] = df[f'NDVI_{year}'].to_numpy(dtype=np.float32)
+        if '.geo' in df.columns:
+            coordinates[start:stop] = np.column_stack(extract_point_coordinates(df['.geo']))
+        local_ids = df['system:index'].astype(str) if 'system:index' in df.columns else pd.RangeIndex(len(df)).astype(str)
+        point_ids.extend(f"{region}:{local_id}" for local_id in local_ids)
+        regions[region] = [start, stop]
+        start = stop
+
+    _write_array(os.path.join(path, 'values.npy'), matrix)
+    _write_array(os.path.join(path, 'point_ids.npy'), np.asarray(point_ids, dtype=str))
+    _write_array(os.path.join(path, 'coordinates.npy'), coordinates)
+    _write_manifest(path, {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'years': years,
+        'n_points': n_points,
+        'regions': regions,
+        'sources': list(sources or [])
+    })
+    return TimeSeriesStore(path)
+
+
+def build_store_from_csv(path: str, files: Sequence[str], spare_years: int = SPARE_YEARS) -> TimeSeriesStore:
+    frames = {}
+    for file in files:
+        frames[region_from_filename(file)] = pd.read_csv(file, dtype={'system:index': str})
+    return build_store(path, frames, spare_years, sources=[os.path.basename(file) for file in files])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python timeseries_store.py <dossier_sortie> <timeseries_samples_*.csv>...")
+        sys.exit(1)
+    store = build_store_from_csv(sys.argv[1], sys.argv[2:])
+    print(f"{store.n_points} points, années {store.years[0]}-{store.years[-1]}, régions: {list(store.regions)}")
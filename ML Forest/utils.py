@@ -1,26 +1,68 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 
+from model_artifact import is_compiled_model, load_compiled_bundle
+
 model_data = None
 all_features = None
 selected_features = None
+model_path = None
+model_version = None
+
+BUNDLE_KEYS = ['model', 'label_encoder', 'all_features', 'selected_features', 'best_model_name']
+
+def read_model_bundle(path: str, mmap_mode: Optional[str] = None) -> Dict:
+    # mmap_mode='r' : les tableaux NumPy du bundle (scaler, sélecteur) restent
+    # adossés au fichier et leurs pages sont partagées entre process
+    if is_compiled_model(path):
+        # Artefact compilé : numpy seul, sans sklearn ni xgboost au démarrage
+        return load_compiled_bundle(path, mmap_mode=mmap_mode)
+
+    # Import différé : joblib (et sklearn/xgboost via le pickle) ne sert qu'ici
+    import joblib
+    bundle = joblib.load(path, mmap_mode=mmap_mode)
+    if not isinstance(bundle, dict) or any(key not in bundle for key in BUNDLE_KEYS):
+        raise ValueError(f"Not a model bundle: {os.path.basename(path)}")
+    return bundle
+
+def set_model_data(bundle: Dict, path: Optional[str] = None, version: Optional[str] = None):
+    """Bascule du modèle actif (les requêtes lisent le bundle une seule fois)"""
+    global model_data, all_features, selected_features, model_path, model_version
+    # La version voyage avec le bundle : une requête qui a lu l'ancien bundle
+    # ne peut pas associer ses résultats à la nouvelle version
+    bundle['model_version'] = version
+    model_data = bundle
+    all_features = bundle['all_features']
+    selected_features = bundle['selected_features']
+    model_path = path
+    model_version = version
 
-def load_model(model_path: str, logger):
-    global model_data, all_features, selected_features
+def load_model(path: str, logger, mmap_mode: Optional[str] = None, version: Optional[str] = None):
+    global model_data
     try:
-        if os.path.exists(model_path):
-            model_data = joblib.load(model_path)
-            all_features = model_data['all_features']
-            selected_features = model_data['selected_features']
+        if os.path.exists(path):
+            set_model_data(read_model_bundle(path, mmap_mode), path, version)
             logger.info(f"Model loaded: {model_data['best_model_name']}")
     except Exception as e:
         logger.error(f"Model loading error: {str(e)}")
         model_data = None
 
+def unload_model():
+    """Libérer le modèle actif (process de job, une fois le job terminé)"""
+    global model_data, all_features, selected_features, model_path, model_version
+    model_data = all_features = selected_features = model_path = model_version = None
+
+def set_model_threads(n_threads: int):
+    """Limiter les threads du modèle (un worker pré-forké = un cœur)"""
+    if model_data is None:
+        return
+    model = model_data['model']
+    if hasattr(model, 'set_params') and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_threads)
+
 def get_model_data():
     return model_data
 
@@ -30,13 +72,21 @@ def get_all_features():
 def get_selected_features():
     return selected_features
 
+def get_model_path():
+    return model_path
+
+def get_model_version():
+    return model_version
+
 def allowed_file(filename: str) -> bool:
     ALLOWED_EXTENSIONS = {'txt', 'csv', 'xlsx', 'xls'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def validate_features(data: pd.DataFrame) -> Tuple[bool, List[str], List[str]]:
-    if model_data is None or all_features is None:
+def validate_features(data: pd.DataFrame, bundle: Optional[Dict] = None) -> Tuple[bool, List[str], List[str]]:
+    bundle = bundle or get_model_data()
+    if bundle is None:
         return False, [], []
+    all_features = bundle['all_features']
     
     data_columns = set(data.columns.str.strip().str.lower())
     all_features_lower = set([f.lower() for f in all_features])
@@ -53,11 +103,13 @@ def validate_features(data: pd.DataFrame) -> Tuple[bool, List[str], List[str]]:
     
     return len(missing_features) == 0, missing_features_original, list(extra_features)
 
-def validate_data_types(data: pd.DataFrame) -> Tuple[bool, List[str]]:
+def validate_data_types(data: pd.DataFrame, bundle: Optional[Dict] = None) -> Tuple[bool, List[str]]:
     invalid_columns = []
     
-    if model_data is None or all_features is None:
+    bundle = bundle or get_model_data()
+    if bundle is None:
         return False, ["Model not loaded"]
+    all_features = bundle['all_features']
     
     for col in data.columns:
         if col.lower() in [f.lower() for f in all_features]:
@@ -89,10 +141,13 @@ def process_file(file_path: str, file_extension: str) -> pd.DataFrame:
     data.columns = data.columns.str.strip()
     return data
 
-def prepare_data(data: pd.DataFrame) -> np.ndarray:
-    if model_data is None:
+def order_features(data: pd.DataFrame, bundle: Optional[Dict] = None) -> pd.DataFrame:
+    """Colonnes du modèle converties en numérique et ordonnées selon all_features"""
+    bundle = bundle or get_model_data()
+    if bundle is None:
         raise Exception("Model not loaded")
     
+    all_features = bundle['all_features']
     if all_features is None:
         raise Exception("Features not loaded")
     
@@ -113,27 +168,37 @@ def prepare_data(data: pd.DataFrame) -> np.ndarray:
         raise Exception(f"Missing values in columns: {null_columns}")
     
     # Ordonner les colonnes selon all_features
-    data_ordered = data_processed[all_features]
+    return data_processed[all_features]
+
+def transform_features(data_ordered: pd.DataFrame, bundle: Optional[Dict] = None) -> np.ndarray:
+    bundle = bundle or get_model_data()
+    if bundle is None:
+        raise Exception("Model not loaded")
     
     # Appliquer la sélection de features si disponible
-    if 'feature_selector' in model_data and model_data['feature_selector'] is not None:
-        data_selected = model_data['feature_selector'].transform(data_ordered)
+    if 'feature_selector' in bundle and bundle['feature_selector'] is not None:
+        data_selected = bundle['feature_selector'].transform(data_ordered)
     else:
         data_selected = data_ordered
     
     # Appliquer le scaler si disponible
-    if 'scaler' in model_data and model_data['scaler'] is not None:
-        data_scaled = model_data['scaler'].transform(data_selected)
+    if 'scaler' in bundle and bundle['scaler'] is not None:
+        data_scaled = bundle['scaler'].transform(data_selected)
     else:
         data_scaled = data_selected
     
     return data_scaled
 
-def make_predictions(data_scaled: np.ndarray) -> List[Dict]:
-    if model_data is None:
+def prepare_data(data: pd.DataFrame, bundle: Optional[Dict] = None) -> np.ndarray:
+    bundle = bundle or get_model_data()
+    return transform_features(order_features(data, bundle), bundle)
+
+def make_predictions(data_scaled: np.ndarray, bundle: Optional[Dict] = None) -> List[Dict]:
+    bundle = bundle or get_model_data()
+    if bundle is None:
         raise Exception("Model not loaded")
     
-    model = model_data['model']
+    model = bundle['model']
     
     # Vérifier si le modèle a la méthode predict_proba
     if hasattr(model, 'predict_proba'):
@@ -142,13 +207,13 @@ def make_predictions(data_scaled: np.ndarray) -> List[Dict]:
     else:
         # Pour les modèles qui n'ont pas predict_proba
         predictions = model.predict(data_scaled)
-        probabilities = np.zeros((len(predictions), len(model_data['label_encoder'].classes_)))
+        probabilities = np.zeros((len(predictions), len(bundle['label_encoder'].classes_)))
         for i, pred in enumerate(predictions):
-            class_idx = np.where(model_data['label_encoder'].classes_ == pred)[0][0]
+            class_idx = np.where(bundle['label_encoder'].classes_ == pred)[0][0]
             probabilities[i, class_idx] = 1.0
     
-    predicted_classes = model_data['label_encoder'].inverse_transform(predictions)
-    all_classes = model_data['label_encoder'].classes_
+    predicted_classes = bundle['label_encoder'].inverse_transform(predictions)
+    all_classes = bundle['label_encoder'].classes_
     
     results = []
     for i in range(len(predictions)):
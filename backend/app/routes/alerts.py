@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.alert import Alert
 from app.models.user import User
+from app.services.alert_service import create_zone_alerts, evaluate_zones, get_alert_evaluator, invalid_indicators
 
 alerts_bp = Blueprint("alerts", __name__, url_prefix="/api/alerts")
 
@@ -60,3 +61,23 @@ def acknowledge_alert(alert_id):
     alert.acknowledged = True
     db.session.commit()
     return jsonify(alert.to_dict())
+
+
+# POST: évaluer les indices d'une liste de zones (et enregistrer les alertes)
+@alerts_bp.route("/evaluate", methods=["POST"])
+def evaluate_alerts():
+    data = request.json or {}
+    observations = data.get("zones") or []
+    if not isinstance(observations, list) or not all(isinstance(o, dict) and o.get("zone") for o in observations):
+        return jsonify({"error": "zones must be a list of objects with a 'zone' field"}), 400
+    invalid = sorted({indicator for o in observations for indicator in invalid_indicators(o)})
+    if invalid:
+        return jsonify({"error": f"{', '.join(invalid)} must be numbers"}), 400
+
+    evaluations = evaluate_zones(observations, on_date=data.get("date"))
+    created = create_zone_alerts(evaluations, observations) if data.get("persist", True) else []
+    return jsonify({
+        "evaluations": evaluations,
+        "alerts_created": [a.to_dict() for a in created],
+        "cache": get_alert_evaluator().stats(),
+    })
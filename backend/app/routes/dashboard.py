@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify
 from sqlalchemy import func
 from app import db
 from app.models import Sensor, Alert , Measurement 
+from app.services.summary_service import list_region_summaries, get_region_summary
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
@@ -27,4 +28,19 @@ def get_environmental_data():
         'temperature': [22.5, 23.0, 22.8],  # Données simulées
         'humidity': [45, 47, 46],
         'airQuality': [35, 38, 36]
-    })
\ No newline at end of file
+    })
+
+@dashboard_bp.route('/regions', methods=['GET'])
+def get_region_summaries():
+    # Résumés régionaux précalculés par le pipeline (aucun parcours des données)
+    summaries = list_region_summaries()
+    if summaries is None:
+        return jsonify({'error': 'Summary cube not available'}), 404
+    return jsonify(summaries)
+
+@dashboard_bp.route('/regions/<region>', methods=['GET'])
+def get_region_summary_route(region):
+    summary = get_region_summary(region)
+    if summary is None:
+        return jsonify({'error': 'Region not found'}), 404
+    return jsonify({'region': region, **summary})
\ No newline at end of file
@@ -0,0 +1,200 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import date as date_type
+
+from flask import current_app
+
+from app import db
+from app.models.alert import Alert
+from app.models.sensor import Sensor
+
+# Niveaux d'alerte (mêmes règles que le pipeline ML Forest/Data) : indice = nombre
+# d'indicateurs sous leur seuil critique, plafonné
+ALERT_LEVELS = [
+    {"level": "Normal", "color": "Green", "priority": 0, "severity": None},
+    {"level": "Attention", "color": "Yellow", "priority": 1, "severity": "low"},
+    {"level": "Alerte", "color": "Orange", "priority": 2, "severity": "medium"},
+    {"level": "Critique", "color": "Red", "priority": 3, "severity": "high"},
+]
+
+# Indicateur -> clé du seuil critique dans region_configs.json
+ALERT_INDICATORS = [("NDVI", "ndvi_critical"), ("NDMI", "ndmi_critical"), ("EVI", "evi_critical")]
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+
+class RegionAlertEvaluator:
+    """Évaluation des alertes d'une zone à partir des indices satellitaires ou capteurs
+
+    Les seuils de region_configs.json sont compilés une fois en listes
+    (indicateur, seuil) par région. Les évaluations sont gardées par (zone, date) :
+    un rechargement du tableau de bord avec les mêmes valeurs ne refait pas le calcul.
+    Chaque entrée note aussi si son alerte a été enregistrée (mark_persisted), pour ne
+    l'écrire qu'une fois.
+    """
+
+    def __init__(self, region_configs, max_entries=10000):
+        self.region_names = {region: config["name"] for region, config in region_configs.items()}
+        self.rules = {
+            region: [(indicator, config["thresholds"][key]) for indicator, key in ALERT_INDICATORS]
+            for region, config in region_configs.items()
+        }
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compute(self, region, values):
+        critical = [
+            f"{indicator} < {threshold}"
+            for indicator, threshold in self.rules.get(region, [])
+            if values.get(indicator) is not None and values[indicator] < threshold
+        ]
+        level = ALERT_LEVELS[min(len(critical), len(ALERT_LEVELS) - 1)]
+        return {
+            **level,
+            "region": region,
+            "region_name": self.region_names.get(region, region),
+            "known_region": region in self.rules,
+            "critical_indicators": critical,
+        }
+
+    def evaluate(self, zone, values, on_date=None, region=None):
+        """Niveau d'alerte d'une zone pour une date (région = zone par défaut)"""
+        region = region or zone
+        on_date = on_date or date_type.today().isoformat()
+        key = (zone, str(on_date))
+        signature = (region,) + tuple(values.get(indicator) for indicator, _ in ALERT_INDICATORS)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached["signature"] == signature:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return {**cached["result"], "cached": True, "persisted": cached["persisted"]}
+            self.misses += 1
+
+        result = {"zone": zone, "date": str(on_date), **self._compute(region, values)}
+        with self._lock:
+            self._cache[key] = {"signature": signature, "result": result, "persisted": False}
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return {**result, "cached": False, "persisted": False}
+
+    def mark_persisted(self, zone, on_date):
+        """Noter que l'alerte de l'évaluation courante de (zone, date) est enregistrée"""
+        with self._lock:
+            cached = self._cache.get((zone, str(on_date)))
+            if cached is not None:
+                cached["persisted"] = True
+
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def invalid_indicators(observation):
+    """Indicateurs d'une observation dont la valeur n'est ni un nombre ni null"""
+    return [
+        indicator
+        for indicator, _ in ALERT_INDICATORS
+        if observation.get(indicator) is not None
+        and (isinstance(observation[indicator], bool) or not isinstance(observation[indicator], (int, float)))
+    ]
+
+
+def load_region_configs(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_alert_evaluator():
+    """Évaluateur partagé, compilé au premier appel depuis REGION_CONFIG_PATH"""
+    global _evaluator
+    with _evaluator_lock:
+        if _evaluator is None:
+            _evaluator = RegionAlertEvaluator(load_region_configs(current_app.config["REGION_CONFIG_PATH"]))
+        return _evaluator
+
+
+def evaluate_zones(observations, on_date=None):
+    """Évaluer une liste d'observations {"zone", "region"?, "date"?, "NDVI", "NDMI", "EVI"}"""
+    evaluator = get_alert_evaluator()
+    return [
+        evaluator.evaluate(
+            observation["zone"],
+            observation,
+            on_date=observation.get("date") or on_date,
+            region=observation.get("region"),
+        )
+        for observation in observations
+    ]
+
+
+def create_zone_alerts(evaluations, observations):
+    """Écrire en une transaction une alerte par zone au-dessus du niveau Normal
+
+    Les doublons sont écartés en base : une alerte identique (même capteur, même message,
+    qui porte niveau, région et date) déjà enregistrée n'est pas réécrite, quel que soit
+    le worker ou le redémarrage. Le drapeau persisted du cache de l'évaluateur n'est qu'un
+    raccourci qui évite la requête. Les doublons (zone, date) de la liste sont ignorés.
+    L'alerte est rattachée au capteur de l'observation (sensor_id) ou, à défaut, au
+    premier capteur de la zone ; une zone sans capteur n'est pas enregistrée et le sera à
+    une prochaine évaluation. Renvoie les alertes créées.
+    """
+    pending = []
+    seen = set()
+    for evaluation, observation in zip(evaluations, observations):
+        key = (evaluation["zone"], evaluation["date"])
+        if evaluation["severity"] is not None and not evaluation["persisted"] and key not in seen:
+            seen.add(key)
+            pending.append((evaluation, observation))
+    if not pending:
+        return []
+
+    # Un seul SELECT pour les capteurs de toutes les zones concernées
+    zones = {evaluation["zone"] for evaluation, observation in pending if not observation.get("sensor_id")}
+    zone_sensors = {}
+    if zones:
+        for sensor_id, zone in (
+            db.session.query(Sensor.id, Sensor.zone).filter(Sensor.zone.in_(zones)).order_by(Sensor.id)
+        ):
+            zone_sensors.setdefault(zone, sensor_id)
+
+    candidates = []
+    for evaluation, observation in pending:
+        sensor_id = observation.get("sensor_id") or zone_sensors.get(evaluation["zone"])
+        if sensor_id is None:
+            continue
+        message = (
+            f"{evaluation['level']} - {evaluation['region_name']} ({evaluation['date']}): "
+            + ", ".join(evaluation["critical_indicators"])
+        )[:200]
+        candidates.append((evaluation, sensor_id, message))
+    if not candidates:
+        return []
+
+    # Un seul SELECT pour les alertes déjà enregistrées, dans la transaction de l'écriture
+    existing = set(
+        db.session.query(Alert.sensor_id, Alert.message).filter(
+            Alert.sensor_id.in_({sensor_id for _, sensor_id, _ in candidates}),
+            Alert.message.in_({message for _, _, message in candidates}),
+        )
+    )
+    alerts = []
+    for evaluation, sensor_id, message in candidates:
+        if (sensor_id, message) not in existing:
+            alerts.append(Alert(message=message, severity=evaluation["severity"], sensor_id=sensor_id))
+            existing.add((sensor_id, message))
+
+    db.session.add_all(alerts)
+    db.session.commit()
+
+    evaluator = get_alert_evaluator()
+    for evaluation, _, _ in candidates:
+        evaluator.mark_persisted(evaluation["zone"], evaluation["date"])
+        evaluation["persisted"] = True
+    return alerts
@@ -0,0 +1,51 @@
+import json
+import os
+import threading
+
+from flask import current_app
+
+# Dernier cube lu : (signature du fichier, contenu)
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_summary_cube():
+    """Cube de résumé écrit par le pipeline ML Forest/Data, relu seulement s'il a changé
+
+    Renvoie None si le fichier n'existe pas encore (pipeline non exécuté).
+    """
+    global _cube
+    path = current_app.config["SUMMARY_CUBE_PATH"]
+    try:
+        signature = _signature(path)
+    except OSError:
+        return None
+
+    with _cube_lock:
+        if _cube is None or _cube[0] != signature:
+            with open(path, "r", encoding="utf-8") as f:
+                _cube = (signature, json.load(f))
+        return _cube[1]
+
+
+def list_region_summaries():
+    cube = get_summary_cube()
+    if cube is None:
+        return None
+    return {
+        "generated_at": cube["generated_at"],
+        "overall": cube["overall"],
+        "regions": cube["regions"],
+    }
+
+
+def get_region_summary(region):
+    cube = get_summary_cube()
+    if cube is None:
+        return None
+    return cube["regions"].get(region)
@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -10,3 +12,12 @@ class Config:
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "pass123")
     SESSION_COOKIE_SAMESITE = "None"
     SESSION_COOKIE_SECURE = False  
+    # Seuils d'alerte par région, partagés avec le pipeline ML Forest/Data
+    REGION_CONFIG_PATH = os.getenv(
+        "REGION_CONFIG_PATH", os.path.join(BASE_DIR, "..", "ML Forest", "Data", "region_configs.json")
+    )
+    # Cube de résumé (région, niveau d'alerte, santé) écrit par save_processed_datasets
+    SUMMARY_CUBE_PATH = os.getenv(
+        "SUMMARY_CUBE_PATH",
+        os.path.join(BASE_DIR, "..", "ML Forest", "Data", "processed_data", "forest_summary_cube.json"),
+    )